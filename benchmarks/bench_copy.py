@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   Benchmark for copies in write_run and
+#       MetaWorkflowRun constructors
+#       on a 50k shards MetaWorkflowRun
+#
+#   python benchmarks/bench_copy.py
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from magma.metawfl import MetaWorkflow
+from magma_ff.metawflrun import MetaWorkflowRun
+
+################################################
+#   Functions
+################################################
+def synthetic_metawfl():
+    """Build a MetaWorkflow[json] that scatters on 2 dimensions
+    and gathers back the 2nd dimension.
+
+    :return: MetaWorkflow[json]
+    :rtype: dict
+    """
+    def step(name, input):
+        return {'name': name, 'workflow': name, 'config': {}, 'input': input}
+    #end def
+    workflows = [
+        step('scatter', [{'argument_name': 'input', 'argument_type': 'file', 'scatter': 2}]),
+        step('gather', [{'argument_name': 'input', 'argument_type': 'file', 'source': 'scatter', 'gather': 1}])
+    ]
+    return {'uuid': 'benchmark', 'input': [], 'workflows': workflows}
+#end def
+
+def measure(function, *args, **kwargs):
+    """Run function and return its result, seconds and peak memory in MB.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 ** 2
+#end def
+
+def main(n_samples=50, n_regions=1000):
+    wfl_obj = MetaWorkflow(synthetic_metawfl())
+    structure = [['file_{0}_{1}'.format(i, ii) for ii in range(n_regions)] for i in range(n_samples)]
+    run_json, elapsed, peak = measure(wfl_obj.write_run, structure)
+    print('write_run {0} runs: {1:.3f}s, peak {2:.1f}MB'.format(
+            len(run_json['workflow_runs']), elapsed, peak))
+    run_json['input'] = [{'argument_name': 'input', 'argument_type': 'file', 'files': []}]
+    for copy in (True, False):
+        _, elapsed, peak = measure(MetaWorkflowRun, run_json, copy=copy)
+        print('MetaWorkflowRun copy={0}: {1:.3f}s, peak {2:.1f}MB'.format(copy, elapsed, peak))
+    #end for
+#end def
+
+if __name__ == '__main__':
+    main()
+#end if
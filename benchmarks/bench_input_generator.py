@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   Benchmark for InputGenerator.input_generator
+#       on a synthetic scatter and gather
+#
+#   python benchmarks/bench_input_generator.py
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from magma.metawfl import MetaWorkflow
+from magma.metawflrun import MetaWorkflowRun
+from magma.inputgenerator import InputGenerator
+
+################################################
+#   Functions
+################################################
+def synthetic_metawfl(n_parameters, n_outputs):
+    """Build a MetaWorkflow[json] that scatters on 1 dimension
+    and gathers back n_outputs outputs,
+    each step uses n_parameters parameters.
+
+    :return: MetaWorkflow[json]
+    :rtype: dict
+    """
+    parameters = [{'argument_name': 'param_{0}'.format(i), 'argument_type': 'parameter'}
+                    for i in range(n_parameters)]
+    workflows = [
+        {'name': 'scatter', 'workflow': 'scatter', 'config': {},
+         'input': [{'argument_name': 'input', 'argument_type': 'file', 'scatter': 1}] + parameters},
+        {'name': 'gather', 'workflow': 'gather', 'config': {},
+         'input': [{'argument_name': 'input_{0}'.format(i), 'argument_type': 'file',
+                    'source': 'scatter', 'source_argument_name': 'output_{0}'.format(i), 'gather': 1}
+                        for i in range(n_outputs)] + parameters}
+    ]
+    return {'uuid': 'benchmark', 'input': [], 'workflows': workflows}
+#end def
+
+def synthetic_input(n_shards, n_parameters):
+    """Build MetaWorkflowRun[json] input.
+
+    :return: MetaWorkflowRun[json] input
+    :rtype: list(dict)
+    """
+    input = [{'argument_name': 'input', 'argument_type': 'file',
+              'files': ['file_{0}'.format(i) for i in range(n_shards)]}]
+    for i in range(n_parameters):
+        input.append({'argument_name': 'param_{0}'.format(i), 'argument_type': 'parameter',
+                      'value': i})
+    #end for
+    return input
+#end def
+
+def main(sizes=((1000, 20, 10), (5000, 20, 10))):
+    for n_shards, n_parameters, n_outputs in sizes:
+        wfl_obj = MetaWorkflow(synthetic_metawfl(n_parameters, n_outputs))
+        run_json = wfl_obj.write_run([['file_{0}'.format(i)] for i in range(n_shards)])
+        run_json['input'] = synthetic_input(n_shards, n_parameters)
+        wflrun_obj = MetaWorkflowRun(run_json)
+        ingen_obj = InputGenerator(wfl_obj, wflrun_obj)
+        # Scatter
+        start = time.perf_counter()
+        count = sum(1 for _ in ingen_obj.input_generator())
+        elapsed = time.perf_counter() - start
+        print('scatter {0:>6} runs, {1:>3} parameters: {2:.3f}s'.format(
+                count, n_parameters, elapsed))
+        # Complete scatter runs and gather
+        for run_obj in wflrun_obj.step_runs('scatter'):
+            wflrun_obj.update_attribute(run_obj.shard_name, 'output',
+                [{'argument_name': 'output_{0}'.format(i), 'files': 'out_' + run_obj.shard}
+                    for i in range(n_outputs)])
+            wflrun_obj.update_attribute(run_obj.shard_name, 'status', 'completed')
+        #end for
+        start = time.perf_counter()
+        count = sum(1 for _ in ingen_obj.input_generator())
+        elapsed = time.perf_counter() - start
+        print('gather  {0:>6} dependencies, {1:>3} outputs: {2:.3f}s'.format(
+                n_shards, n_outputs, elapsed))
+    #end for
+#end def
+
+if __name__ == '__main__':
+    main()
+#end if
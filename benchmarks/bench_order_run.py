@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   Benchmark for MetaWorkflow._order_run
+#       on synthetic wide DAGs
+#
+#   python benchmarks/bench_order_run.py
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from magma.metawfl import MetaWorkflow
+
+################################################
+#   Functions
+################################################
+def synthetic_metawfl(n_steps, width=100):
+    """Build a MetaWorkflow[json] with n_steps organized in layers
+    of width steps. Each step depends on two steps of the previous layer,
+    each layer ends with a step gathering the whole layer.
+
+    :param n_steps: Number of steps
+    :type n_steps: int
+    :param width: Number of steps per layer
+    :type width: int
+    :return: MetaWorkflow[json]
+    :rtype: dict
+    """
+    workflows, previous = [], []
+    for i in range(n_steps):
+        name = 'step_{0}'.format(i)
+        idx = i % width
+        if idx == width - 1:
+            dependencies = ['step_{0}'.format(j) for j in range(i - width + 1, i)]
+        elif previous:
+            dependencies = [previous[idx % len(previous)], previous[(idx + 1) % len(previous)]]
+        else:
+            dependencies = []
+        #end if
+        workflows.append({
+            'name': name,
+            'workflow': name,
+            'config': {},
+            'input': [],
+            'dependencies': dependencies
+        })
+        if idx == width - 1:
+            previous = [workflow['name'] for workflow in workflows[-width:]]
+        #end if
+    #end for
+    return {'uuid': 'benchmark', 'input': [], 'workflows': workflows}
+#end def
+
+def main(sizes=(1000, 10000)):
+    for n_steps in sizes:
+        wfl_obj = MetaWorkflow(synthetic_metawfl(n_steps))
+        end_steps = wfl_obj.end_workflows
+        start = time.perf_counter()
+        steps_ = wfl_obj._order_run(end_steps)
+        elapsed = time.perf_counter() - start
+        assert len(steps_) == n_steps
+        print('_order_run {0:>6} steps: {1:.3f}s'.format(n_steps, elapsed))
+    #end for
+#end def
+
+if __name__ == '__main__':
+    main()
+#end if
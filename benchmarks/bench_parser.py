@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   Benchmark for ParserFF._files_to_json
+#       against the incremental conversion
+#
+#   python benchmarks/bench_parser.py
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from magma_ff.parser import ParserFF
+
+################################################
+#   Functions
+################################################
+def synthetic_files(n_files, n_samples=None):
+    """Build files for a 1-D argument, or a 2-D argument
+    with n_samples rows if n_samples is specified.
+
+    :return: List of dictionaries representing files
+    :rtype: list(dict)
+    """
+    files = []
+    for i in range(n_files):
+        if n_samples:
+            dimension = '{0},{1}'.format(i % n_samples, i // n_samples)
+        else:
+            dimension = str(i)
+        #end if
+        files.append({'file': 'uuid-{0}'.format(i), 'dimension': dimension})
+    #end for
+    return files
+#end def
+
+def timeit(function, files, repeat=3):
+    """Best time of repeat calls.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(files)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+        #end if
+    #end for
+    return best, result
+#end def
+
+def main(sizes=(10000, 100000)):
+    pff_obj = ParserFF({})
+    for n_files in sizes:
+        for n_samples in (None, 100):
+            files = synthetic_files(n_files, n_samples)
+            incremental, result_ = timeit(pff_obj._files_to_json_incremental, files)
+            two_pass, result = timeit(pff_obj._files_to_json, files)
+            assert result == result_
+            print('{0:>7} files, {1}: incremental {2:.3f}s, two-pass {3:.3f}s'.format(
+                    n_files, '2-D' if n_samples else '1-D', incremental, two_pass))
+        #end for
+    #end for
+#end def
+
+if __name__ == '__main__':
+    main()
+#end if
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   End-to-end benchmark for run_metawfr
+#       and status_metawfr against FakePortal,
+#       on MetaWorkflowRuns of 10, 1k and 10k shards
+#
+#   python benchmarks/bench_portal.py [latency]
+#
+#   latency is the seconds for each portal request,
+#       default to 0.005
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_portal import FakePortal
+from magma_ff.metawfl import MetaWorkflow
+from magma_ff.run_metawfr import run_metawfr
+from magma_ff.status_metawfr import status_metawfr
+
+# Unbatched run_metawfr PATCHes all the workflow_runs for each run,
+#   it is only benchmarked up to this number of shards
+MAX_SHARDS_UNBATCHED = 1000
+
+################################################
+#   Functions
+################################################
+def synthetic_portal(portal, n_shards):
+    """Add to portal the Workflows, a MetaWorkflow that scatters
+    on n_shards input files and gathers back, and a MetaWorkflowRun.
+
+    :return: MetaWorkflowRun uuid
+    :rtype: str
+    """
+    for name in ('align', 'merge'):
+        portal.add({'uuid': name, 'arguments': [
+            {'workflow_argument_name': 'input', 'argument_type': 'Input file'},
+            {'workflow_argument_name': 'output', 'argument_type': 'Output processed file'}
+        ]}, 'Workflow')
+    #end for
+    mwf = {
+        'uuid': 'benchmark-mwf',
+        'input': [{'argument_name': 'input', 'argument_type': 'file'}],
+        'workflows': [
+            {'name': 'align', 'workflow': 'align', 'config': {},
+             'input': [{'argument_name': 'input', 'argument_type': 'file', 'scatter': 1}]},
+            {'name': 'merge', 'workflow': 'merge', 'config': {},
+             'input': [{'argument_name': 'input', 'argument_type': 'file',
+                        'source': 'align', 'source_argument_name': 'output', 'gather': 1}]}
+        ]
+    }
+    portal.add(mwf, 'MetaWorkflow')
+    files = [portal.add({'status': 'uploaded'}, 'FileFastq') for _ in range(n_shards)]
+    mwfr = MetaWorkflow(mwf).write_run(files)
+    mwfr.update({
+        'uuid': 'benchmark-mwfr-{0}'.format(n_shards),
+        'meta_workflow': mwf['uuid'],
+        'status': 'in review',
+        'input': [{'argument_name': 'input', 'argument_type': 'file',
+                   'files': [{'file': file, 'dimension': str(i)} for i, file in enumerate(files)]}]
+    })
+    return portal.add(mwfr, 'MetaWorkflowRun')
+#end def
+
+def timed(portal, label, function, *args, **kwargs):
+    """Run function and print seconds and portal requests.
+    """
+    portal.requests.clear()
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    requests = ', '.join('{0} {1}'.format(name, n) for name, n in sorted(portal.requests.items()))
+    print('  {0:<30} {1:>8.3f}s  {2}'.format(label, elapsed, requests))
+#end def
+
+def cycle(n_shards, latency, batch, max_workers):
+    """Launch, complete and check the scatter and gather runs
+    of a MetaWorkflowRun with n_shards shards.
+    """
+    with FakePortal(latency=latency) as portal, tempfile.TemporaryDirectory() as journal_dir:
+        uuid = synthetic_portal(portal, n_shards)
+        run = lambda: run_metawfr(uuid, portal.key, batch=batch, journal_dir=journal_dir)
+        status = lambda: status_metawfr(uuid, portal.key, max_workers=max_workers)
+        for step in ('align', 'merge'):
+            timed(portal, 'run_metawfr {0}'.format(step), run)
+            timed(portal, 'status_metawfr {0} running'.format(step), status)
+            portal.tibanna.finish()
+            timed(portal, 'status_metawfr {0} complete'.format(step), status)
+        #end for
+        final_status = portal.items[uuid]['final_status']
+        if final_status != 'completed':
+            raise ValueError('Value error, final_status is {0}\n'.format(final_status))
+        #end if
+    #end with
+#end def
+
+def main(sizes=(10, 1000, 10000), latency=0.005):
+    for n_shards in sizes:
+        for batch, max_workers in ((False, None), (True, None), (True, 8)):
+            if not batch and n_shards > MAX_SHARDS_UNBATCHED:
+                continue
+            #end if
+            print('{0} shards, batch={1}, max_workers={2}, latency={3}s'.format(
+                    n_shards, batch, max_workers, latency))
+            cycle(n_shards, latency, batch, max_workers)
+        #end for
+    #end for
+#end def
+
+if __name__ == '__main__':
+    main(latency=float(sys.argv[1]) if len(sys.argv) > 1 else 0.005)
+#end if
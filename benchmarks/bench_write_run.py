@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   Benchmark for MetaWorkflow.write_run
+#       on synthetic 3-D scatter and gather
+#
+#   python benchmarks/bench_write_run.py
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from magma.metawfl import MetaWorkflow
+
+################################################
+#   Functions
+################################################
+def synthetic_metawfl():
+    """Build a MetaWorkflow[json] that scatters on 3 dimensions
+    and gathers back one dimension at a time.
+
+    :return: MetaWorkflow[json]
+    :rtype: dict
+    """
+    def step(name, input):
+        return {'name': name, 'workflow': name, 'config': {}, 'input': input}
+    #end def
+    workflows = [
+        step('scatter', [{'argument_name': 'input', 'argument_type': 'file', 'scatter': 3}]),
+        step('process', [{'argument_name': 'input', 'argument_type': 'file', 'source': 'scatter'}]),
+        step('gather_3', [{'argument_name': 'input', 'argument_type': 'file', 'source': 'process', 'gather': 1}]),
+        step('gather_2', [{'argument_name': 'input', 'argument_type': 'file', 'source': 'gather_3', 'gather': 1}]),
+        step('gather_1', [{'argument_name': 'input', 'argument_type': 'file', 'source': 'gather_2', 'gather': 1}])
+    ]
+    return {'uuid': 'benchmark', 'input': [], 'workflows': workflows}
+#end def
+
+def input_structure(n_samples, n_groups, n_regions):
+    """Build a 3-D input_structure.
+
+    :return: Input structure with n_samples * n_groups * n_regions files
+    :rtype: list
+    """
+    return [[['file_{0}_{1}_{2}'.format(i, ii, iii) for iii in range(n_regions)]
+                for ii in range(n_groups)]
+                    for i in range(n_samples)]
+#end def
+
+def main(sizes=((3, 10, 300), (3, 20, 1000))):
+    wfl_obj = MetaWorkflow(synthetic_metawfl())
+    for size in sizes:
+        structure = input_structure(*size)
+        start = time.perf_counter()
+        run_json = wfl_obj.write_run(structure)
+        elapsed = time.perf_counter() - start
+        n_shards = size[0] * size[1] * size[2]
+        print('write_run {0:>6} shards, {1:>6} runs: {2:.3f}s'.format(
+                n_shards, len(run_json['workflow_runs']), elapsed))
+    #end for
+#end def
+
+if __name__ == '__main__':
+    main()
+#end if
@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   In-process stand-in for the portal
+#       and tibanna, for end-to-end benchmarks
+#       of magma_ff and magma_smaht functions
+#
+#   with FakePortal(latency=0.05) as portal:
+#       portal.add(item, 'MetaWorkflowRun')
+#       run_metawfr(uuid, portal.key, ...)
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import json
+import time
+import uuid as uuid_
+from collections import Counter
+from contextlib import ExitStack
+from importlib import import_module
+from threading import Lock
+from unittest import mock
+from urllib.parse import urlparse, parse_qsl
+
+import requests
+
+from dcicutils import ff_utils
+
+# Names imported from tibanna and dcicutils by the magma modules,
+#   patched with fake objects while FakePortal is active
+TIBANNA_TARGETS = {
+    'API': ['magma_ff.run_metawfr', 'magma_ff.metawflrun',
+            'magma_smaht.run_metawfr', 'magma_smaht.metawflrun'],
+    'Job': ['magma_ff.wfrutils', 'magma_smaht.wfrutils'],
+    's3Utils': ['magma_ff.wfrutils', 'magma_smaht.wfrutils']
+}
+
+# Search parameters that do not filter items
+SEARCH_IGNORE = ('limit', 'from', 'sort', 'field', 'frame', 'datastore')
+
+################################################
+#   FakeResponse
+################################################
+class FakeResponse(object):
+    """Minimal requests.Response returned by the fake embed API.
+    """
+
+    def __init__(self, body, status_code=200):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+    #end def
+
+    def json(self):
+        return json.loads(self.text)
+    #end def
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError('{0} error'.format(self.status_code))
+        #end if
+    #end def
+
+#end class
+
+################################################
+#   FakePortal
+################################################
+class FakePortal(object):
+    """Portal stand-in backed by an in-memory item store.
+
+    While active (used as a context manager), get_metadata,
+    search_metadata, patch_metadata, post_metadata and the /embed API
+    are served from the store, and tibanna API, Job.info and s3Utils
+    are replaced by FakeTibanna for the magma_ff and magma_smaht modules.
+
+    Each request sleeps latency seconds, search_metadata sleeps once
+    per page. Items are serialized to json in and out of the store,
+    as they would be on the wire. Counts of requests by type
+    are stored in requests.
+
+    Items are stored as given, the store does not expand frames:
+    linked items are only embedded by the embed API.
+    """
+
+    def __init__(self, latency=0.0, tibanna_latency=0.0, server='http://fake-portal'):
+        """Constructor method.
+        Initialize object and attributes.
+
+        :param latency: Seconds to wait for each portal request
+        :type latency: float
+        :param tibanna_latency: Seconds to wait for each tibanna request
+        :type tibanna_latency: float
+        :param server: Server in the portal authorization key
+        :type server: str
+        """
+        self.latency = latency
+        self.key = {'key': 'fake-key', 'secret': 'fake-secret', 'server': server}
+        self.items = {} #{uuid: item, ...}
+        self.types = {} #{item_type: {uuid: item, ...}, ...}
+        self.requests = Counter()
+        self.tibanna = FakeTibanna(self, latency=tibanna_latency)
+        self._lock = Lock()
+        self._patches = None
+    #end def
+
+    def __enter__(self):
+        self._patches = ExitStack()
+        for name in ('get_metadata', 'search_metadata', 'patch_metadata',
+                     'post_metadata', 'authorized_request'):
+            self._patches.enter_context(mock.patch.object(ff_utils, name, getattr(self, name)))
+        #end for
+        # EmbedClient POSTs to /embed over a requests.Session
+        session_post = requests.Session.post
+        def post(session, url, *args, **kwargs):
+            if url.startswith(self.key['server']):
+                return self._embed_request(url, kwargs.get('data'))
+            #end if
+            return session_post(session, url, *args, **kwargs)
+        #end def
+        self._patches.enter_context(mock.patch.object(requests.Session, 'post', post))
+        fakes = {'API': self.tibanna.api_class(),
+                 'Job': self.tibanna.job_class(),
+                 's3Utils': self.tibanna.s3utils_class()}
+        for name, modules in TIBANNA_TARGETS.items():
+            for module in modules:
+                self._patches.enter_context(
+                    mock.patch.object(import_module(module), name, fakes[name]))
+            #end for
+        #end for
+        return self
+    #end def
+
+    def __exit__(self, *exc_info):
+        self._patches.close()
+        self._patches = None
+    #end def
+
+    def add(self, item, item_type):
+        """Add item to the store without a request.
+
+        :param item: Item to add, uuid is created if missing
+        :type item: dict
+        :param item_type: Type of the item (e.g. MetaWorkflowRun)
+        :type item_type: str
+        :return: Uuid of the item
+        :rtype: str
+        """
+        item = json.loads(json.dumps(item))
+        item.setdefault('uuid', str(uuid_.uuid4()))
+        item['@type'] = [item_type, 'Item']
+        item.setdefault('@id', '/{0}/'.format(item['uuid']))
+        with self._lock:
+            self.items[item['uuid']] = item
+            self.types.setdefault(item_type, {})[item['uuid']] = item
+        #end with
+        return item['uuid']
+    #end def
+
+    def _request(self, name, n=1):
+        """Count and wait for n requests.
+        """
+        with self._lock:
+            self.requests[name] += n
+        #end with
+        if self.latency:
+            time.sleep(self.latency * n)
+        #end if
+    #end def
+
+    def _item(self, obj_id):
+        """Get item from uuid or @id.
+        """
+        uuid = obj_id.strip('/').split('/')[-1]
+        if uuid not in self.items:
+            raise Exception('Not found, "{0}" is not in the portal\n'.format(obj_id))
+        #end if
+        return self.items[uuid]
+    #end def
+
+    def _copy(self, item):
+        return json.loads(json.dumps(item))
+    #end def
+
+    def get_metadata(self, obj_id, key=None, ff_env=None, check_queue=False, add_on='', vapp=None):
+        self._request('get')
+        with self._lock:
+            return self._copy(self._item(obj_id))
+        #end with
+    #end def
+
+    def search_metadata(self, search, key=None, ff_env=None, page_limit=50, is_generator=False):
+        """Items matching all parameters in search,
+        multiple values for the same parameter match any of the values.
+        """
+        conditions = {}
+        for param, value in parse_qsl(urlparse(search).query):
+            if param not in SEARCH_IGNORE:
+                conditions.setdefault(param, set()).add(value)
+            #end if
+        #end for
+        item_types = conditions.pop('type', None)
+        with self._lock:
+            if item_types:
+                items = [item for item_type in item_types
+                            for item in self.types.get(item_type, {}).values()]
+            else:
+                items = self.items.values()
+            #end if
+            result = []
+            for item in items:
+                if all(str(item.get(param)) in values for param, values in conditions.items()):
+                    result.append(self._copy(item))
+                #end if
+            #end for
+        #end with
+        self._request('search', max(1, -(-len(result) // page_limit)))
+        return iter(result) if is_generator else result
+    #end def
+
+    def patch_metadata(self, patch_item, obj_id='', key=None, ff_env=None, add_on=''):
+        self._request('patch')
+        patch_item = self._copy(patch_item)
+        with self._lock:
+            item = self._item(obj_id or patch_item['uuid'])
+            item.update(patch_item)
+            return {'status': 'success', '@graph': [self._copy(item)]}
+        #end with
+    #end def
+
+    def post_metadata(self, post_item, schema_name, key=None, ff_env=None, add_on=''):
+        self._request('post')
+        # e.g. meta_workflow_run -> MetaWorkflowRun
+        item_type = ''.join(word.capitalize() for word in schema_name.split('_'))
+        uuid = self.add(post_item, item_type)
+        with self._lock:
+            return {'status': 'success', '@graph': [self._copy(self.items[uuid])]}
+        #end with
+    #end def
+
+    def authorized_request(self, url, auth=None, ff_env=None, verb='GET', retry_fxn=None, **kwargs):
+        if verb != 'POST' or not url.endswith('/embed'):
+            raise ValueError('Value error, {0} {1} is not supported by FakePortal\n'
+                                .format(verb, url))
+        #end if
+        return self._embed_request(url, kwargs.get('data'))
+    #end def
+
+    def _embed_request(self, url, data):
+        """Serve a POST to /embed with json data {ids, fields}.
+        """
+        body = json.loads(data)
+        self._request('embed')
+        return FakeResponse(self.embed(body['ids'], body['fields']))
+    #end def
+
+    def embed(self, ids, fields):
+        """Embed API, fields are paths of names separated by dots,
+        linked items on a path are embedded, * is all the fields.
+        e.g. ['*', 'meta_workflow.*', 'output_files.value_qc.overall_quality_status']
+        Identifiers not found are skipped.
+
+        :return: One dict with the merged fields for each identifier found
+        :rtype: list(dict)
+        """
+        result = []
+        with self._lock:
+            for obj_id in ids:
+                try:
+                    item = self._item(obj_id)
+                except Exception:
+                    continue
+                #end try
+                embedded = {}
+                for field in fields:
+                    embedded = self._merge(embedded, self._embed(item, field.split('.')))
+                #end for
+                result.append(self._copy(embedded))
+            #end for
+        #end with
+        return result
+    #end def
+
+    def _embed(self, value, path):
+        """Follow path from value, embedding linked items.
+        """
+        if isinstance(value, list):
+            return [self._embed(value_, path) for value_ in value]
+        #end if
+        if isinstance(value, str) and path and value in self.items:
+            value = self.items[value]
+        #end if
+        if not path or not isinstance(value, dict):
+            return value
+        #end if
+        name, path = path[0], path[1:]
+        if name == '*':
+            return dict(value)
+        #end if
+        if name not in value:
+            return {}
+        #end if
+        return {name: self._embed(value[name], path)}
+    #end def
+
+    def _merge(self, a, b):
+        """Merge results for two fields of the same item.
+        """
+        if isinstance(a, dict) and isinstance(b, dict):
+            merged = dict(a)
+            for name, value in b.items():
+                merged[name] = self._merge(a[name], value) if name in a else value
+            #end for
+            return merged
+        #end if
+        if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+            return [self._merge(a_, b_) for a_, b_ in zip(a, b)]
+        #end if
+        # Embedded item wins over its uuid
+        return b if isinstance(b, (dict, list)) else a
+    #end def
+
+#end class
+
+################################################
+#   FakeTibanna
+################################################
+class FakeTibanna(object):
+    """Tibanna stand-in for FakePortal.
+
+    A started run creates a WorkflowRun in the portal store,
+    with the run_status set to started.
+    Runs are completed or failed with finish, output files are created
+    for the Output processed file arguments of the Workflow item,
+    if the Workflow is in the portal store.
+    """
+
+    def __init__(self, portal, latency=0.0, cost=1.0):
+        """Constructor method.
+        Initialize object and attributes.
+
+        :param portal: Portal where runs are created
+        :type portal: FakePortal
+        :param latency: Seconds to wait for each request
+        :type latency: float
+        :param cost: Estimated cost for each run
+        :type cost: float
+        """
+        self.portal = portal
+        self.latency = latency
+        self.cost = cost
+        self.jobs = {} #{jobid: WorkflowRun uuid, ...}
+        self.requests = Counter()
+        self._lock = Lock()
+    #end def
+
+    def _request(self, name):
+        with self._lock:
+            self.requests[name] += 1
+        #end with
+        if self.latency:
+            time.sleep(self.latency)
+        #end if
+    #end def
+
+    def run_workflow(self, input_json, sfn=None):
+        """Start a run, return the tibanna response.
+        """
+        self._request('run_workflow')
+        jobid = input_json['jobid']
+        wfr = {
+            'awsem_job_id': jobid,
+            'run_status': 'started',
+            'workflow': input_json.get('workflow_uuid'),
+            'input_files': input_json.get('input_files', []),
+            'output_files': []
+        }
+        uuid = self.portal.add(wfr, 'WorkflowRun')
+        with self._lock:
+            self.jobs[jobid] = uuid
+        #end with
+        return {'jobid': jobid, 'step_function': sfn}
+    #end def
+
+    def finish(self, jobids=None, run_status='complete'):
+        """Set the run_status for started runs, and create their output
+        if run_status is complete.
+
+        :param jobids: Job ids of the runs, if None all the started runs
+        :type jobids: list(str) or None
+        :param run_status: New status, complete or error
+        :type run_status: str
+        :return: Number of runs updated
+        :rtype: int
+        """
+        portal, count = self.portal, 0
+        for jobid in (self.jobs if jobids is None else jobids):
+            wfr = portal.items[self.jobs[jobid]]
+            if wfr['run_status'] != 'started':
+                continue
+            #end if
+            wfr['run_status'] = run_status
+            if run_status == 'complete':
+                for argument_name in self._output_arguments(wfr.get('workflow')):
+                    file_uuid = portal.add({'status': 'uploaded'}, 'FileProcessed')
+                    wfr['output_files'].append({
+                        'workflow_argument_name': argument_name,
+                        'type': 'Output processed file',
+                        'value': {'uuid': file_uuid, '@id': '/{0}/'.format(file_uuid)}
+                    })
+                #end for
+            #end if
+            count += 1
+        #end for
+        return count
+    #end def
+
+    def _output_arguments(self, workflow):
+        workflow = self.portal.items.get(workflow) or {}
+        return [arg['workflow_argument_name'] for arg in workflow.get('arguments', [])
+                    if arg.get('argument_type') == 'Output processed file']
+    #end def
+
+    def cost_estimate(self, job_id, update_tsv=False, force=False):
+        self._request('cost_estimate')
+        return self.cost, 'estimated'
+    #end def
+
+    def info(self, job_id):
+        """Job.info, None if the job is not found.
+        """
+        self._request('job_info')
+        if job_id not in self.jobs:
+            return None
+        #end if
+        return {'Job Id': job_id, 'WorkflowRun uuid': self.jobs[job_id]}
+    #end def
+
+    def api_class(self):
+        """Class used in place of tibanna API.
+        """
+        tibanna = self
+        class API(object):
+            def run_workflow(self, input_json, sfn=None, **kwargs):
+                return tibanna.run_workflow(input_json, sfn=sfn)
+            #end def
+            def cost_estimate(self, job_id, update_tsv=False, force=False):
+                return tibanna.cost_estimate(job_id)
+            #end def
+        #end class
+        return API
+    #end def
+
+    def job_class(self):
+        """Class used in place of tibanna Job.
+        """
+        tibanna = self
+        class Job(object):
+            @staticmethod
+            def info(job_id):
+                return tibanna.info(job_id)
+            #end def
+        #end class
+        return Job
+    #end def
+
+    def s3utils_class(self):
+        """Class used in place of s3Utils, to get the portal key.
+        """
+        key = self.portal.key
+        class s3Utils(object):
+            def __init__(self, *args, **kwargs):
+                pass
+            #end def
+            def get_access_keys(self, name='access_key_admin'):
+                return dict(key)
+            #end def
+        #end class
+        return s3Utils
+    #end def
+
+#end class
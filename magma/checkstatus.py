@@ -13,6 +13,7 @@
 #   Libraries
 ################################################
 import sys, os
+from concurrent.futures import ThreadPoolExecutor
 
 ################################################
 #   AbstractCheckStatus
@@ -21,15 +22,19 @@ class AbstractCheckStatus(object):
     """Template for CheckStatus class.
     """
 
-    def __init__(self, wflrun_obj):
+    def __init__(self, wflrun_obj, max_workers=None):
         """Constructor method.
         Initialize object and attributes.
 
         :param wflrun_obj: MetaWorkflowRun[obj] representing a MetaWorkflowRun[json]
         :type wflrun_obj: object
+        :param max_workers: Maximum number of running runs to check concurrently,
+            if None runs are checked one at a time
+        :type max_workers: int or None
         """
         # Basic attributes
         self.wflrun_obj = wflrun_obj
+        self.max_workers = max_workers
 
     @property
     def status_map(self):
@@ -44,47 +49,88 @@ class AbstractCheckStatus(object):
         }
 
     def check_running(self): # We can maybe have a flag that switch between tibanna or dcic utils functions
-        """
-        """
-        for run_obj in self.wflrun_obj.running():
-
-            jobid = run_obj.jobid if hasattr(run_obj, 'jobid') else run_obj.job_id
-            # Check current status from jobid
-            status_ = self.get_status(jobid)
-            status = self.status_map[status_]
-
-            # Update run status no matter what
-            self.wflrun_obj.update_attribute(run_obj.shard_name, 'status', status)
-
-            # Get run uuid
-            run_uuid = self.get_uuid(jobid)
-
-            # Update run uuid regardless of the status
-            if run_uuid:  # some failed runs don't have run uuid
-                self.wflrun_obj.update_attribute(run_obj.shard_name, 'workflow_run', run_uuid)
+        """Check running runs and update their status, uuid and output.
 
-            if status == 'completed':
-
-                # Get formatted output
-                output = self.get_output(jobid)
+        If max_workers is set, status, uuid and output are retrieved
+        concurrently for all the running runs. Updates are still applied
+        in the order of the runs, so the yielded patch dicts are the same.
+        """
+        running = self.wflrun_obj.running()
+        if self.max_workers and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # map returns results in the order of running
+                for run_obj, run_info in zip(running, executor.map(self.get_run_info, running)):
+                    yield self.update_run(run_obj, *run_info)
+                #end for
+        else:
+            for run_obj in running:
+                yield self.update_run(run_obj, *self.get_run_info(run_obj))
+            #end for
+    #end def
 
-                # Update output
-                if output:
-                    self.wflrun_obj.update_attribute(run_obj.shard_name, 'output', output)
+    def get_run_info(self, run_obj):
+        """Get current status, uuid and output for a running run.
 
-            elif status == 'running':
-                yield None  # yield None so that it doesn't terminate iteration
-                continue
-            else:  # failed
-                # handle error status - anything to do before yielding the updated json
-                self.handle_error(run_obj)
-            #end if
+        :param run_obj: WorkflowRun[obj] with status set to running
+        :type run_obj: object
+        :return: Magma status, run uuid and formatted output,
+            output is None if the run is not completed
+        :rtype: tuple
+        """
+        jobid = run_obj.jobid if hasattr(run_obj, 'jobid') else run_obj.job_id
+        # Check current status from jobid
+        status = self.status_map[self.get_status(jobid)]
+
+        # Get run uuid
+        run_uuid = self.get_uuid(jobid)
+
+        # Get formatted output
+        output = None
+        if status == 'completed':
+            output = self.get_output(jobid)
+        #end if
+        return status, run_uuid, output
+    #end def
 
-            # Return the json to patch workflow_runs for both completed and failed
-            #   and keep going so that it can continue updating status for other runs
-            yield {'final_status':  self.wflrun_obj.update_status(),
-                   'workflow_runs': self.wflrun_obj.runs_to_json()}
-        #end for
+    def update_run(self, run_obj, status, run_uuid, output):
+        """Update a running run with its current status, uuid and output.
+
+        :param run_obj: WorkflowRun[obj] with status set to running
+        :type run_obj: object
+        :param status: Current magma status for the run
+        :type status: str
+        :param run_uuid: Run uuid
+        :type run_uuid: str or None
+        :param output: Formatted output
+        :type output: list(dict) or None
+        :return: Dict to patch workflow_runs and final_status,
+            None if the run is still running
+        :rtype: dict or None
+        """
+        # Update run status no matter what
+        self.wflrun_obj.update_attribute(run_obj.shard_name, 'status', status)
+
+        # Update run uuid regardless of the status
+        if run_uuid:  # some failed runs don't have run uuid
+            self.wflrun_obj.update_attribute(run_obj.shard_name, 'workflow_run', run_uuid)
+
+        if status == 'completed':
+
+            # Update output
+            if output:
+                self.wflrun_obj.update_attribute(run_obj.shard_name, 'output', output)
+
+        elif status == 'running':
+            return None  # None so that it doesn't terminate iteration
+        else:  # failed
+            # handle error status - anything to do before returning the updated json
+            self.handle_error(run_obj)
+        #end if
+
+        # Return the json to patch workflow_runs for both completed and failed
+        #   and keep going so that it can continue updating status for other runs
+        return {'final_status':  self.wflrun_obj.update_status(),
+                'workflow_runs': self.wflrun_obj.runs_to_json()}
     #end def
 
     # Inherited classes could define stuff to do with an error case
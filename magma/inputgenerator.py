@@ -15,7 +15,8 @@
 #   Libraries
 ################################################
 import sys, os
-import re
+import ast
+import operator
 
 # tibanna
 from tibanna.utils import create_jobid
@@ -47,6 +48,17 @@ class Argument(object):
         #end if
     #end def
 
+    def copy(self):
+        """Shallow copy of the Argument object.
+
+        :return: Argument object
+        :rtype: object
+        """
+        arg_obj = Argument.__new__(Argument)
+        arg_obj.__dict__.update(self.__dict__)
+        return arg_obj
+    #end def
+
     def _validate(self):
         """
         """
@@ -61,6 +73,162 @@ class Argument(object):
 
 #end class
 
+################################################
+#   Formula
+################################################
+class Formula(object):
+    """Class to model an arithmetic formula (e.g. "formula:<formula>").
+    The formula is parsed once into a tree of functions, only numbers,
+    parameter names, arithmetic operators and the functions
+    in FUNCTIONS are allowed.
+    Use Formula.compile to reuse the same object for the same formula.
+    """
+
+    FUNCTIONS = {'min': min, 'max': max, 'round': round, 'abs': abs}
+    BINARY_OPERATORS = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv,
+        ast.Mod: operator.mod,
+        ast.Pow: operator.pow #capped, see Formula._pow
+    }
+    UNARY_OPERATORS = {
+        ast.USub: operator.neg,
+        ast.UAdd: operator.pos
+    }
+
+    # Limits for ** operands, keep results small enough to compute
+    MAX_EXPONENT = 100
+    MAX_BASE = 10**6
+
+    # Compiled formulas, shared across shards and MetaWorkflowRun[obj]
+    _formulas = {} #{formula: Formula[obj], ...}
+
+    def __init__(self, formula):
+        """Constructor method.
+        Initialize object and attributes.
+
+        :param formula: Arithmetic formula
+        :type formula: str
+        """
+        # Basic attributes
+        self.formula = formula
+        # Calculated attributes
+        self.names = set() #names of the parameters used in the formula
+        try:
+            tree = ast.parse(formula.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError('Formula error, cannot parse "{0}"\n'
+                                .format(formula))
+        #end try
+        self._function = self._compile(tree.body)
+    #end def
+
+    @classmethod
+    def compile(cls, formula):
+        """Get Formula[obj] for formula, create it only the first time.
+
+        :param formula: Arithmetic formula
+        :type formula: str
+        :return: Formula[obj]
+        :rtype: object
+        """
+        formula_obj = cls._formulas.get(formula)
+        if formula_obj is None:
+            formula_obj = cls._formulas.setdefault(formula, cls(formula))
+        #end if
+        return formula_obj
+    #end def
+
+    def evaluate(self, values):
+        """Evaluate the formula.
+
+        :param values: Values for the parameters used in the formula,
+            strings are converted to numbers
+        :type values: dict
+        :return: Result of the formula
+        :rtype: int or float
+        """
+        values_ = {}
+        for name in self.names:
+            values_[name] = self._number(name, values[name])
+        #end for
+        return self._function(values_)
+    #end def
+
+    def _number(self, name, value):
+        """
+        """
+        if isinstance(value, (int, float)):
+            return value
+        #end if
+        if isinstance(value, str):
+            for type_ in (int, float):
+                try:
+                    return type_(value)
+                except ValueError:
+                    pass
+                #end try
+            #end for
+        #end if
+        raise ValueError('Formula error, value for parameter "{0}" is not a number in "{1}"\n'
+                            .format(name, self.formula))
+    #end def
+
+    def _pow(self, base, exponent):
+        """Power operator, raise ValueError if exponent or base
+        are greater than MAX_EXPONENT or MAX_BASE in absolute value.
+        """
+        error = ValueError('Formula error, {0} ** {1} is too large in "{2}"\n'
+                            .format(base, exponent, self.formula))
+        if abs(exponent) > self.MAX_EXPONENT or abs(base) > self.MAX_BASE:
+            raise error
+        #end if
+        try:
+            return base ** exponent
+        except OverflowError: # Float result
+            raise error
+        #end try
+    #end def
+
+    def _compile(self, node):
+        """Convert node of the parsed formula to a function
+        that takes parameters values as a dictionary.
+        """
+        if isinstance(node, ast.Constant) and \
+           isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = node.value
+            return lambda values: value
+        elif isinstance(node, ast.Name):
+            name = node.id
+            self.names.add(name)
+            return lambda values: values[name]
+        elif isinstance(node, ast.BinOp) and type(node.op) in self.BINARY_OPERATORS:
+            if isinstance(node.op, ast.Pow):
+                operator_ = self._pow
+            else:
+                operator_ = self.BINARY_OPERATORS[type(node.op)]
+            #end if
+            left, right = self._compile(node.left), self._compile(node.right)
+            return lambda values: operator_(left(values), right(values))
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in self.UNARY_OPERATORS:
+            operator_ = self.UNARY_OPERATORS[type(node.op)]
+            operand = self._compile(node.operand)
+            return lambda values: operator_(operand(values))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and \
+             node.func.id in self.FUNCTIONS and not node.keywords:
+            function = self.FUNCTIONS[node.func.id]
+            args = [self._compile(arg) for arg in node.args]
+            return lambda values: function(*[arg(values) for arg in args])
+        #end if
+        raise ValueError('Formula error, "{0}" is not allowed in "{1}"\n'
+                            .format(ast.dump(node), self.formula))
+    #end def
+
+#end class
+
 ################################################
 #   InputGenerator
 ################################################
@@ -85,6 +253,14 @@ class InputGenerator(object):
         # Key to use to access file value information
         #   in workflow-runs output
         self.file_key = 'files'
+        # Binding plans
+        #   compiled once per step and reused for all the shards
+        self._plans = {} #{step name: [Argument[obj], ...], ...}
+                         # Argument[obj] are templates with
+                         # general arguments already matched
+        self._index = None #({(argument_name, argument_type): arg, ...}, {...})
+                           # for MetaWorkflowRun[obj] and MetaWorkflow[obj] input
+        self._index_input = None #MetaWorkflowRun[obj] input used to build _index
     #end def
 
     def input_generator(self):
@@ -135,7 +311,7 @@ class InputGenerator(object):
                         rname = arg_obj.rename
                         if isinstance(rname, str) and rname.startswith('formula:'):
                             frmla = rname.split('formula:')[-1]
-                            rname = self._value_parameter(frmla, self.wflrun_obj.input)
+                            rname = self._value_parameter(frmla, self._input_index()[0])
                         #end if
                         arg_.setdefault('rename', rname)
                     #end if
@@ -160,19 +336,14 @@ class InputGenerator(object):
         d_ = {}
         for k, v in dit.items():
             if isinstance(v, str) and v.startswith('formula:'):
-                frmla = v.split('formula:')[-1]
+                formula_obj = Formula.compile(v.split('formula:')[-1])
                 # match parameters
-                re_match = re.findall('([a-zA-Z_]+)', frmla)
-                # replace parameters
-                for s in re_match:
-                    try:
-                        val = self._value_parameter(s, self.wflrun_obj.input)
-                        frmla = frmla.replace(s, str(val))
-                    except Exception:
-                        pass
-                    #end try
+                wflrun_index = self._input_index()[0]
+                values = {}
+                for name in formula_obj.names:
+                    values[name] = self._value_parameter(name, wflrun_index)
                 #end for
-                v = eval(frmla)
+                v = formula_obj.evaluate(values)
             #end if
             d_.setdefault(k, v)
         #end for
@@ -180,20 +351,27 @@ class InputGenerator(object):
     #end def
 
     def _input(self):
+        """Generator, arguments are matched for each workflow-run
+        only when it is requested.
+        Workflow-runs that are not ready to run anymore when requested,
+        e.g. status changed during iteration, are skipped.
         """
-        """
-        out_ = []
         # Get workflow-runs that need to be run
         for run_obj in self.wflrun_obj.to_run():
+            shard_name = run_obj.shard_name
+            if not self.wflrun_obj.is_ready(shard_name):
+                continue
+            #end if
+            # Use current object, could have been replaced during iteration
+            run_obj = self.wflrun_obj.runs[shard_name]
             # Get workflow-run arguments
             run_args = self._run_arguments(run_obj)
             # Match and update workflow-run arguments
             #   file arguments -> files
             #   parameter arguments -> value
             self._match_arguments(run_args, run_obj)
-            out_.append((run_obj, run_args))
+            yield run_obj, run_args
         #end for
-        return out_
     #end def
 
     def _run_arguments(self, run_obj):
@@ -201,12 +379,57 @@ class InputGenerator(object):
         :param run_obj: WorkflowRun[obj] representing a WorkflowRun[json]
         :type run_obj: object
         """
-        run_args = []
-        for arg in self.wfl_obj.steps[run_obj.name].input:
-            arg_obj = Argument(arg)
-            run_args.append(arg_obj)
-        #end for
-        return run_args
+        return [arg_obj.copy() for arg_obj in self._step_plan(run_obj.name)]
+    #end def
+
+    def _step_plan(self, step_name):
+        """Compile the binding plan for step specified by step_name.
+        Arguments that do not depend on the shard are matched only once.
+
+        :param step_name: Name of the step
+        :type step_name: str
+        :return: List of Argument objects to use as templates
+        :rtype: list(object)
+        """
+        self._input_index()
+        plan = self._plans.get(step_name)
+        if plan is None:
+            plan = []
+            for arg in self.wfl_obj.steps[step_name].input:
+                arg_obj = Argument(arg)
+                if arg_obj.argument_type != 'file':
+                    self._match_argument_parameter(arg_obj)
+                #end if
+                plan.append(arg_obj)
+            #end for
+            self._plans[step_name] = plan
+        #end if
+        return plan
+    #end def
+
+    def _input_index(self):
+        """Index MetaWorkflowRun[obj] and MetaWorkflow[obj] input
+        by (argument_name, argument_type).
+        Index and plans are rebuilt if MetaWorkflowRun[obj] input changed.
+
+        :return: Indexes for MetaWorkflowRun[obj] and MetaWorkflow[obj] input
+        :rtype: tuple(dict, dict)
+        """
+        if self._index is None or self._index_input is not self.wflrun_obj.input:
+            index = []
+            for arg_list in (self.wflrun_obj.input, self.wfl_obj.input):
+                index_ = {}
+                for arg in arg_list:
+                    # Keep the first match
+                    index_.setdefault((arg['argument_name'], arg['argument_type']), arg)
+                #end for
+                index.append(index_)
+            #end for
+            self._index = tuple(index)
+            self._index_input = self.wflrun_obj.input
+            self._plans = {}
+        #end if
+        return self._index
     #end def
 
     def _match_arguments(self, run_args, run_obj):
@@ -261,14 +484,14 @@ class InputGenerator(object):
         if getattr(arg_obj, 'source', None):
         # Is workflow-run dependency, match to workflow-run output
             file_ = []
+            runs = self.wflrun_obj.runs
             for dependency in run_obj.dependencies:
-                if arg_obj.source == dependency.split(':')[0]:
-                    for arg in self.wflrun_obj.runs[dependency].output:
-                        if arg_obj.source_argument_name == arg['argument_name']:
-                            file_.append(arg[self.file_key])
-                            break
-                        #end if
-                    #end for
+                dependency_obj = runs[dependency]
+                if arg_obj.source == dependency_obj.name:
+                    arg = dependency_obj.output_index().get(arg_obj.source_argument_name)
+                    if arg is not None:
+                        file_.append(arg[self.file_key])
+                    #end if
                 #end if
             #end for
             gather = getattr(arg_obj, 'gather', 0)
@@ -314,53 +537,52 @@ class InputGenerator(object):
         :param arg_obj: Argument object
         :type arg_obj: object
         """
+        wflrun_index, wfl_index = self._input_index()
         # Try and match with meta-worfklow-run input
-        if self._value(arg_obj, self.wflrun_obj.input):
+        if self._value(arg_obj, wflrun_index):
             return True
         #end if
         # No match, try match to default argument in meta-worfklow
-        if self._value(arg_obj, self.wfl_obj.input):
+        if self._value(arg_obj, wfl_index):
             return True
         #end if
         return False
     #end def
 
-    def _value(self, arg_obj, arg_list):
+    def _value(self, arg_obj, arg_index):
         """
         :param arg_obj: Argument object
         :type arg_obj: object
-        :param arg_list: List of arguments as dictionaries
-        :type arg_list: list(dict)
+        :param arg_index: Index of arguments as dictionaries
+            by (argument_name, argument_type), see _input_index
+        :type arg_index: dict
         """
-        for arg in arg_list:
-            if arg_obj.source_argument_name == arg['argument_name'] and \
-               arg_obj.argument_type == arg['argument_type']:
-                if arg_obj.argument_type == 'file':
-                    arg_obj.files = arg['files']
-                else:
-                    arg_obj.value = arg['value']
-                #end if
-                return True
-            #end if
-        #end for
-        return False
+        arg = arg_index.get((arg_obj.source_argument_name, arg_obj.argument_type))
+        if arg is None:
+            return False
+        #end if
+        if arg_obj.argument_type == 'file':
+            arg_obj.files = arg['files']
+        else:
+            arg_obj.value = arg['value']
+        #end if
+        return True
     #end def
 
-    def _value_parameter(self, arg_name, arg_list):
+    def _value_parameter(self, arg_name, arg_index):
         """
         :param arg_name: Name of the argument
         :type arg_name: str
-        :param arg_list: List of arguments as dictionaries to match
-        :type arg_list: list(dict)
+        :param arg_index: Index of arguments as dictionaries
+            by (argument_name, argument_type), see _input_index
+        :type arg_index: dict
         """
-        for arg in arg_list:
-            if arg_name == arg['argument_name'] and \
-               arg['argument_type'] == 'parameter':
-                return arg['value']
-            #end if
-        #end for
-        raise ValueError('Value error, cannot find a match for parameter "{0}"\n'
-                            .format(arg_name))
+        arg = arg_index.get((arg_name, 'parameter'))
+        if arg is None:
+            raise ValueError('Value error, cannot find a match for parameter "{0}"\n'
+                                .format(arg_name))
+        #end if
+        return arg['value']
     #end def
 
 #end class
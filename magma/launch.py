@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   Library to launch runs of
+#       MetaWorkflowRun[obj] in batches
+#
+#   Shared by magma_ff and magma_smaht
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event
+
+from botocore.exceptions import ClientError, ConnectTimeoutError, EndpointConnectionError
+
+# Error codes for throttled AWS requests
+THROTTLING_CODES = (
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded'
+)
+
+################################################
+#   MetaWorkflowRunLaunchError
+################################################
+class MetaWorkflowRunLaunchError(Exception):
+    """Custom exception for runs that could not be launched.
+    """
+#end class
+
+################################################
+#   Journal
+################################################
+class Journal(object):
+    """Journal file for runs launched but not PATCHed yet.
+
+    Each run is recorded as a json line {shard_name, <jobid_key>},
+    the file is written before the runs are launched
+    and removed once they are PATCHed.
+    """
+
+    def __init__(self, journal_dir, metawfr_uuid, jobid_key='jobid'):
+        """Constructor method.
+        Initialize object and attributes.
+
+        :param journal_dir: Directory for journal files
+        :type journal_dir: str or Path
+        :param metawfr_uuid: MetaWorkflowRun[portal] UUID
+        :type metawfr_uuid: str
+        :param jobid_key: Name of the WorkflowRun[obj] attribute for job ID
+            (jobid, or job_id in SMaHT)
+        :type jobid_key: str
+        """
+        self.path = Path(journal_dir).expanduser().joinpath('{0}.jsonl'.format(metawfr_uuid))
+        self.jobid_key = jobid_key
+    #end def
+
+    def write(self, runs):
+        """Append launched runs to journal file, flushed to disk once.
+
+        :param runs: shard_name ('name:shard') and job ID for each run
+        :type runs: list(tuple(str, str))
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('a') as file_handle:
+            for shard_name, jobid in runs:
+                file_handle.write(json.dumps({'shard_name': shard_name, self.jobid_key: jobid}) + '\n')
+            #end for
+            file_handle.flush()
+            os.fsync(file_handle.fileno())
+        #end with
+    #end def
+
+    def discard(self, shard_names):
+        """Remove runs from journal file, for runs that were not launched.
+        The file is rewritten and replaced, flushed to disk once.
+
+        :param shard_names: shard_names ('name:shard') of the runs to remove
+        :type shard_names: iterable(str)
+        """
+        shard_names = set(shard_names)
+        if not self.path.exists():
+            return
+        #end if
+        path_tmp = self.path.with_suffix('.tmp')
+        with self.path.open() as file_handle, path_tmp.open('w') as file_handle_tmp:
+            for line in file_handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError: # Partial line from an interrupted write
+                    continue
+                #end try
+                if entry.get('shard_name') not in shard_names:
+                    file_handle_tmp.write(json.dumps(entry) + '\n')
+                #end if
+            #end for
+            file_handle_tmp.flush()
+            os.fsync(file_handle_tmp.fileno())
+        #end with
+        os.replace(path_tmp, self.path)
+    #end def
+
+    def clear(self):
+        """Remove journal file, if any.
+        """
+        if self.path.exists():
+            self.path.unlink()
+        #end if
+    #end def
+
+    def restore(self, run_obj):
+        """Set runs recorded in journal file as running with their job ID.
+
+        Only runs still pending are restored, runs whose launch did not
+        actually start are later found as failed by status checks.
+        If no run is restored, the journal file is removed.
+
+        :param run_obj: MetaWorkflowRun[obj]
+        :type run_obj: object
+        :return: Whether any run was restored
+        :rtype: bool
+        """
+        result = False
+        if not self.path.exists():
+            return result
+        #end if
+        with self.path.open() as file_handle:
+            for line in file_handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError: # Partial line from an interrupted write
+                    continue
+                #end try
+                shard_name = entry.get('shard_name')
+                if shard_name not in run_obj.runs:
+                    continue
+                #end if
+                if run_obj.runs[shard_name].status == 'pending':
+                    run_obj.update_attribute(shard_name, 'status', 'running')
+                    run_obj.update_attribute(shard_name, self.jobid_key, entry[self.jobid_key])
+                    result = True
+                #end if
+            #end for
+        #end with
+        if not result:
+            self.clear()
+        #end if
+        return result
+    #end def
+
+#end class
+
+################################################
+#   Functions
+################################################
+def run_batches(run_obj, shard_inputs, patch, api_class, journal=None, sfn=None,
+                maxcount=None, batch_size=None, max_workers=None, retries=0, backoff=1.0):
+    """Launch runs from shard_inputs and PATCH once per batch.
+
+    Runs in a batch are written to the journal before they are
+    launched, the journal is cleared once the PATCH succeeded.
+
+    Runs that could not be launched are reset to pending and removed
+    from the journal, so that only runs launched are restored if the
+    PATCH fails. Runs launched are PATCHed, and
+    MetaWorkflowRunLaunchError is raised.
+
+    :param run_obj: MetaWorkflowRun[obj] updated by shard_inputs
+    :type run_obj: object
+    :param shard_inputs: shard_name and input for runs ready to launch,
+        see InputGenerator.shard_input_generator
+    :type shard_inputs: generator(str, dict)
+    :param patch: Function called without arguments to PATCH
+        current workflow_runs and final_status for run_obj
+    :type patch: function
+    :param api_class: Tibanna API class used to launch runs
+    :type api_class: class
+    :param journal: Journal for launched runs, if None runs are not recorded
+    :type journal: Journal or None
+    :param sfn: Step function name
+    :type sfn: str
+    :param maxcount: Maximum number of WorkflowRuns to launch
+    :type maxcount: int or None
+    :param batch_size: Maximum number of runs to launch per PATCH
+    :type batch_size: int or None
+    :param max_workers: Maximum number of concurrent launches,
+        if None runs are launched one at a time
+    :type max_workers: int or None
+    :param retries: Number of retries for a launch failed with a
+        transient error
+    :type retries: int
+    :param backoff: Seconds to wait before the first retry,
+        doubled at each retry
+    :type backoff: float
+    :raises ValueError: If a shard_name is not in run_obj
+    :raises MetaWorkflowRunLaunchError: If any run could not be launched
+    """
+    count = 0
+    while True:
+        batch = []
+        for shard_name, input_json in shard_inputs:
+            if shard_name not in run_obj.runs:
+                raise ValueError('Value error, shard_name {0} not found in MetaWorkflowRun\n'
+                                    .format(shard_name))
+            #end if
+            batch.append((shard_name, input_json))
+            count += 1
+            if maxcount and count >= maxcount:
+                break
+            #end if
+            if batch_size and len(batch) >= batch_size:
+                break
+            #end if
+        #end for
+        if not batch:
+            break
+        #end if
+        if journal:
+            journal.write([(shard_name, input_json['jobid']) for shard_name, input_json in batch])
+        #end if
+        errors = launch_runs([input_json for _, input_json in batch], api_class, sfn=sfn,
+                                max_workers=max_workers, retries=retries, backoff=backoff)
+        # Runs not launched are set back to pending, in launch order
+        failed = []
+        for (shard_name, _), error in zip(batch, errors):
+            if error is not None:
+                run_obj.reset_shard(shard_name)
+                failed.append((shard_name, error))
+            #end if
+        #end for
+        if journal and failed:
+            journal.discard(shard_name for shard_name, _ in failed)
+        #end if
+        patch()
+        if journal:
+            journal.clear()
+        #end if
+        if failed:
+            raise MetaWorkflowRunLaunchError('Could not launch runs: {0}'.format(
+                ', '.join('{0} ({1})'.format(shard_name, error) for shard_name, error in failed)))
+        #end if
+        if maxcount and count >= maxcount:
+            break
+        #end if
+    #end while
+#end def
+
+def launch_runs(inputs, api_class, sfn=None, max_workers=None, retries=0, backoff=1.0):
+    """Launch runs with tibanna, concurrently if max_workers is set.
+
+    No launch is started after the first failure, one at a time or
+    concurrently, the runs left are reported as not launched.
+    Concurrent launches already started when the failure happens
+    are completed.
+
+    :param inputs: Inputs for the runs to launch
+    :type inputs: list(dict)
+    :param api_class: Tibanna API class used to launch runs
+    :type api_class: class
+    :param sfn: Step function name
+    :type sfn: str
+    :param max_workers: Maximum number of concurrent launches
+    :type max_workers: int or None
+    :param retries: Number of retries for a launch failed with a
+        transient error
+    :type retries: int
+    :param backoff: Seconds to wait before the first retry
+    :type backoff: float
+    :return: Error for each input, None if the run was launched,
+        in the same order as inputs
+    :rtype: list(Exception or None)
+    """
+    failed = Event()
+
+    def launch(input_json):
+        if failed.is_set():
+            return MetaWorkflowRunLaunchError('Not launched after previous error')
+        #end if
+        try:
+            launch_run(input_json, api_class, sfn=sfn, retries=retries, backoff=backoff)
+        except Exception as e:
+            failed.set()
+            return e
+        #end try
+        return None
+    #end def
+
+    if max_workers and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(launch, inputs))
+        #end with
+    #end if
+    return [launch(input_json) for input_json in inputs]
+#end def
+
+def launch_run(input_json, api_class, sfn=None, retries=0, backoff=1.0):
+    """Launch a run with tibanna, retrying on transient errors.
+
+    Launches are not idempotent, tibanna starts a new execution
+    for each call. Only errors raised before the request is accepted
+    are retried (see is_transient), any other error is raised
+    immediately.
+
+    :param input_json: Input for the run
+    :type input_json: dict
+    :param api_class: Tibanna API class used to launch runs
+    :type api_class: class
+    :param sfn: Step function name
+    :type sfn: str
+    :param retries: Number of retries for a transient error
+    :type retries: int
+    :param backoff: Seconds to wait before the first retry,
+        doubled at each retry
+    :type backoff: float
+    :raises Exception: Error from tibanna, if not transient
+        or after the last retry
+    """
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        #end if
+        try:
+            api_class().run_workflow(input_json=input_json, sfn=sfn) # Start tibanna run
+            return
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            #end if
+        #end try
+    #end for
+#end def
+
+def is_transient(error):
+    """Check if a launch error is transient and can be retried:
+    throttling, or failure to connect or connection timeout.
+
+    Read timeouts and connections closed during the request are not
+    transient, as the run may have started anyway.
+
+    :param error: Launch error
+    :type error: Exception
+    :return: Whether error is transient
+    :rtype: bool
+    """
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in THROTTLING_CODES
+    #end if
+    return isinstance(error, (EndpointConnectionError, ConnectTimeoutError))
+#end def
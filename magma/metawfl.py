@@ -13,7 +13,8 @@
 #   Libraries
 ################################################
 import sys, os
-import copy
+from collections import deque
+from copy import deepcopy
 
 ################################################
 #   MetaWorkflow
@@ -22,16 +23,19 @@ class MetaWorkflow(object):
     """Class to represent a MetaWorkflow[json].
     """
 
-    def __init__(self, input_json):
+    def __init__(self, input_json, copy=True):
         """Constructor method.
         Initialize object and attributes.
 
         :param input_json: MetaWorkflow[json]
         :type input_json: dict
+        :param copy: Whether to copy input_json, set to False if
+            input_json is not used anymore by the caller
+        :type copy: bool
         """
 
         # Copy it so that the original does not get changed unexpectedly
-        input_json_ = copy.deepcopy(input_json)
+        input_json_ = deepcopy(input_json) if copy else input_json
 
         # Basic attributes
         for key in input_json_:
@@ -40,6 +44,8 @@ class MetaWorkflow(object):
         # Calculated attributes
         self.steps = {} #{step_obj.name: step_obj, ...}
         self._end_workflows = None
+        self._subgraph = set() #step_objects necessary to reach end_steps
+        self._shard_tables = {} #{dimension: shards, ...} for current write_run
 
         # Calculate attributes
         self._validate()
@@ -50,8 +56,16 @@ class MetaWorkflow(object):
     class StepWorkflow(object):
         """Class to represent a StepWorkflow[json]
         that is step of a MetaWorkflow[json].
+
+        Known fields are stored in __slots__,
+        any other key is stored in an overflow dictionary.
         """
 
+        _FIELDS = ('name', 'workflow', 'config', 'input', 'dependencies',
+                   'custom_pf_fields', 'custom_qc_fields', 'shards',
+                   'is_scatter', 'gather_from', 'gather_input', '_nodes')
+        __slots__ = _FIELDS + ('_extra',)
+
         def __init__(self, input_json):
             """Constructor method.
             Initialize object and attributes.
@@ -59,6 +73,7 @@ class MetaWorkflow(object):
             :param input_json: StepWorkflow[json]
             :type input_json: dict
             """
+            object.__setattr__(self, '_extra', None)
             # Basic attributes
             for key in input_json:
                 setattr(self, key, input_json[key])
@@ -92,6 +107,47 @@ class MetaWorkflow(object):
             #end if
         #end def
 
+        def __getattr__(self, key):
+            """Called only if key is not found in slots,
+            look for key in the overflow dictionary.
+            """
+            extra = object.__getattribute__(self, '_extra')
+            if extra and key in extra:
+                return extra[key]
+            #end if
+            raise AttributeError('\'StepWorkflow\' object has no attribute \'{0}\''
+                                    .format(key))
+        #end def
+
+        def __setattr__(self, key, val):
+            """Set key to val, in a slot if key is a known field
+            or in the overflow dictionary otherwise.
+            """
+            if key in self._FIELDS:
+                object.__setattr__(self, key, val)
+            else:
+                if self._extra is None:
+                    object.__setattr__(self, '_extra', {})
+                #end if
+                self._extra[key] = val
+            #end if
+        #end def
+
+        def __getstate__(self):
+            """Support for copy and pickle.
+            """
+            return {key: getattr(self, key) for key in self.__slots__
+                        if hasattr(self, key)}
+        #end def
+
+        def __setstate__(self, state):
+            """Support for copy and pickle.
+            """
+            for key, val in state.items():
+                object.__setattr__(self, key, val)
+            #end for
+        #end def
+
         def _validate(self):
             """
             """
@@ -171,12 +227,18 @@ class MetaWorkflow(object):
         :rtype: set(obj)
         """
         steps_ = set() #steps that are entry point to wfl_run
+        self._subgraph = set() #steps necessary to reach end_steps
         for end_step in end_steps:
             # Initialize queue with end_step
-            queue = [self.steps[end_step]]
+            queue = deque([self.steps[end_step]])
             # Reconstructing dependencies
+            #   each step is expanded only once
             while queue:
-                step_obj = queue.pop(0)
+                step_obj = queue.popleft()
+                if step_obj in self._subgraph:
+                    continue
+                #end if
+                self._subgraph.add(step_obj)
                 if step_obj.dependencies:
                     for dependency in step_obj.dependencies:
                         try:
@@ -201,7 +263,11 @@ class MetaWorkflow(object):
         The function will:
             - _build_run to build a graph structure for MetaWorkflow[json]
             - navigate the graph structure starting from StepWorkflow[obj]
-                that are entry points
+                that are entry points, adding a step as soon as
+                all its dependencies are satisfied (Kahn's algorithm)
+
+        Steps that are ready at the same time are sorted
+        by their position in workflows.
 
         :param end_steps: List of names for finals StepWorkflow[obj] to
             use while building the graph structure
@@ -210,30 +276,44 @@ class MetaWorkflow(object):
         :rtype: list(object)
         """
         steps_ = []
-        queue = list(self._build_run(end_steps))
+        position = {name: i for i, name in enumerate(self.steps)}
+        sort_key = lambda step_obj: position[step_obj.name]
+        entry_steps = self._build_run(end_steps)
+        # Number of dependencies still to satisfy for each step
+        indegree = {step_obj: len(step_obj.dependencies) for step_obj in self._subgraph}
+        queue = deque(sorted(entry_steps, key=sort_key))
         while queue:
-            step_obj = queue.pop(0)
-            # Adding next steps to queue
-            for node in step_obj._nodes:
-                if node not in steps_ and node not in queue:
-                    queue.append(node)
+            step_obj = queue.popleft()
+            steps_.append(step_obj)
+            # Adding next steps to queue if all dependencies are satisfied
+            #   _nodes may contain steps from previous calls,
+            #   only consider steps necessary to reach end_steps
+            for node in sorted(step_obj._nodes, key=sort_key):
+                if node in indegree:
+                    indegree[node] -= 1
+                    if not indegree[node]:
+                        queue.append(node)
+                    #end if
                 #end if
             #end for
-            # Checking if dependencies are satisfied already and step can be added to steps_
-            is_dependencies = True
-            if step_obj.dependencies:
-                for dependency in step_obj.dependencies:
-                    if self.steps[dependency] not in steps_:
-                        is_dependencies = False
-                        queue.append(step_obj)
-                        break
+        #end while
+        if len(steps_) != len(indegree):
+            # Steps left have unsatisfied dependencies,
+            #   trim steps that are only downstream of the cycle
+            cycle = set(step_obj for step_obj in indegree if indegree[step_obj])
+            is_trimmed = True
+            while is_trimmed:
+                is_trimmed = False
+                for step_obj in list(cycle):
+                    if not step_obj._nodes & cycle:
+                        cycle.remove(step_obj)
+                        is_trimmed = True
                     #end if
                 #end for
-            #end if
-            if is_dependencies:
-                steps_.append(step_obj)
-            #end if
-        #end while
+            #end while
+            raise ValueError('Validation error, circular dependency detected between steps "{0}"\n'
+                                .format('", "'.join(sorted(step_obj.name for step_obj in cycle))))
+        #end if
         return steps_
     #end def
 
@@ -245,21 +325,13 @@ class MetaWorkflow(object):
         :return: Input dimensions
         :rtype: dict
         """
-        input_dimensions = {}
-        input_dimensions.setdefault(1, [len(input_structure)])
+        input_dimensions = {1: [len(input_structure)]}
         if isinstance(input_structure[0], list):
-            input_dimensions.setdefault(2, [])
-            for i in input_structure:
-                input_dimensions[2].append(len(i))
-                if isinstance(i[0], list):
-                    input_dimensions.setdefault(3, [])
-                    d_ = []
-                    for ii in i:
-                        d_.append(len(ii))
-                    #end for
-                    input_dimensions[3].append(d_)
-                #end if
-            #end for
+            input_dimensions[2] = [len(i) for i in input_structure]
+            dimension_3 = [[len(ii) for ii in i] for i in input_structure if isinstance(i[0], list)]
+            if dimension_3:
+                input_dimensions[3] = dimension_3
+            #end if
         #end if
         return input_dimensions
     #end def
@@ -274,28 +346,83 @@ class MetaWorkflow(object):
         :return: List of shards
         :rtype: list(str)
         """
-        shards = []
+        return [list(s) for s in self._build_shard_table(input_dimensions, dimension)]
+    #end def
+
+    def _shard_table(self, input_dimensions, dimension):
+        """Given input_dimensions get shards for specified dimension as tuples.
+        Shards are calculated once for each dimension and reused
+        for the current write_run.
+
+        :param input_dimensions: Input dimensions
+        :type input_dimensions: dict
+        :param dimension: Dimension to get shards for
+        :type dimension: int [1|2|3]
+        :return: Shards
+        :rtype: tuple(tuple(str))
+        """
+        if dimension not in self._shard_tables:
+            self._shard_tables[dimension] = self._build_shard_table(input_dimensions, dimension)
+        #end if
+        return self._shard_tables[dimension]
+    #end def
+
+    def _build_shard_table(self, input_dimensions, dimension):
+        """Given input_dimensions calculate shards for specified dimension as tuples.
+        Indexes are converted to strings only once.
+
+        :param input_dimensions: Input dimensions
+        :type input_dimensions: dict
+        :param dimension: Dimension to calculate shards for
+        :type dimension: int [1|2|3]
+        :return: Shards
+        :rtype: tuple(tuple(str))
+        """
         input_dimension = input_dimensions[dimension]
         if dimension == 1: #1st dimension
-            for i in range(input_dimension[0]):
-                shards.append([str(i)])
-            #end for
-        elif dimension == 2: #2nd dimension
-            for i, d in enumerate(input_dimension):
-                for ii in range(d):
-                    shards.append([str(i), str(ii)])
-                #end for
-            #end for
+            return tuple((str(i),) for i in range(input_dimension[0]))
+        #end if
+        # Strings for all the indexes used in shards
+        sizes = [len(input_dimension)]
+        if dimension == 2: #2nd dimension
+            sizes.extend(input_dimension)
         else: #3rd dimension
-            for i, d in enumerate(input_dimension):
-                for ii, dd in enumerate(d):
-                    for iii in range(dd):
-                        shards.append([str(i), str(ii), str(iii)])
-                    #end for
-                #end for
+            for d in input_dimension:
+                sizes.append(len(d))
+                sizes.extend(d)
             #end for
         #end if
-        return shards
+        labels = [str(i) for i in range(max(sizes))]
+        if dimension == 2:
+            return tuple((labels[i], labels[ii])
+                            for i, d in enumerate(input_dimension)
+                                for ii in range(d))
+        #end if
+        return tuple((labels[i], labels[ii], labels[iii])
+                        for i, d in enumerate(input_dimension)
+                            for ii, dd in enumerate(d)
+                                for iii in range(dd))
+    #end def
+
+    def _shard_prefix_index(self, shards, length, values=None):
+        """Group shards, or values corresponding to shards,
+        by the shard prefix of specified length.
+
+        :param shards: Shards
+        :type shards: list
+        :param length: Length of the prefix
+        :type length: int
+        :param values: Values to group, one for each shard,
+            if None shards are grouped
+        :type values: list
+        :return: Shards or values by prefix, in the original order
+        :rtype: dict {tuple(str): list}
+        """
+        index = {}
+        for s, value in zip(shards, values if values is not None else shards):
+            index.setdefault(tuple(s[:length]), []).append(value)
+        #end for
+        return index
     #end def
 
     def _shards_dimension(self, shards):
@@ -334,6 +461,7 @@ class MetaWorkflow(object):
         scatter = {} #{step_obj.name: dimension, ...}
         fixed_shards = {} #{step_obj.name: shards, ...}
         dimensions = self._input_dimensions(input_structure)
+        self._shard_tables = {}
         steps_ = self._order_run(end_steps)
         run_json = {
             'meta_workflow': self.uuid,
@@ -342,9 +470,6 @@ class MetaWorkflow(object):
             'final_status': 'pending'
         }
         for step_obj in steps_:
-            run_step = {}
-            run_step.setdefault('name', step_obj.name)
-            run_step.setdefault('status', 'pending')
             # Check scatter
             #   If is_scatter or dependency in scatter
             #       but not in gather_from
@@ -388,43 +513,54 @@ class MetaWorkflow(object):
                 shards = step_obj.shards
                 fixed_shards.setdefault(step_obj.name, shards)
             elif scatter_dimension:
-                shards = self._shards(dimensions, scatter_dimension)
+                shards = self._shard_table(dimensions, scatter_dimension)
             else: shards = [['0']] #no scatter, only one shard
             #end if
+            # Collect gathered dependencies once for all shards
+            #   {dependency: (all dependencies, dependencies by prefix), ...}
+            gathered = {}
+            for dependency in step_obj.dependencies:
+                # Check gather
+                #   If dependency in gather_from or gather_input,
+                #       dependencies must be aggregated from scatter
+                gather_from_ = None
+                if dependency in step_obj.gather_from:
+                    gather_from_ = step_obj.gather_from
+                elif dependency in step_obj.gather_input:
+                    gather_from_ = step_obj.gather_input
+                #end if
+                if gather_from_:
+                    # Check if the previous step is fixed_shards
+                    #   if so get shards from there
+                    if dependency in fixed_shards:
+                        shards_gather = fixed_shards[dependency]
+                    else:
+                        # If the previous step is NOT in fixed_shards
+                        #   get shards for original scatter dimension
+                        shards_gather = self._shard_table(dimensions, scatter[dependency])
+                    #end if
+                    # Reducing dimension organically to gather
+                    gather_dimension = self._shards_dimension(shards_gather) - gather_from_[dependency]
+                    dependencies_ = ['{0}:{1}'.format(dependency, ':'.join(s_g)) for s_g in shards_gather]
+                    if scatter_dimension == 0 or \
+                        scatter_dimension > gather_dimension: #gather all from that dependency
+                        gathered[dependency] = (dependencies_, None)
+                    else: #gather only corresponding subset
+                        gathered[dependency] = (None,
+                            self._shard_prefix_index(shards_gather, scatter_dimension, dependencies_))
+                    #end if
+                #end if
+            #end for
             for s in shards:
-                run_step_ = copy.deepcopy(run_step)
-                run_step_.setdefault('shard', ':'.join(s))
+                run_step_ = {'name': step_obj.name, 'status': 'pending', 'shard': ':'.join(s)}
                 for dependency in sorted(step_obj.dependencies):
                     run_step_.setdefault('dependencies', [])
-                    # Check gather
-                    #   If dependency in gather_from or gather_input,
-                    #       dependencies must be aggregated from scatter
-                    gather_from_ = None
-                    if dependency in step_obj.gather_from:
-                        gather_from_ = step_obj.gather_from
-                    elif dependency in step_obj.gather_input:
-                        gather_from_ = step_obj.gather_input
-                    #end if
-                    if gather_from_:
-                        # Check if the previous step is fixed_shards
-                        #   if so get shards from there
-                        if dependency in fixed_shards:
-                            shards_gather = fixed_shards[dependency]
-                        else:
-                            # If the previous step is NOT in fixed_shards
-                            #   get shards for original scatter dimension
-                            shards_gather = self._shards(dimensions, scatter[dependency])
+                    if dependency in gathered:
+                        dependencies_, by_prefix = gathered[dependency]
+                        if by_prefix is not None:
+                            dependencies_ = by_prefix.get(tuple(s), [])
                         #end if
-                        # Reducing dimension organically to gather
-                        gather_dimension = self._shards_dimension(shards_gather) - gather_from_[dependency]
-                        for s_g in shards_gather:
-                            if scatter_dimension == 0 or \
-                                scatter_dimension > gather_dimension: #gather all from that dependency
-                                run_step_['dependencies'].append('{0}:{1}'.format(dependency, ':'.join(s_g)))
-                            elif s_g[:scatter_dimension] == s: #gather only corresponding subset
-                                run_step_['dependencies'].append('{0}:{1}'.format(dependency, ':'.join(s_g)))
-                            #end if
-                        #end for
+                        run_step_['dependencies'].extend(dependencies_)
                     else:
                         run_step_['dependencies'].append('{0}:{1}'.format(dependency, ':'.join(s)))
                     #end if
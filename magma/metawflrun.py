@@ -13,7 +13,7 @@
 #   Libraries
 ################################################
 import sys, os
-import copy
+from copy import deepcopy
 
 ################################################
 #   MetaWorkflowRun
@@ -22,15 +22,18 @@ class MetaWorkflowRun(object):
     """Class to represent a MetaWorkflowRun[json].
     """
 
-    def __init__(self, input_json):
+    def __init__(self, input_json, copy=True):
         """Constructor method.
         Initialize object and attributes.
 
         :param input_json: MetaWorkflowRun[json]
         :type input_json: dict
+        :param copy: Whether to copy input_json, set to False if
+            input_json is not used anymore by the caller
+        :type copy: bool
         """
         # Copy it so that the original does not get changed unexpectedly
-        input_json_ = copy.deepcopy(input_json)
+        input_json_ = deepcopy(input_json) if copy else input_json
 
         # Basic attributes
         for key in input_json_:
@@ -38,16 +41,44 @@ class MetaWorkflowRun(object):
         #end for
         # Calculated attributes
         self.runs = {} #{run_obj.shard_name: run_obj, ...}
+        # Run table, each run has an integer id
+        #   that is its index in workflow_runs,
+        #   columns are lists indexed by id
+        #   and need to be updated through update_attribute
+        self._shard_names = [] #[run_obj.shard_name, ...]
+        self._statuses = [] #[run_obj.status, ...]
+        self._ids = {} #{run_obj.shard_name: id, ...}
+        self._step_ids = {} #{run_obj.name: [id, ...], ...} ids in workflow_runs order
+        # Indexes to track dependencies, by id
+        self._dependents = [] #[[id, ...], ...] ids of runs that depend on the run
+        self._unfinished = [] #[int, ...] number of dependencies not completed yet
+        self._ready = set() #ids of pending runs with completed dependencies
+        self._status_count = {} #{status: int, ...} number of runs for each status
+        # Serialization cache for workflow_runs
+        self._runs_json = None #[run_json, ...] in workflow_runs order
+        self._dirty = set() #ids of runs changed since last runs_to_json
 
         # Calculate attributes
         self._validate()
         self._read_runs()
+        self._index_runs()
     #end def
 
     class WorkflowRun(object):
         """Class to represent a WorkflowRun[json].
+
+        Known fields are stored in __slots__, any other key is stored
+        in an overflow dictionary. The order keys are set is tracked
+        so that to_json returns keys in the same order as input_json.
         """
 
+        _FIELDS = ('name', 'status', 'shard', 'dependencies', 'output',
+                   'jobid', 'job_id', 'workflow_run')
+        __slots__ = _FIELDS + ('shard_name', '_keys', '_extra', '_output_index')
+
+        # Interned key orders, shared between objects with the same keys
+        _key_orders = {} #{(key, ...): (key, ...), ...}
+
         def __init__(self, input_json):
             """Constructor method.
             Initialize object and attributes.
@@ -55,20 +86,140 @@ class MetaWorkflowRun(object):
             :param input_json: WorkflowRun[json]
             :type input_json: dict
             """
+            set_ = object.__setattr__
+            set_(self, '_extra', None)
+            set_(self, '_output_index', None)
             # Basic attributes
-            for key in input_json:
-                setattr(self, key, input_json[key])
+            keys = tuple(input_json)
+            for key in keys:
+                self._set(key, input_json[key])
             #end for
-            if not getattr(self, 'output', None):
-                self.output = []
+            if not input_json.get('output'):
+                set_(self, 'output', [])
+                if 'output' not in keys: keys += ('output',)
             #end if
-            if not getattr(self, 'dependencies', None):
-                self.dependencies = []
+            if not input_json.get('dependencies'):
+                set_(self, 'dependencies', [])
+                if 'dependencies' not in keys: keys += ('dependencies',)
             #end if
+            set_(self, '_keys', self._key_orders.setdefault(keys, keys))
             # Validate
             self._validate()
             # Calculated attributes
-            self.shard_name = self.name + ':' + self.shard
+            set_(self, 'shard_name', self.name + ':' + self.shard)
+        #end def
+
+        def _set(self, key, val):
+            """Set key to val, in a slot if key is a known field
+            or in the overflow dictionary otherwise.
+            """
+            if key in self._FIELDS:
+                object.__setattr__(self, key, val)
+            else:
+                if self._extra is None:
+                    object.__setattr__(self, '_extra', {})
+                #end if
+                self._extra[key] = val
+            #end if
+        #end def
+
+        def __getattr__(self, key):
+            """Called only if key is not found in slots,
+            look for key in the overflow dictionary.
+            """
+            extra = object.__getattribute__(self, '_extra')
+            if extra and key in extra:
+                return extra[key]
+            #end if
+            raise AttributeError('\'WorkflowRun\' object has no attribute \'{0}\''
+                                    .format(key))
+        #end def
+
+        def __setattr__(self, key, val):
+            """Set attribute and keep track of key order.
+            """
+            if key in self.__slots__ and key not in self._FIELDS:
+                object.__setattr__(self, key, val)
+                return
+            #end if
+            self._set(key, val)
+            if key == 'output':
+                # Output is set when the run is checked,
+                #   build the index now that is going to be used
+                #   by the runs that depend on this one
+                object.__setattr__(self, '_output_index', None)
+                self.output_index()
+            #end if
+            keys = self._keys
+            if key not in keys:
+                keys += (key,)
+                object.__setattr__(self, '_keys', self._key_orders.setdefault(keys, keys))
+            #end if
+        #end def
+
+        def __delattr__(self, key):
+            """Delete attribute and remove key from key order.
+            """
+            if key in self._FIELDS:
+                object.__delattr__(self, key)
+            elif self._extra and key in self._extra:
+                del self._extra[key]
+            else:
+                raise AttributeError(key)
+            #end if
+            if key == 'output':
+                object.__setattr__(self, '_output_index', None)
+            #end if
+            keys = tuple(k for k in self._keys if k != key)
+            object.__setattr__(self, '_keys', self._key_orders.setdefault(keys, keys))
+        #end def
+
+        def __getstate__(self):
+            """Support for copy and pickle.
+            """
+            return {key: getattr(self, key) for key in self.__slots__
+                        if hasattr(self, key)}
+        #end def
+
+        def __setstate__(self, state):
+            """Support for copy and pickle.
+            """
+            for key, val in state.items():
+                object.__setattr__(self, key, val)
+            #end for
+        #end def
+
+        def output_index(self):
+            """Index output by argument_name.
+            The index is built when output is set, or when first requested
+            for output from input_json.
+
+            :return: Output by argument_name, keeps the first match
+            :rtype: dict
+            """
+            if self._output_index is None:
+                output_index = {}
+                for arg in getattr(self, 'output', None) or []:
+                    output_index.setdefault(arg['argument_name'], arg)
+                #end for
+                object.__setattr__(self, '_output_index', output_index)
+            #end if
+            return self._output_index
+        #end def
+
+        def to_json(self):
+            """
+            :return: WorkflowRun[json]
+            :rtype: dict
+            """
+            run_json = {}
+            for key in self._keys:
+                val = getattr(self, key, None)
+                if val:
+                    run_json[key] = val
+                #end if
+            #end for
+            return run_json
         #end def
 
         def _validate(self):
@@ -114,6 +265,82 @@ class MetaWorkflowRun(object):
         #end for
     #end def
 
+    def _index_runs(self):
+        """Build run table, indexes for dependencies and status counts
+        from current WorkflowRun[obj] in runs.
+        """
+        self._shard_names = list(self.runs)
+        self._statuses = [run_obj.status for run_obj in self.runs.values()]
+        self._ids = {shard_name: idx for idx, shard_name in enumerate(self._shard_names)}
+        self._step_ids = {}
+        self._dependents = [[] for _ in self._shard_names]
+        self._unfinished = [0] * len(self._shard_names)
+        self._ready = set()
+        self._status_count = {}
+        for idx, run_obj in enumerate(self.runs.values()):
+            self._step_ids.setdefault(run_obj.name, []).append(idx)
+            self._status_count[run_obj.status] = self._status_count.get(run_obj.status, 0) + 1
+        #end for
+        for idx, run_obj in enumerate(self.runs.values()):
+            unfinished = 0
+            for shard_name_ in run_obj.dependencies:
+                idx_ = self._ids.get(shard_name_)
+                if idx_ is None:
+                    # Missing dependency, can never be completed
+                    unfinished += 1
+                    continue
+                #end if
+                self._dependents[idx_].append(idx)
+                if self._statuses[idx_] != 'completed':
+                    unfinished += 1
+                #end if
+            #end for
+            self._unfinished[idx] = unfinished
+            if run_obj.status == 'pending' and not unfinished:
+                self._ready.add(idx)
+            #end if
+        #end for
+    #end def
+
+    def _update_index(self, idx, status):
+        """Update run table, dependencies indexes and status counts
+        for WorkflowRun[obj] changing status.
+
+        :param idx: WorkflowRun[obj] id
+        :type idx: int
+        :param status: New status
+        :type status: str
+        """
+        status_ = self._statuses[idx]
+        if status_ == status:
+            return
+        #end if
+        self._statuses[idx] = status
+        # Update status counts
+        self._status_count[status_] -= 1
+        self._status_count[status] = self._status_count.get(status, 0) + 1
+        # Update the run itself
+        if status == 'pending' and not self._unfinished[idx]:
+            self._ready.add(idx)
+        else:
+            self._ready.discard(idx)
+        #end if
+        # Propagate to runs that depend on the run
+        if status == 'completed':
+            for idx_ in self._dependents[idx]:
+                self._unfinished[idx_] -= 1
+                if not self._unfinished[idx_] and self._statuses[idx_] == 'pending':
+                    self._ready.add(idx_)
+                #end if
+            #end for
+        elif status_ == 'completed':
+            for idx_ in self._dependents[idx]:
+                self._unfinished[idx_] += 1
+                self._ready.discard(idx_)
+            #end for
+        #end if
+    #end def
+
     def to_run(self):
         """Find all pending WorkflowRun[obj] that completed
         dependencies and are ready to run.
@@ -122,22 +349,31 @@ class MetaWorkflowRun(object):
             dependencies and are ready to run
         :rtype: list(object)
         """
-        runs_ = []
-        for _, run_obj in self.runs.items():
-            if run_obj.status == 'pending':
-                is_dependencies = True
-                # Check dependencies are completed
-                for shard_name_ in run_obj.dependencies:
-                    if self.runs[shard_name_].status != 'completed':
-                        is_dependencies = False
-                        break
-                    #end if
-                #end for
-                if is_dependencies: runs_.append(run_obj)
-                #end if
-            #end if
-        #end for
-        return runs_
+        return [self.runs[self._shard_names[idx]] for idx in sorted(self._ready)]
+    #end def
+
+    def is_ready(self, shard_name):
+        """Check if WorkflowRun[obj] is pending
+        and completed dependencies.
+
+        :param shard_name: WorkflowRun[obj] shard_name ('name:shard')
+        :type shard_name: str
+        :return: True if WorkflowRun[obj] is ready to run
+        :rtype: bool
+        """
+        return self._ids.get(shard_name) in self._ready
+    #end def
+
+    def step_runs(self, step_name):
+        """Find all WorkflowRun[obj] corresponding to step specified by step_name.
+
+        :param step_name: Name of the step
+        :type step_name: str
+        :return: List of WorkflowRun[obj] for the step,
+            in workflow_runs order
+        :rtype: list(object)
+        """
+        return [self.runs[self._shard_names[idx]] for idx in self._step_ids.get(step_name, [])]
     #end def
 
     def running(self):
@@ -148,9 +384,9 @@ class MetaWorkflowRun(object):
         :rtype: list(object)
         """
         runs_ = []
-        for _, run_obj in self.runs.items():
-            if run_obj.status == 'running':
-                runs_.append(run_obj)
+        for idx, status in enumerate(self._statuses):
+            if status == 'running':
+                runs_.append(self.runs[self._shard_names[idx]])
             #end if
         #end for
         return runs_
@@ -158,6 +394,8 @@ class MetaWorkflowRun(object):
 
     def update_attribute(self, shard_name, attribute, value):
         """Update attribute value for WorkflowRun[obj] in runs.
+        Status must be updated through this method
+        to keep dependencies indexes consistent.
 
         :param shard_name: WorkflowRun[obj] shard_name ('name:shard')
         :type shard_name: str
@@ -165,26 +403,71 @@ class MetaWorkflowRun(object):
         :type attribute: str
         :param value: new value for attribute
         """
-        setattr(self.runs[shard_name], attribute, value)
+        run_obj = self.runs[shard_name]
+        idx = self._ids[shard_name]
+        self._mark_dirty(idx)
+        if attribute == 'status':
+            setattr(run_obj, attribute, value)
+            self._update_index(idx, value)
+        else:
+            setattr(run_obj, attribute, value)
+            if attribute == 'dependencies':
+                self._index_runs()
+            #end if
+        #end if
     #end def
 
-    def runs_to_json(self):
+    def replace_run(self, run_obj):
+        """Replace WorkflowRun[obj] in runs with run_obj,
+        matching by shard_name.
+
+        :param run_obj: WorkflowRun[obj] to use as replacement
+        :type run_obj: object
+        """
+        shard_name = run_obj.shard_name
+        run_obj_ = self.runs[shard_name]
+        self.runs[shard_name] = run_obj
+        idx = self._ids[shard_name]
+        self._mark_dirty(idx)
+        if run_obj.dependencies != run_obj_.dependencies:
+            self._index_runs()
+        else:
+            self._update_index(idx, run_obj.status)
+        #end if
+    #end def
+
+    def _mark_dirty(self, idx):
+        """Flag WorkflowRun[obj] as changed for serialization.
+
+        :param idx: WorkflowRun[obj] id
+        :type idx: int
         """
+        self._dirty.add(idx)
+    #end def
+
+    def runs_to_json(self):
+        """Serialize WorkflowRun[obj] in workflow_runs order.
+        Serialization is cached and only changed runs are rebuilt.
+
+        The list is a new one at each call, but dictionaries of runs
+        not changed are the same objects across calls and are shared
+        with the cache, they must be treated as read-only.
+        Use to_json to get dictionaries that can be modified.
+
         :return: List of dictionaries for workflow_runs
         :rtype: list(dict)
         """
-        runs_ = []
-        for run in self.workflow_runs: #used to get the right order
-            run_ = {}
-            shard_name = run['name'] + ':' + run['shard']
-            for key, val in vars(self.runs[shard_name]).items():
-                if val and key != 'shard_name':
-                    run_.setdefault(key, val)
-                #end if
+        if self._runs_json is None:
+            # runs follow workflow_runs order
+            self._runs_json = [run_obj.to_json() for run_obj in self.runs.values()]
+        else:
+            for idx in self._dirty:
+                self._runs_json[idx] = self.runs[self._shard_names[idx]].to_json()
             #end for
-            runs_.append(run_)
-        #end for
-        return runs_
+        #end if
+        self._dirty = set()
+        # Return a copy so that lists returned earlier are not changed
+        return list(self._runs_json)
     #end def
 
     def to_json(self):
@@ -194,13 +477,15 @@ class MetaWorkflowRun(object):
         """
         run_json = {}
         # Get attributes
+        #   skip runs and calculated attributes used as indexes
         for key, val in vars(self).items():
-            if key != 'runs':
+            if key != 'runs' and not key.startswith('_'):
                 run_json.setdefault(key, val)
             #end if
         #end for
-        # Get updated workflow_runs from current WorkflowRun objects
-        run_json['workflow_runs'] = self.runs_to_json()
+        # Get updated workflow_runs from current WorkflowRun objects,
+        #   copied so that the serialization cache is not changed
+        run_json['workflow_runs'] = [dict(run_json_) for run_json_ in self.runs_to_json()]
         return run_json
     #end def
 
@@ -212,8 +497,8 @@ class MetaWorkflowRun(object):
         """
         run_obj = self.runs[shard_name]
         # Reset run_obj
-        run_obj.output = []
-        run_obj.status = 'pending'
+        self.update_attribute(shard_name, 'output', [])
+        self.update_attribute(shard_name, 'status', 'pending')
         if getattr(run_obj, 'jobid', None):
             delattr(run_obj, 'jobid')
         #end if
@@ -226,11 +511,9 @@ class MetaWorkflowRun(object):
         :param step_name: Name of the step to reset
         :type step_name: str
         """
-        for shard_name_ in self.runs:
-            if step_name == shard_name_.split(':')[0]:
-                # Reset run_obj
-                self._reset_run(shard_name_)
-            #end if
+        for idx in self._step_ids.get(step_name, []):
+            # Reset run_obj
+            self._reset_run(self._shard_names[idx])
         #end for
     #end def
 
@@ -241,12 +524,70 @@ class MetaWorkflowRun(object):
         :param shard_name: WorkflowRun[obj] shard_name ('name:shard')
         :type shard_name: str
         """
-        for shard_name_ in self.runs:
-            if shard_name == shard_name_:
-                # Reset run_obj
-                self._reset_run(shard_name_)
+        if shard_name in self.runs:
+            # Reset run_obj
+            self._reset_run(shard_name)
+        #end if
+    #end def
+
+    def downstream(self, shards_name):
+        """Find all WorkflowRun[obj] that depend, directly or indirectly,
+        on WorkflowRun[obj] specified by shards_name.
+
+        :param shards_name: WorkflowRun[obj] shard_names ('name:shard')
+        :type shards_name: iterable(str)
+        :return: Set of shard_names for WorkflowRun[obj] downstream
+            of shards_name, shards_name not included
+        :rtype: set(str)
+        """
+        ids = set(self._ids[shard_name] for shard_name in shards_name if shard_name in self._ids)
+        downstream_, queue = set(), list(ids)
+        while queue:
+            for idx in self._dependents[queue.pop()]:
+                if idx not in downstream_ and idx not in ids:
+                    downstream_.add(idx)
+                    queue.append(idx)
+                #end if
+            #end for
+        #end while
+        return set(self._shard_names[idx] for idx in downstream_)
+    #end def
+
+    def reset_runs(self, steps_name=None, shards_name=None, downstream=False):
+        """Reset attributes value for WorkflowRun[obj] in runs.
+        Reset all WorkflowRun[obj] corresponding to steps specified by steps_name
+        and WorkflowRun[obj] specified by shards_name.
+
+        :param steps_name: Names of the steps to reset
+        :type steps_name: iterable(str)
+        :param shards_name: WorkflowRun[obj] shard_names ('name:shard') to reset
+        :type shards_name: iterable(str)
+        :param downstream: Whether to also reset WorkflowRun[obj] that depend,
+            directly or indirectly, on the runs to reset
+        :type downstream: bool
+        :return: shard_names for WorkflowRun[obj] that have been reset,
+            in workflow_runs order
+        :rtype: list(str)
+        """
+        to_reset = set()
+        for step_name in steps_name or []:
+            to_reset.update(self._step_ids.get(step_name, []))
+        #end for
+        for shard_name in shards_name or []:
+            if shard_name in self._ids:
+                to_reset.add(self._ids[shard_name])
             #end if
         #end for
+        if downstream:
+            to_reset.update(self._ids[shard_name]
+                                for shard_name in self.downstream(self._shard_names[idx] for idx in to_reset))
+        #end if
+        to_reset = [self._shard_names[idx] for idx in sorted(to_reset)]
+        for shard_name in to_reset:
+            # Reset run_obj
+            self._reset_run(shard_name)
+        #end for
+        return to_reset
     #end def
 
     def update_status(self): # failed -> running -> completed
@@ -254,29 +595,25 @@ class MetaWorkflowRun(object):
         If at least one is failed, set final_status as failed.
         If no failed and at least one is running, set final_status as running.
         If all are completed set final_status as completed.
+        If some are completed and none is failed or running,
+        set final_status as inactive.
 
         :return: final_status
         :rtype: str
         """
-        self.final_status = 'pending' # initial set to pending
-        all_completed = True
-        is_completed = False
-        for _, run_obj in self.runs.items():
-            if run_obj.status != 'completed':
-                all_completed = False
-                if run_obj.status == 'failed':
-                    self.final_status = 'failed'
-                    break
-                elif run_obj.status == 'running':
-                    self.final_status = 'running'
-                #end if
-            else: is_completed = True
-            #end if
-        #end for
-        if all_completed:
+        # Use status counts kept updated by update_attribute
+        completed = self._status_count.get('completed', 0)
+        if self._status_count.get('failed', 0):
+            self.final_status = 'failed'
+        elif completed == len(self.runs):
             self.final_status = 'completed'
-        elif self.final_status == 'pending' and is_completed:
+        elif self._status_count.get('running', 0):
+            self.final_status = 'running'
+        elif completed:
+            # Some completed but nothing running
             self.final_status = 'inactive'
+        else:
+            self.final_status = 'pending'
         #end if
         return self.final_status
     #end def
@@ -42,9 +42,7 @@ class RunUpdate(object):
         :return: Updated workflow_runs and final_status information
         :rtype: dict
         """
-        for name in steps_name:
-            self.wflrun_obj.reset_step(name)
-        #end for
+        self.wflrun_obj.reset_runs(steps_name=steps_name)
         return {'final_status':  self.wflrun_obj.update_status(),
                 'workflow_runs': self.wflrun_obj.runs_to_json()}
     #end def
@@ -57,9 +55,26 @@ class RunUpdate(object):
         :return: Updated workflow_runs and final_status information
         :rtype: dict
         """
-        for name in shards_name:
-            self.wflrun_obj.reset_shard(name)
-        #end for
+        self.wflrun_obj.reset_runs(shards_name=shards_name)
+        return {'final_status':  self.wflrun_obj.update_status(),
+                'workflow_runs': self.wflrun_obj.runs_to_json()}
+    #end def
+
+    def reset_runs(self, steps_name=None, shards_name=None, downstream=False):
+        """Reset WorkflowRun[obj] corresponding to step in steps_name
+        and WorkflowRun[obj] with shard_name in shards_name.
+
+        :param steps_name: List of names for steps that need to be reset
+        :type steps_name: list(str)
+        :param shards_name: List of shard_names for WorkflowRun[obj] that need to be reset
+        :type shards_name: list(str)
+        :param downstream: Whether to also reset WorkflowRun[obj] that depend,
+            directly or indirectly, on the runs to reset
+        :type downstream: bool
+        :return: Updated workflow_runs and final_status information
+        :rtype: dict
+        """
+        self.wflrun_obj.reset_runs(steps_name, shards_name, downstream)
         return {'final_status':  self.wflrun_obj.update_status(),
                 'workflow_runs': self.wflrun_obj.runs_to_json()}
     #end def
@@ -85,18 +100,14 @@ class RunUpdate(object):
             queue = [] # queue of steps to import
                        #    name step and its dependencies
             # Get workflow-runs corresponding to name step
-            for shard_name, run_obj in self.wflrun_obj.runs.items():
-                if name == shard_name.split(':')[0]:
-                    queue.append(run_obj)
-                #end if
-            #end for
+            queue.extend(self.wflrun_obj.step_runs(name))
             # Iterate queue, get dependencies and import workflow-runs
             while queue:
                 run_obj = queue.pop(0)
                 shard_name = run_obj.shard_name
                 dependencies = run_obj.dependencies
                 try:
-                    self.wflrun_obj.runs[shard_name] = wflrun_obj.runs[shard_name]
+                    self.wflrun_obj.replace_run(wflrun_obj.runs[shard_name])
                 except KeyError as e:
                     # raise ValueError('JSON content error, missing information for workflow-run "{0}"\n'
                     #                     .format(e.args[0]))
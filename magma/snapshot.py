@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   Columnar snapshot of workflow_runs
+#       for many MetaWorkflowRun[json]
+#
+################################################
+
+################################################
+#   Libraries
+################################################
+import sys, os
+from array import array
+from collections import Counter
+from itertools import compress
+
+################################################
+#   RunSnapshot
+################################################
+class RunSnapshot(object):
+    """Class to flatten workflow_runs from many MetaWorkflowRun[json]
+    into columns, one row for each WorkflowRun[json].
+
+    Columns with few distinct values (CATEGORICAL) are stored
+    as integer codes in arrays, together with the list of their values.
+    Other columns are stored as lists, dependencies as counts.
+    Columns can be exported with to_pydict, the format can be
+    used directly to create a pyarrow.Table or numpy arrays.
+    """
+
+    CATEGORICAL = ('metawfr', 'final_status', 'name', 'status')
+    COLUMNS = CATEGORICAL + ('shard', 'jobid', 'workflow_run', 'dependencies')
+
+    def __init__(self, input_jsons=None):
+        """Constructor method.
+        Initialize object and attributes.
+
+        :param input_jsons: MetaWorkflowRun[json] to add
+        :type input_jsons: list(dict)
+        """
+        # Categorical columns
+        self._codes = {} #{column: array of codes, ...}
+        self._values = {} #{column: [value, ...], ...} value for each code
+        self._lookup = {} #{column: {value: code, ...}, ...}
+        for column in self.CATEGORICAL:
+            self._codes[column] = array('l')
+            self._values[column] = []
+            self._lookup[column] = {}
+        #end for
+        # Other columns
+        self._columns = {
+            'shard': [],
+            'jobid': [],
+            'workflow_run': [],
+            'dependencies': array('l') #number of dependencies
+        }
+        for input_json in input_jsons or []:
+            self.add(input_json)
+        #end for
+    #end def
+
+    def __len__(self):
+        return len(self._columns['shard'])
+    #end def
+
+    def add(self, input_json):
+        """Add rows for workflow_runs in MetaWorkflowRun[json].
+
+        :param input_json: MetaWorkflowRun[json]
+        :type input_json: dict
+        """
+        runs = input_json.get('workflow_runs') or []
+        metawfr = input_json.get('uuid')
+        final_status = input_json.get('final_status')
+        self._extend('metawfr', [metawfr] * len(runs))
+        self._extend('final_status', [final_status] * len(runs))
+        self._extend('name', [run.get('name') for run in runs])
+        self._extend('status', [run.get('status') for run in runs])
+        self._columns['shard'].extend(run.get('shard') for run in runs)
+        # jobid is job_id in SMaHT
+        self._columns['jobid'].extend(run.get('jobid') or run.get('job_id') for run in runs)
+        self._columns['workflow_run'].extend(
+            self._uuid(run.get('workflow_run')) for run in runs)
+        self._columns['dependencies'].extend(
+            len(run.get('dependencies') or []) for run in runs)
+    #end def
+
+    def _extend(self, column, values):
+        """Encode values and add them to categorical column.
+        """
+        lookup, values_ = self._lookup[column], self._values[column]
+        codes = []
+        for value in values:
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(values_)
+                values_.append(value)
+            #end if
+            codes.append(code)
+        #end for
+        self._codes[column].extend(codes)
+    #end def
+
+    def _uuid(self, item):
+        """workflow_run can be a uuid or an embedded item.
+        """
+        if isinstance(item, dict):
+            return item.get('uuid') or item.get('@id')
+        #end if
+        return item
+    #end def
+
+    def column(self, column):
+        """Values for column, one for each row.
+
+        :param column: Name of the column
+        :type column: str
+        :return: Values for column
+        :rtype: list
+        """
+        if column in self._codes:
+            values = self._values[column]
+            return [values[code] for code in self._codes[column]]
+        #end if
+        return list(self._columns[column])
+    #end def
+
+    def mask(self, **conditions):
+        """Select rows matching all conditions.
+        A condition is column=value, or column=[value, ...]
+        to match any of the values.
+        Only categorical columns can be used.
+
+        e.g. mask(status='failed', final_status=['running', 'failed'])
+
+        :return: Selected rows as 1 or 0, one for each row
+        :rtype: array
+        """
+        mask = None
+        for column, values in conditions.items():
+            if column not in self._codes:
+                raise ValueError('Value error, "{0}" is not a categorical column\n'
+                                    .format(column))
+            #end if
+            if isinstance(values, str) or values is None:
+                values = [values]
+            #end if
+            lookup = self._lookup[column]
+            codes = set(lookup[value] for value in values if value in lookup)
+            mask_ = array('b', map(codes.__contains__, self._codes[column]))
+            if mask is None:
+                mask = mask_
+            else:
+                mask = array('b', map(min, mask, mask_))
+            #end if
+        #end for
+        if mask is None:
+            mask = array('b', [1]) * len(self)
+        #end if
+        return mask
+    #end def
+
+    def count(self, by=('name', 'status'), **conditions):
+        """Count rows grouped by categorical columns.
+
+        e.g. count(by=('metawfr',), status='failed') to count
+            failed shards for each MetaWorkflowRun
+
+        :param by: Columns to group by
+        :type by: tuple(str)
+        :param conditions: Conditions to select rows, see mask
+        :return: Counts by values for columns in by,
+            key is a value if by has a single column, or a tuple of values
+        :rtype: dict
+        """
+        by = tuple(by)
+        for column in by:
+            if column not in self._codes:
+                raise ValueError('Value error, "{0}" is not a categorical column\n'
+                                    .format(column))
+            #end if
+        #end for
+        codes = zip(*[self._codes[column] for column in by])
+        if conditions:
+            codes = compress(codes, self.mask(**conditions))
+        #end if
+        values = [self._values[column] for column in by]
+        counts = {}
+        for key, n in Counter(codes).items():
+            key = tuple(values_[code] for values_, code in zip(values, key))
+            counts[key if len(by) > 1 else key[0]] = n
+        #end for
+        return counts
+    #end def
+
+    def select(self, column, **conditions):
+        """Values for column in rows matching conditions.
+
+        e.g. select('jobid', status='failed')
+
+        :param column: Name of the column
+        :type column: str
+        :param conditions: Conditions to select rows, see mask
+        :return: Values for column
+        :rtype: list
+        """
+        return list(compress(self.column(column), self.mask(**conditions)))
+    #end def
+
+    def to_pydict(self):
+        """Export columns.
+
+        :return: {column: [value, ...], ...}
+        :rtype: dict
+        """
+        return {column: self.column(column) for column in self.COLUMNS}
+    #end def
+
+#end class
@@ -21,20 +21,31 @@ class CheckStatusFF(AbstractCheckStatus):
     """Customized CheckStatus class for the portal.
     """
 
-    def __init__(self, wflrun_obj, env=None):
+    def __init__(self, wflrun_obj, env=None, max_workers=None, cache=None,
+                 wfr_utils=None):
         """Initialize the object and set all attributes.
 
         :param wflrun_obj: MetaWorkflowRun[obj]
         :type wflrun_obj: object
         :param env: Name of the environment to use (e.g. fourfront-cgap)
         :type env: str
+        :param max_workers: Maximum number of running runs to check concurrently
+        :type max_workers: int or None
+        :param cache: Persistent cache for metadata of finished runs
+        :type cache: WfrMetadataCache or None
+        :param wfr_utils: Object used to retrieve metadata for the runs,
+            to share its caches with other objects
+        :type wfr_utils: FFWfrUtils or None
         """
-        super().__init__(wflrun_obj)
+        super().__init__(wflrun_obj, max_workers=max_workers)
 
         # Portal-related attributes
         self._env = env
+        self._cache = cache
         # Cache for FFWfrUtils object
-        self._ff = None
+        self._ff = wfr_utils
+        # Failed jobs already in failed_jobs, updated by handle_error
+        self._failed_jobs = set()
     #end def
 
     @property
@@ -48,15 +59,31 @@ class CheckStatusFF(AbstractCheckStatus):
         }
 
     def check_running(self):
+        """Check running runs as AbstractCheckStatus.check_running,
+        add failed_jobs to the patch dicts if any.
+
+        failed_jobs are collected once from all the runs,
+        runs failing during the check are then added by handle_error.
         """
-        """
+        # Metadata for all the running jobs are retrieved in bulk
+        self.ff.prefetch_wfr_metadata(
+            [run_obj.jobid for run_obj in self.wflrun_obj.running()]
+        )
+        self._failed_jobs = set(self.wflrun_obj.update_failed_jobs())
         for patch_dict in super().check_running():
             if patch_dict:
-                failed_jobs = self.wflrun_obj.update_failed_jobs()
+                failed_jobs = self.wflrun_obj.failed_jobs
                 if len(failed_jobs) > 0:
-                    patch_dict['failed_jobs'] = failed_jobs
+                    patch_dict['failed_jobs'] = list(failed_jobs)
                 yield patch_dict
 
+    def handle_error(self, run_obj):
+        """Add the job of a failed run to failed_jobs.
+        """
+        if run_obj.jobid not in self._failed_jobs:
+            self._failed_jobs.add(run_obj.jobid)
+            self.wflrun_obj.failed_jobs.append(run_obj.jobid)
+
     # The following three functions are for portal (cgap / 4dn)
     def get_uuid(self, jobid):
         """
@@ -78,7 +105,7 @@ class CheckStatusFF(AbstractCheckStatus):
         """Internal property used for get_status, get_output for portal.
         """
         if not self._ff:
-            self._ff = FFWfrUtils(self._env)
+            self._ff = FFWfrUtils(self._env, cache=self._cache)
         return self._ff
 
 #end class
@@ -10,7 +10,7 @@
 #   Libraries
 ################################################
 import sys, os
-import copy
+from copy import deepcopy
 
 # magma
 from magma.metawfl import MetaWorkflow as MetaWorkflowFromMagma
@@ -21,13 +21,19 @@ from magma_ff.parser import ParserFF
 ################################################
 class MetaWorkflow(MetaWorkflowFromMagma):
 
-    def __init__(self, input_json):
+    def __init__(self, input_json, copy=True):
         """
+        :param input_json: MetaWorkflow[json]
+        :type input_json: dict
+        :param copy: Whether to copy input_json, set to False if
+            input_json is not used anymore by the caller
+        :type copy: bool
         """
-        input_json_ = copy.deepcopy(input_json)
+        # Copied only once, parsing changes it in place
+        input_json_ = deepcopy(input_json) if copy else input_json
         ParserFF(input_json_).arguments_to_json()
 
-        super().__init__(input_json_)
+        super().__init__(input_json_, copy=False)
     #end def
 
 #end class
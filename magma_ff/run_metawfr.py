@@ -7,12 +7,16 @@
 from dcicutils import ff_utils
 from tibanna_ffcommon.core import API
 
+from magma.launch import Journal, MetaWorkflowRunLaunchError, run_batches
 from magma_ff import inputgenerator as ingen
 from magma_ff.metawfl import MetaWorkflow
 from magma_ff.metawflrun import MetaWorkflowRun
 from magma_ff.utils import check_status, make_embed_request
 
 
+JOBID = "jobid"
+
+
 ################################################
 #   Functions
 ################################################
@@ -24,6 +28,13 @@ def run_metawfr(
     env="fourfront-cgap",
     maxcount=None,
     valid_status=None,
+    batch=False,
+    batch_size=None,
+    journal_dir=None,
+    max_workers=None,
+    retries=0,
+    backoff=1.0,
+    api_class=None,
 ):
     """Launch pending runs on MetaWorkflowRun[portal] via tibanna.
     PATCH MetaWorkflowRun[portal] with updates.
@@ -31,6 +42,17 @@ def run_metawfr(
     Can double-check MetaWorkflowRun.final_status is valid since
     grabbing item from Postgres here.
 
+    In batch mode, all runs ready (or batch_size runs at a time) are
+    launched before a single PATCH. If journal_dir is set, each batch
+    is recorded in a journal file before starting the runs, and runs
+    left in the journal by an interrupted call are restored and PATCHed
+    on the next call.
+    Runs in a batch can be launched concurrently with max_workers.
+    One at a time or concurrently, no run is launched after the first
+    failure, and runs that could not be launched are set back to pending.
+    Launches are not idempotent, only transient errors (throttling,
+    connection) are retried.
+
     :param metawfr_uuid: MetaWorkflowRun[portal] UUID
     :type metawfr_uuid: str
     :param ff_key: Portal authorization key
@@ -47,7 +69,34 @@ def run_metawfr(
     :param valid_status: Status considered valid for MetaWorkflowRun
         final_status property
     :type valid_status: list(str) or None
+    :param batch: Whether to PATCH once per batch of launched runs
+        instead of once per run
+    :type batch: bool
+    :param batch_size: Maximum number of runs to launch per PATCH in
+        batch mode, if None all runs ready are launched
+    :type batch_size: int or None
+    :param journal_dir: Directory for journal files of launched runs,
+        if None launched runs are not recorded
+    :type journal_dir: str or Path or None
+    :param max_workers: Maximum number of concurrent launches in batch
+        mode, if None runs are launched one at a time
+    :type max_workers: int or None
+    :param retries: Number of retries for a launch failed with a
+        transient error in batch mode
+    :type retries: int
+    :param backoff: Seconds to wait before the first retry,
+        doubled at each retry
+    :type backoff: float
+    :param api_class: Tibanna API class used to launch runs,
+        default to tibanna API
+    :type api_class: class
+    :raises ValueError: If max_workers or retries are set
+        without batch mode
+    :raises MetaWorkflowRunLaunchError: If any run could not be
+        launched in batch mode
     """
+    if (max_workers or retries) and not batch:
+        raise ValueError("max_workers and retries require batch mode")
     perform_action = True
     embed_fields = ["*", "meta_workflow.*"]
     meta_workflow_run = make_embed_request(
@@ -56,16 +105,59 @@ def run_metawfr(
     meta_workflow = meta_workflow_run.get("meta_workflow")
     perform_action = check_status(meta_workflow_run, valid_status)
     if perform_action:
-        run_obj = MetaWorkflowRun(meta_workflow_run)
+        run_obj = MetaWorkflowRun(meta_workflow_run, copy=False)
         wfl_obj = MetaWorkflow(meta_workflow)
+        api_class = api_class or API
+        journal = Journal(journal_dir, metawfr_uuid, jobid_key=JOBID) if journal_dir else None
+        # Recover runs launched by an interrupted call
+        if journal and journal.restore(run_obj):
+            patch_runs(run_obj, metawfr_uuid, ff_key, verbose=verbose)
+            journal.clear()
         ingen_obj = ingen.InputGenerator(wfl_obj, run_obj)
+        if batch:
+            run_batches(
+                run_obj,
+                ingen_obj.shard_input_generator(env),
+                lambda: patch_runs(run_obj, metawfr_uuid, ff_key, verbose=verbose),
+                api_class,
+                journal=journal,
+                sfn=sfn,
+                maxcount=maxcount,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                retries=retries,
+                backoff=backoff,
+            )
+            return
         in_gen = ingen_obj.input_generator(env)
         count = 0
         for input_json, patch_dict in in_gen:
-            API().run_workflow(input_json=input_json, sfn=sfn)  # Start tibanna run
+            api_class().run_workflow(input_json=input_json, sfn=sfn)  # Start tibanna run
             res_post = ff_utils.patch_metadata(patch_dict, metawfr_uuid, key=ff_key)
             if verbose:
                 print(res_post)
             count += 1
             if maxcount and count >= maxcount:
                 break
+
+
+def patch_runs(run_obj, metawfr_uuid, ff_key, verbose=False):
+    """PATCH MetaWorkflowRun[portal] with current workflow_runs and
+    final_status.
+
+    :param run_obj: MetaWorkflowRun[obj]
+    :type run_obj: object
+    :param metawfr_uuid: MetaWorkflowRun[portal] UUID
+    :type metawfr_uuid: str
+    :param ff_key: Portal authorization key
+    :type ff_key: dict
+    :param verbose: Whether to print the PATCH response
+    :type verbose: bool
+    """
+    patch_dict = {
+        "final_status": run_obj.update_status(),
+        "workflow_runs": run_obj.runs_to_json(),
+    }
+    res_patch = ff_utils.patch_metadata(patch_dict, metawfr_uuid, key=ff_key)
+    if verbose:
+        print(res_patch)
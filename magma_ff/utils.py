@@ -10,9 +10,13 @@
 #   Libraries
 ################################################
 import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Sequence
 
+import requests
 from dcicutils import ff_utils
 
 
@@ -20,11 +24,16 @@ JsonObject = Dict[str, Any]
 
 CGAP_KEYS_FILE = Path.expanduser(Path("~/.cgap-keys.json")).absolute()
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent requests to embed API
+EMBED_MAX_WORKERS = 8
+
 
 ################################################
 #   Functions
 ################################################
-def make_embed_request(ids, fields, auth_key, single_item=False):
+def make_embed_request(ids, fields, auth_key, single_item=False, max_workers=None):
     """POST to embed API for retrieval of specified fields for given
     identifiers (from Postgres, not ES).
 
@@ -37,6 +46,9 @@ def make_embed_request(ids, fields, auth_key, single_item=False):
     :param single_item: Whether to return non-list result because only
          maximum one response is expected
     :type single_item: bool
+    :param max_workers: Maximum number of concurrent requests over a
+        pooled session, if None chunks are requested one at a time
+    :type max_workers: int or None
     :return: Embed API response
     :rtype: list or dict or None
     """
@@ -45,14 +57,24 @@ def make_embed_request(ids, fields, auth_key, single_item=False):
         ids = [ids]
     if isinstance(fields, str):
         fields = [fields]
-    id_chunks = chunk_ids(ids)
-    server = auth_key.get("server")
-    for id_chunk in id_chunks:
-        post_body = {"ids": id_chunk, "fields": fields}
-        embed_request = ff_utils.authorized_request(
-            server + "/embed", verb="POST", auth=auth_key, data=json.dumps(post_body)
-        ).json()
-        result += embed_request
+    if max_workers:
+        client = EmbedClient(auth_key, max_workers=max_workers)
+        try:
+            result = client.embed(ids, fields)
+        finally:
+            client.close()
+    else:
+        id_chunks = chunk_ids(ids)
+        server = auth_key.get("server")
+        for id_chunk in id_chunks:
+            post_body = {"ids": id_chunk, "fields": fields}
+            embed_request = ff_utils.authorized_request(
+                server + "/embed",
+                verb="POST",
+                auth=auth_key,
+                data=json.dumps(post_body),
+            ).json()
+            result += embed_request
     if single_item:
         if not result:
             result = None
@@ -82,6 +104,112 @@ def chunk_ids(ids):
     return result
 
 
+class EmbedClient:
+    """Client for the embed API that reuses connections across requests.
+
+    Chunks of identifiers are POSTed concurrently, up to max_workers at a
+    time, over a pooled session. Requests failing with a 5xx status or a
+    connection error are retried with exponential backoff. Seconds spent
+    on each chunk of the last call are stored in latencies and logged at
+    debug level.
+    """
+
+    def __init__(self, auth_key, max_workers=EMBED_MAX_WORKERS, retries=3, backoff=0.5, timeout=60):
+        """
+        :param auth_key: Portal authorization key
+        :type auth_key: dict
+        :param max_workers: Maximum number of concurrent requests
+        :type max_workers: int
+        :param retries: Number of retries for a failed request
+        :type retries: int
+        :param backoff: Seconds to wait before the first retry,
+            doubled at each retry
+        :type backoff: float
+        :param timeout: Seconds to wait for a response
+        :type timeout: float
+        """
+        self.server = auth_key.get("server")
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.latencies = []
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.auth = ff_utils.unified_authentication(auth_key, None)
+        self.session.headers.update(
+            {"content-type": "application/json", "accept": "application/json"}
+        )
+
+    def embed(self, ids, fields):
+        """POST to embed API for all chunks of identifiers.
+
+        :param ids: Item identifiers
+        :type ids: list(str)
+        :param fields: Fields to retrieve for identifiers
+        :type fields: list(str)
+        :return: Embed API responses, in the order of identifiers
+        :rtype: list
+        """
+        id_chunks = chunk_ids(ids)
+        if self.max_workers > 1 and len(id_chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                responses = list(
+                    executor.map(lambda id_chunk: self.post_chunk(id_chunk, fields), id_chunks)
+                )
+        else:
+            responses = [self.post_chunk(id_chunk, fields) for id_chunk in id_chunks]
+        result = []
+        self.latencies = []
+        for idx, (embed_request, seconds) in enumerate(responses):
+            result += embed_request
+            self.latencies.append(seconds)
+            logger.debug(
+                "Embed API chunk %d/%d, %d ids in %.3fs",
+                idx + 1,
+                len(responses),
+                len(id_chunks[idx]),
+                seconds,
+            )
+        return result
+
+    def post_chunk(self, id_chunk, fields):
+        """POST to embed API for a chunk of identifiers, retrying
+        on 5xx status and connection errors.
+
+        :param id_chunk: Item identifiers
+        :type id_chunk: list(str)
+        :param fields: Fields to retrieve for identifiers
+        :type fields: list(str)
+        :return: Embed API response and seconds spent
+        :rtype: tuple(list, float)
+        :raises requests.HTTPError: If the last attempt failed
+        """
+        post_body = json.dumps({"ids": id_chunk, "fields": fields})
+        start = time.time()
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = self.session.post(
+                    self.server + "/embed", data=post_body, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                continue
+            if response.status_code < 500:
+                break
+        response.raise_for_status()
+        return response.json(), time.time() - start
+
+    def close(self):
+        """Close the pooled session."""
+        self.session.close()
+
+
 def check_status(meta_workflow_run, valid_final_status=None):
     """Check if MetaWorkflowRun status is valid.
 
@@ -10,6 +10,10 @@
 #   Libraries
 ################################################
 import sys, os
+import json
+import sqlite3
+import time
+from threading import Lock
 
 # dcicutils
 from dcicutils import ff_utils
@@ -21,15 +25,21 @@ from tibanna.job import Job
 #   FFWfrUtils
 ################################################
 class FFWfrUtils(object):
-    def __init__(self, env):
+    def __init__(self, env, cache=None):
         """
         :param env: e.g. 'fourfront-cgap', 'fourfront-cgap-wolf'
         :type env: str
+        :param cache: Persistent cache for metadata of finished runs
+        :type cache: WfrMetadataCache or None
         """
         self.env = env
+        self.cache = cache
 
         # Cache for metadata
         self._metadata = dict()
+        # Job ids to retrieve in bulk at the next cache miss
+        self._prefetch = dict()
+        self._prefetch_lock = Lock()
         # Cache for access key
         self._ff_key = None
 
@@ -77,6 +87,18 @@ class FFWfrUtils(object):
         # Use cache
         if job_id in self._metadata:
             return self._metadata[job_id]
+        if self.cache:
+            wfr_meta = self.cache.get(job_id)
+            if wfr_meta:
+                self._metadata[job_id] = wfr_meta
+                return wfr_meta
+        # Retrieve together with the other job ids waiting for prefetch
+        if job_id in self._prefetch:
+            # Only one thread retrieves them, the others use the cache
+            with self._prefetch_lock:
+                if job_id in self._prefetch:
+                    self.wfr_metadata_bulk(list(self._prefetch))
+            return self.wfr_metadata(job_id)
         # Search by job id
         query='/search/?type=WorkflowRun&awsem_job_id=%s' % job_id
         try:
@@ -84,18 +106,79 @@ class FFWfrUtils(object):
         except Exception as e:
             raise FdnConnectionException(e)
         if search_res:
-            self._metadata[job_id] = search_res[0]
+            self._cache_metadata(job_id, search_res[0])
             return self._metadata[job_id]
         else:
             # find it from dynamoDB
-            job_info = Job.info(job_id)
-            if not job_info:
-                return None
-            wfr_uuid = job_info.get('WorkflowRun uuid', '')
-            if not wfr_uuid:
-                return None
-            self._metadata[job_id] = ff_utils.get_metadata(wfr_uuid, add_on="frame=raw&datastore=database", key=self.ff_key)
-            return self._metadata[job_id]
+            return self._wfr_metadata_from_job_info(job_id)
+
+    def wfr_metadata_bulk(self, job_ids, batch_size=100):
+        """Get portal run metadata for multiple job_ids.
+        Runs are searched batch_size job ids at a time in a single query,
+        job ids that are not found are then searched in dynamoDB.
+        Return a dict {job_id: metadata}, metadata is None
+        if a run associated with job id cannot be found.
+        """
+        job_ids = list(dict.fromkeys(job_ids))
+        to_search = [job_id for job_id in job_ids if job_id not in self._metadata]
+        if self.cache:
+            self._metadata.update(self.cache.get_many(to_search))
+            to_search = [job_id for job_id in to_search if job_id not in self._metadata]
+        found = dict()
+        # Search by job ids, batch_size at a time
+        for i in range(0, len(to_search), batch_size):
+            batch = to_search[i:i + batch_size]
+            query = '/search/?type=WorkflowRun' + \
+                        ''.join('&awsem_job_id=%s' % job_id for job_id in batch)
+            try:
+                search_res = ff_utils.search_metadata(query, key=self.ff_key)
+            except Exception as e:
+                raise FdnConnectionException(e)
+            batch = set(batch)
+            for wfr_meta in search_res:
+                job_id = wfr_meta.get('awsem_job_id')
+                if job_id in batch and job_id not in found:
+                    found[job_id] = wfr_meta
+        self._metadata.update(found)
+        if self.cache:
+            self.cache.set_many(found)
+        # find the others from dynamoDB
+        for job_id in to_search:
+            if job_id not in self._metadata:
+                # Cache runs not found so they are not searched again
+                self._metadata.setdefault(job_id, self._wfr_metadata_from_job_info(job_id))
+        for job_id in to_search:
+            self._prefetch.pop(job_id, None)
+        return {job_id: self._metadata[job_id] for job_id in job_ids}
+
+    def prefetch_wfr_metadata(self, job_ids):
+        """Register job_ids to retrieve in bulk.
+        Metadata for all the registered job_ids are retrieved together
+        the first time wfr_metadata is called for one of them.
+        """
+        for job_id in job_ids:
+            if job_id not in self._metadata:
+                self._prefetch[job_id] = True
+
+    def _wfr_metadata_from_job_info(self, job_id):
+        """Get portal run metadata from the job info in dynamoDB.
+        Return None if a run associated with job id cannot be found.
+        """
+        job_info = Job.info(job_id)
+        if not job_info:
+            return None
+        wfr_uuid = job_info.get('WorkflowRun uuid', '')
+        if not wfr_uuid:
+            return None
+        self._cache_metadata(job_id, ff_utils.get_metadata(wfr_uuid, add_on="frame=raw&datastore=database", key=self.ff_key))
+        return self._metadata[job_id]
+
+    def _cache_metadata(self, job_id, wfr_meta):
+        """Add run metadata to cache, and to persistent cache if available.
+        """
+        self._metadata[job_id] = wfr_meta
+        if self.cache:
+            self.cache.set_many({job_id: wfr_meta})
 
     @property
     def ff_key(self):
@@ -122,6 +205,91 @@ class FFWfrUtils(object):
 
 #end class
 
+################################################
+#   WfrMetadataCache
+################################################
+class WfrMetadataCache(object):
+    """Persistent cache for metadata of finished runs, stored in SQLite.
+    Only runs with a terminal run_status are stored,
+    as their metadata are not expected to change anymore.
+    """
+    TERMINAL_STATUS = ('complete', 'error')
+
+    def __init__(self, path, ttl=7*24*3600, max_size=100000):
+        """
+        :param path: Path to the SQLite database file
+        :type path: str
+        :param ttl: Seconds before a cached entry expires
+        :type ttl: int
+        :param max_size: Maximum number of entries,
+            oldest entries are evicted first
+        :type max_size: int
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Connection is shared by threads checking runs concurrently
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS wfr_metadata '
+                               '(job_id TEXT PRIMARY KEY, created REAL, metadata TEXT)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS wfr_metadata_created '
+                               'ON wfr_metadata (created)')
+
+    def get(self, job_id):
+        """Return cached metadata for job_id, None if not found or expired.
+        """
+        return self.get_many([job_id]).get(job_id)
+
+    def get_many(self, job_ids, batch_size=500):
+        """Return a dict {job_id: metadata} for the job_ids
+        found in cache and not expired.
+        """
+        job_ids = list(job_ids)
+        min_created = time.time() - self.ttl
+        result = dict()
+        with self._lock:
+            for i in range(0, len(job_ids), batch_size):
+                batch = job_ids[i:i + batch_size]
+                query = 'SELECT job_id, metadata FROM wfr_metadata ' + \
+                        'WHERE created >= ? AND job_id IN (%s)' % ','.join('?' * len(batch))
+                for job_id, metadata in self._conn.execute(query, [min_created] + batch):
+                    result[job_id] = json.loads(metadata)
+        return result
+
+    def set_many(self, wfr_metas):
+        """Store metadata from a dict {job_id: metadata}.
+        Runs that are not finished are ignored.
+        Expired entries and oldest entries above max_size are evicted.
+        """
+        now = time.time()
+        rows = [(job_id, now, json.dumps(wfr_meta)) for job_id, wfr_meta in wfr_metas.items() \
+                    if wfr_meta and wfr_meta.get('run_status') in self.TERMINAL_STATUS]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO wfr_metadata VALUES (?, ?, ?)', rows)
+            self._conn.execute('DELETE FROM wfr_metadata WHERE created < ?', (now - self.ttl,))
+            self._conn.execute('DELETE FROM wfr_metadata WHERE job_id IN '
+                               '(SELECT job_id FROM wfr_metadata ORDER BY created DESC '
+                               'LIMIT -1 OFFSET ?)', (self.max_size,))
+
+    def close(self):
+        """Close the connection to the database.
+        """
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+#end class
+
 
 class FdnConnectionException(Exception):
     pass
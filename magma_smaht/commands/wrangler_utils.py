@@ -1,4 +1,5 @@
 import click
+from magma_smaht.status_metawfr import status_metawfrs
 from magma_smaht.utils import get_auth_key
 import magma_smaht.wrangler_utils as wrangler_utils
 
@@ -504,5 +505,60 @@ def remove_property(identifier, property, auth_env):
     wrangler_utils.remove_property(identifier, property, smaht_key)
 
 
+@cli.command()
+@click.help_option("--help", "-h")
+@click.option(
+    "-m",
+    "--mwfr-uuids",
+    required=False,
+    type=str,
+    multiple=True,
+    help="List of MWFRs to check",
+)
+@click.option(
+    "-q",
+    "--search-query",
+    required=False,
+    type=str,
+    help="Portal search query for MWFRs to check, e.g. '/search/?type=MetaWorkflowRun&final_status=running'",
+)
+@click.option(
+    "-w",
+    "--max-workers",
+    required=False,
+    type=int,
+    help="Maximum number of MWFRs to check concurrently",
+)
+@click.option(
+    "-c",
+    "--cache-file",
+    required=False,
+    type=str,
+    help="SQLite file to cache metadata of finished runs across calls",
+)
+@click.option(
+    "-e",
+    "--auth-env",
+    required=True,
+    type=str,
+    help="Name of environment in smaht-keys file",
+)
+def status_mwfrs(mwfr_uuids, search_query, max_workers, cache_file, auth_env):
+    """Check and patch status for a list of MetaWorkflowRuns"""
+    smaht_key = get_auth_key(auth_env)
+    reports = status_metawfrs(
+        smaht_key,
+        metawfr_uuids=mwfr_uuids,
+        search_query=search_query,
+        max_workers=max_workers,
+        cache_file=cache_file,
+    )
+    for report in reports:
+        print(
+            f"MetaWorkflowRun {report['uuid']}: {report.get('final_status')}, "
+            f"runs {report.get('runs')}, patched {report.get('patched', False)}, "
+            f"{report['seconds']}s" + (f", error: {report['error']}" if "error" in report else "")
+        )
+
 if __name__ == "__main__":
     cli()
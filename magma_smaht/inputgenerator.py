@@ -48,6 +48,22 @@ class InputGenerator(InputGeneratorFromMagma):
             workflow_runs and final_status information for patching
         :rtype: generator(dict, dict)
         """
+        for _, input_json in self.shard_input_generator(env):
+            yield input_json, {'final_status':  self.wflrun_obj.update_status(),
+                               'workflow_runs': self.wflrun_obj.runs_to_json()}
+        #end for
+    #end def
+
+    def shard_input_generator(self, env='env'):
+        """Same as input_generator, but yield the shard_name
+        of the WorkflowRun[obj] together with its input,
+        without creating the information for patching.
+
+        :param env: Environment to pass to tibanna (e.g. fourfront-cgap)
+        :type env: str
+        :return: Generator to shard_name and input for WorkflowRun[obj]
+        :rtype: generator(str, dict)
+        """
         for run_obj, run_args in self._input():
             job_id = create_jobid()
             # Update run status and job_id
@@ -98,7 +114,7 @@ class InputGenerator(InputGeneratorFromMagma):
                         rname = arg_obj.rename
                         if isinstance(rname, str) and rname.startswith('formula:'):
                             frmla = rname.split('formula:')[-1]
-                            rname = self._value_parameter(frmla, self.wflrun_obj.input)
+                            rname = self._value_parameter(frmla, self._input_index()[0])
                         #end if
                         arg_.setdefault('rename', rname)
                     #end if
@@ -108,8 +124,7 @@ class InputGenerator(InputGeneratorFromMagma):
                     input_json['input_files'].append(arg_)
                 #end if
             #end for
-            yield input_json, {'final_status':  self.wflrun_obj.update_status(),
-                               'workflow_runs': self.wflrun_obj.runs_to_json()}
+            yield run_obj.shard_name, input_json
         #end for
     #end def
 
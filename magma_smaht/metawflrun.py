@@ -10,7 +10,7 @@
 #   Libraries
 ################################################
 import sys, os
-import copy
+from copy import deepcopy
 
 # magma
 from magma.metawflrun import MetaWorkflowRun as MetaWorkflowRunFromMagma
@@ -22,13 +22,111 @@ from tibanna_ffcommon.core import API
 ################################################
 class MetaWorkflowRun(MetaWorkflowRunFromMagma):
 
-    def __init__(self, input_json):
+    def __init__(self, input_json, copy=True):
         """
+        :param input_json: MetaWorkflowRun[json]
+        :type input_json: dict
+        :param copy: Whether to copy input_json, set to False if
+            input_json is not used anymore by the caller
+        :type copy: bool
         """
-        input_json_ = copy.deepcopy(input_json)
-        ParserFF(input_json_).arguments_to_json()
+        if copy:
+            # Copy only what can be changed in place,
+            #   input arguments are copied when parsed and
+            #   WorkflowRun[json] are copied one level down,
+            #   output and dependencies lists are copied as they are
+            #   used by WorkflowRun[obj]
+            input_json_ = {}
+            for key, val in input_json.items():
+                if key == 'input':
+                    input_json_[key] = val
+                elif key == 'workflow_runs':
+                    input_json_[key] = [self._copy_run(run_json) for run_json in val]
+                else:
+                    input_json_[key] = deepcopy(val)
+                #end if
+            #end for
+        else:
+            input_json_ = input_json
+        #end if
+        # Input arguments are parsed on first access
+        self._input_copy = copy
+        self._input_raw = True #input set by the constructor is in portal format
+
+        super().__init__(input_json_, copy=False)
+    #end def
+
+    @staticmethod
+    def _copy_run(run_json):
+        """Copy WorkflowRun[json], and its output and dependencies lists.
+
+        :param run_json: WorkflowRun[json]
+        :type run_json: dict
+        :return: Copy of WorkflowRun[json]
+        :rtype: dict
+        """
+        run_json_ = dict(run_json)
+        for key in ('output', 'dependencies'):
+            if key in run_json_:
+                run_json_[key] = list(run_json_[key])
+            #end if
+        #end for
+        return run_json_
+    #end def
+
+    @property
+    def input(self):
+        """MetaWorkflowRun[json] input.
+        Arguments are converted from portal format the first time input is accessed.
+        """
+        try:
+            input_ = self.__dict__['input']
+        except KeyError:
+            raise AttributeError('input')
+        #end try
+        if not self._input_parsed:
+            if self._input_copy:
+                input_ = [dict(arg) for arg in input_]
+            #end if
+            ParserFF({'input': input_}).arguments_to_json()
+            self.__dict__['input'] = input_
+            self._input_parsed = True
+        #end if
+        return input_
+    #end def
+
+    @input.setter
+    def input(self, input_):
+        """Set input, input set after the object is created
+        is expected to be already parsed.
+        """
+        self.__dict__['input'] = input_
+        self._input_parsed = not self.__dict__.pop('_input_raw', False)
+    #end def
 
-        super().__init__(input_json_)
+    def _validate(self):
+        """Same as MetaWorkflowRun._validate,
+        but check input without parsing it.
+        """
+        try:
+            getattr(self, 'meta_workflow') #str
+            self.__dict__['input'] #list
+            getattr(self, 'workflow_runs') #list
+            getattr(self, 'final_status') #str, pending | running | completed | failed
+        except (AttributeError, KeyError) as e:
+            raise ValueError('JSON validation error, {0}\n'
+                                .format(e.args[0]))
+        #end try
+    #end def
+
+    def to_json(self):
+        """
+        :return: MetaWorkflowRun[json]
+        :rtype: dict
+        """
+        # Parse input if not done yet
+        self.input
+        return super().to_json()
     #end def
 
     def _reset_run(self, shard_name):
@@ -41,8 +139,8 @@ class MetaWorkflowRun(MetaWorkflowRunFromMagma):
         """
         run_obj = self.runs[shard_name]
         # Reset run_obj
-        run_obj.output = []
-        run_obj.status = 'pending'
+        self.update_attribute(shard_name, 'output', [])
+        self.update_attribute(shard_name, 'status', 'pending')
         if getattr(run_obj, 'job_id', None):
             delattr(run_obj, 'job_id')
         #end if
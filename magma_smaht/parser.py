@@ -78,6 +78,11 @@ class ParserFF(object):
 
     def _files_to_json(self, files, sep=','):
         """Convert file argument from string to json.
+        The structure is built in two passes,
+        first the dimensional shape is calculated from all the files,
+        then nested lists are created with their final size and filled.
+        Files with different number of dimensions, or negative indexes,
+        are converted with _files_to_json_incremental.
 
         :param files: List of dictionaries representing files
             and information on their dimensional structure
@@ -96,6 +101,104 @@ class ParserFF(object):
         :return: Converted argument value (files)
         :rtype: list(str)
         """
+        paths = {} #{path: (index, ...), ...}
+                   # path is dimension without the last index, as string
+        maxes = {} #{path: max last index, ...}
+        entries = [] #[(path, last index, file), ...]
+        negative = False
+        for file in files:
+            dimension = file.get('dimension')
+            if not dimension:
+                return file.get('file')
+            #end if
+            path, _, index = dimension.rpartition(sep)
+            if path not in paths:
+                paths[path] = tuple(map(int, path.split(sep))) if path else ()
+            #end if
+            index = int(index)
+            if index < 0:
+                negative = True
+            #end if
+            if maxes.get(path, -1) < index:
+                maxes[path] = index
+            #end if
+            entries.append((path, index, file.get('file')))
+        #end for
+        if not entries:
+            return []
+        #end if
+        # Check that all files have the same number of dimensions
+        depths = set(len(path_) for path_ in paths.values())
+        if negative or len(depths) != 1 or \
+           any(i < 0 for path_ in paths.values() for i in path_):
+            return self._files_to_json_incremental(files, sep)
+        #end if
+        depth = depths.pop() + 1
+        # Calculate the size for each list, by path to the list
+        sizes = {} #{(index, ...): size, ...}
+        for path, path_ in paths.items():
+            if sizes.get(path_, 0) <= maxes[path]:
+                sizes[path_] = maxes[path] + 1
+            #end if
+            for level in range(depth - 1):
+                prefix = path_[:level]
+                if sizes.get(prefix, 0) <= path_[level]:
+                    sizes[prefix] = path_[level] + 1
+                #end if
+            #end for
+        #end for
+        # Create lists, missing lists are empty, missing files are None
+        leaves = {} #{(index, ...): list, ...} lists that contain files
+        list_ = self._build_list((), depth, sizes, leaves)
+        # Add elements
+        lists = {path: leaves[path_] for path, path_ in paths.items()}
+        for path, index, file in entries:
+            lists[path][index] = file
+        #end for
+        return list_
+    #end def
+
+    def _build_list(self, path, depth, sizes, leaves):
+        """Create list at path with its final size.
+
+        :param path: Indexes to reach the list
+        :type path: tuple(int)
+        :param depth: Number of dimensions
+        :type depth: int
+        :param sizes: Size for each list, by path
+        :type sizes: dict
+        :param leaves: Lists that contain files, by path,
+            updated with the lists created
+        :type leaves: dict
+        """
+        size = sizes[path]
+        if len(path) == depth - 1:
+            list_ = [None] * size
+            leaves[path] = list_
+        else:
+            list_ = []
+            for i in range(size):
+                path_ = path + (i,)
+                if path_ in sizes:
+                    list_.append(self._build_list(path_, depth, sizes, leaves))
+                else:
+                    list_.append([])
+                #end if
+            #end for
+        #end if
+        return list_
+    #end def
+
+    def _files_to_json_incremental(self, files, sep=','):
+        """Convert file argument from string to json.
+        Expand the structure one file at a time.
+
+        :param files: List of dictionaries representing files
+            and information on their dimensional structure
+        :type files: list(dict)
+        :return: Converted argument value (files)
+        :rtype: list(str)
+        """
         list_ = []
         # Get max dimensions needed
         for file in files:
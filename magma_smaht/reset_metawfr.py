@@ -14,7 +14,14 @@ from magma_smaht.utils import check_status
 ################################################
 #   Functions
 ################################################
-def reset_steps(metawfr_uuid, steps_name, ff_key, verbose=False, valid_status=None):
+def reset_steps(
+    metawfr_uuid,
+    steps_name,
+    ff_key,
+    verbose=False,
+    valid_status=None,
+    downstream=False,
+):
     """Reset runs in MetaWorkflowRun[portal] corresponding
     to specified step names.
     PATCH MetaWorkflowRun[portal] with updates.
@@ -30,6 +37,9 @@ def reset_steps(metawfr_uuid, steps_name, ff_key, verbose=False, valid_status=No
     :param valid_status: Status considered valid for MetaWorkflowRun[portal]
         final_status property
     :type valid_status: list(str) or None
+    :param downstream: Whether to also reset runs that depend,
+        directly or indirectly, on the runs to reset
+    :type downstream: bool
     """
     perform_action = True
     meta_workflow_run = ff_utils.get_metadata(
@@ -39,13 +49,22 @@ def reset_steps(metawfr_uuid, steps_name, ff_key, verbose=False, valid_status=No
     if perform_action:
         run_obj = MetaWorkflowRun(meta_workflow_run)
         runupd_obj = RunUpdate(run_obj)
-        patch_dict = runupd_obj.reset_steps(steps_name)
+        patch_dict = runupd_obj.reset_runs(
+            steps_name=steps_name, downstream=downstream
+        )
         res_post = ff_utils.patch_metadata(patch_dict, metawfr_uuid, key=ff_key)
         if verbose:
             print(res_post)
 
 
-def reset_shards(metawfr_uuid, shards_name, ff_key, verbose=False, valid_status=None):
+def reset_shards(
+    metawfr_uuid,
+    shards_name,
+    ff_key,
+    verbose=False,
+    valid_status=None,
+    downstream=False,
+):
     """Reset runs in MetaWorkflowRun[portal] corresponding
     to specified shard names.
     PATCH MetaWorkflowRun[portal] with updates.
@@ -61,6 +80,9 @@ def reset_shards(metawfr_uuid, shards_name, ff_key, verbose=False, valid_status=
     :param valid_status: Status considered valid for MetaWorkflowRun
         final_status property
     :type valid_status: list(str) or None
+    :param downstream: Whether to also reset runs that depend,
+        directly or indirectly, on the runs to reset
+    :type downstream: bool
     """
     perform_action = True
     meta_workflow_run = ff_utils.get_metadata(
@@ -70,7 +92,9 @@ def reset_shards(metawfr_uuid, shards_name, ff_key, verbose=False, valid_status=
     if perform_action:
         run_obj = MetaWorkflowRun(meta_workflow_run)
         runupd_obj = RunUpdate(run_obj)
-        patch_dict = runupd_obj.reset_shards(shards_name)
+        patch_dict = runupd_obj.reset_runs(
+            shards_name=shards_name, downstream=downstream
+        )
         res_post = ff_utils.patch_metadata(patch_dict, metawfr_uuid, key=ff_key)
         if verbose:
             print(res_post)
@@ -4,20 +4,36 @@
 #       runs in MetaWorkflowRun[portal]
 #
 ################################################
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from typing import Any, Dict
 
 from dcicutils import ff_utils
 
+from magma.snapshot import RunSnapshot
 from magma_smaht import checkstatus
 from magma_smaht.metawflrun import MetaWorkflowRun
-from magma_smaht.utils import check_status, make_embed_request
+from magma_smaht.utils import EMBED_MAX_WORKERS, check_status, make_embed_request
+from magma_smaht.wfrutils import FFWfrUtils, WfrMetadataCache
+
+
+logger = logging.getLogger(__name__)
 
 
 ################################################
 #   Functions
 ################################################
 def status_metawfr(
-    metawfr_uuid, ff_key, verbose=False, env="smaht-wolf", valid_status=None
+    metawfr_uuid,
+    ff_key,
+    verbose=False,
+    env="smaht-wolf",
+    valid_status=None,
+    max_workers=None,
+    cache_file=None,
 ):
     """Perform status check on MetaWorkflowRun[portal].
 
@@ -39,17 +55,83 @@ def status_metawfr(
     :param valid_status: Status considered valid for MetaWorkflowRun
         final_status property
     :type valid_status: list(str) or None
+    :param max_workers: Maximum number of running runs to check
+        concurrently, if None runs are checked one at a time
+    :type max_workers: int or None
+    :param cache_file: Path to SQLite file used as persistent cache
+        for metadata of finished runs, if None no persistent cache
+    :type cache_file: str or None
     """
-    perform_action = True
-    patch_body = None
-    run_json = ff_utils.get_metadata(
+    run_json = get_metawfr(metawfr_uuid, ff_key)
+    with WfrMetadataCache(cache_file) if cache_file else nullcontext() as cache:
+        update_metawfr_status(
+            run_json,
+            metawfr_uuid,
+            ff_key,
+            FFWfrUtils(env, cache=cache),
+            verbose=verbose,
+            valid_status=valid_status,
+            max_workers=max_workers,
+        )
+
+
+def get_metawfr(metawfr_uuid, ff_key):
+    """Retrieve MetaWorkflowRun[portal] raw frame from the database,
+    as used for status checks.
+
+    :param metawfr_uuid: MetaWorkflowRun[portal] UUID
+    :type metawfr_uuid: str
+    :param ff_key: Portal authorization key
+    :type ff_key: dict
+    :return: MetaWorkflowRun[json]
+    :rtype: dict
+    """
+    return ff_utils.get_metadata(
         metawfr_uuid, add_on="frame=raw&datastore=database", key=ff_key
     )
+
+
+def update_metawfr_status(
+    run_json,
+    metawfr_uuid,
+    ff_key,
+    wfr_utils,
+    verbose=False,
+    valid_status=None,
+    max_workers=None,
+):
+    """Check all the runs of MetaWorkflowRun[json] for updates, check
+    for QC failures (if applicable), and then PATCH
+    MetaWorkflowRun[portal] with updates (if found).
+
+    :param run_json: MetaWorkflowRun[json]
+    :type run_json: dict
+    :param metawfr_uuid: MetaWorkflowRun[portal] UUID
+    :type metawfr_uuid: str
+    :param ff_key: Portal authorization key
+    :type ff_key: dict
+    :param wfr_utils: Object used to retrieve metadata for the runs
+    :type wfr_utils: FFWfrUtils
+    :param verbose: Whether to print the POST response
+    :type verbose: bool
+    :param valid_status: Status considered valid for MetaWorkflowRun
+        final_status property
+    :type valid_status: list(str) or None
+    :param max_workers: Maximum number of running runs to check
+        concurrently, if None runs are checked one at a time
+    :type max_workers: int or None
+    :return: PATCH body, None if there was nothing to PATCH
+    :rtype: dict or None
+    """
+    perform_action = True
+    patch_body = None
     perform_action = check_status(run_json, valid_status)
     if perform_action:
         ignore_quality_metrics = run_json.get("ignore_output_quality_metrics")
-        run_obj = MetaWorkflowRun(run_json)
-        cs_obj = checkstatus.CheckStatusSMA(run_obj, env)
+        run_obj = MetaWorkflowRun(run_json, copy=False)
+        cs_obj = checkstatus.CheckStatusSMA(
+            run_obj, wfr_utils.env, max_workers=max_workers, wfr_utils=wfr_utils
+        )
         status_updates = list(cs_obj.check_running())  # Get all updates
         if status_updates:
             patch_body = status_updates[-1]  # Take most updated
@@ -70,6 +152,181 @@ def status_metawfr(
             )
             if verbose:
                 print(patch_response)
+    return patch_body
+
+
+def status_metawfrs(
+    ff_key,
+    metawfr_uuids=None,
+    search_query=None,
+    verbose=False,
+    env="smaht-wolf",
+    valid_status=None,
+    max_workers=None,
+    cache_file=None,
+):
+    """Perform status check on multiple MetaWorkflowRun[portal].
+
+    MetaWorkflowRuns are given as UUIDs and/or found with a portal
+    search query, and retrieved concurrently from the database in raw
+    frame, as in status_metawfr. Metadata for all their running runs
+    are retrieved in bulk, and shared together with the access key
+    across all the MetaWorkflowRuns.
+
+    A failure for a MetaWorkflowRun is logged with its traceback,
+    reported, and does not stop the status check of the others.
+
+    :param ff_key: Portal authorization key
+    :type ff_key: dict
+    :param metawfr_uuids: MetaWorkflowRun[portal] UUIDs
+    :type metawfr_uuids: list(str) or None
+    :param search_query: Portal search query for MetaWorkflowRuns,
+        e.g. "/search/?type=MetaWorkflowRun&final_status=running"
+    :type search_query: str or None
+    :param verbose: Whether to print the POST responses
+    :type verbose: bool
+    :param env: Environment name
+    :type env: str
+    :param valid_status: Status considered valid for MetaWorkflowRun
+        final_status property
+    :type valid_status: list(str) or None
+    :param max_workers: Maximum number of MetaWorkflowRuns to check
+        concurrently, if None they are checked one at a time
+    :type max_workers: int or None
+    :param cache_file: Path to SQLite file used as persistent cache
+        for metadata of finished runs, if None no persistent cache
+    :type cache_file: str or None
+    :return: Report for each MetaWorkflowRun, in order, with uuid,
+        final_status, number of runs by status, whether it was
+        PATCHed, seconds spent and error (if any)
+    :rtype: list(dict)
+    """
+    metawfr_uuids = list(metawfr_uuids or [])
+    if search_query:
+        search_result = ff_utils.search_metadata(search_query, key=ff_key)
+        metawfr_uuids += [item["uuid"] for item in search_result]
+    metawfr_uuids = list(dict.fromkeys(metawfr_uuids))
+
+    def get_run_json(metawfr_uuid):
+        # Errors are raised again by the status check of the MetaWorkflowRun
+        try:
+            return get_metawfr(metawfr_uuid, ff_key)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=EMBED_MAX_WORKERS) as executor:
+        run_jsons = dict(zip(metawfr_uuids, executor.map(get_run_json, metawfr_uuids)))
+    with WfrMetadataCache(cache_file) if cache_file else nullcontext() as cache:
+        return check_metawfrs(
+            run_jsons,
+            ff_key,
+            FFWfrUtils(env, cache=cache),
+            verbose=verbose,
+            valid_status=valid_status,
+            max_workers=max_workers,
+        )
+
+
+def check_metawfrs(
+    run_jsons, ff_key, wfr_utils, verbose=False, valid_status=None, max_workers=None
+):
+    """Check the runs of multiple MetaWorkflowRun[json] and PATCH
+    MetaWorkflowRun[portal] with updates, see status_metawfrs.
+
+    :param run_jsons: MetaWorkflowRun[json] by UUID, or the error
+        raised when retrieving it
+    :type run_jsons: dict
+    :param ff_key: Portal authorization key
+    :type ff_key: dict
+    :param wfr_utils: Object used to retrieve metadata for the runs
+    :type wfr_utils: FFWfrUtils
+    :param verbose: Whether to print the POST responses
+    :type verbose: bool
+    :param valid_status: Status considered valid for MetaWorkflowRun
+        final_status property
+    :type valid_status: list(str) or None
+    :param max_workers: Maximum number of MetaWorkflowRuns to check
+        concurrently, if None they are checked one at a time
+    :type max_workers: int or None
+    :return: Report for each MetaWorkflowRun, see status_metawfrs
+    :rtype: list(dict)
+    """
+    # Metadata for the running runs of all MetaWorkflowRuns are retrieved in bulk
+    wfr_utils.prefetch_wfr_metadata(
+        run["job_id"]
+        for run_json in run_jsons.values()
+        if isinstance(run_json, dict) and check_status(run_json, valid_status)
+        for run in run_json.get("workflow_runs", [])
+        if run.get("status") == "running" and run.get("job_id")
+    )
+
+    def check_metawfr(metawfr_uuid):
+        start = time.time()
+        report = {"uuid": metawfr_uuid}
+        run_json = run_jsons[metawfr_uuid]
+        try:
+            if isinstance(run_json, Exception):
+                raise run_json
+            patch_body = update_metawfr_status(
+                run_json,
+                metawfr_uuid,
+                ff_key,
+                wfr_utils,
+                verbose=verbose,
+                valid_status=valid_status,
+            )
+            updated_json = patch_body or run_json
+            report["final_status"] = updated_json.get("final_status")
+            report["runs"] = dict(
+                Counter(
+                    run.get("status") for run in updated_json.get("workflow_runs", [])
+                )
+            )
+            report["patched"] = bool(patch_body)
+        except Exception as e:
+            logger.exception("Status check failed for MetaWorkflowRun %s", metawfr_uuid)
+            report["error"] = str(e)
+        report["seconds"] = round(time.time() - start, 3)
+        return report
+
+    if max_workers and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(check_metawfr, run_jsons))
+    return [check_metawfr(metawfr_uuid) for metawfr_uuid in run_jsons]
+
+
+def snapshot_metawfrs(ff_key, metawfr_uuids=None, search_query=None):
+    """Retrieve many MetaWorkflowRun[portal] and flatten their
+    workflow_runs into a single columnar snapshot.
+
+    MetaWorkflowRuns are specified as UUIDs and/or found with a portal
+    search query, and retrieved with embed requests.
+
+    :param ff_key: Portal authorization key
+    :type ff_key: dict
+    :param metawfr_uuids: MetaWorkflowRun[portal] UUIDs
+    :type metawfr_uuids: list(str) or None
+    :param search_query: Portal search query for MetaWorkflowRuns,
+        e.g. "/search/?type=MetaWorkflowRun&final_status=running"
+    :type search_query: str or None
+    :return: Snapshot of workflow_runs, e.g. snapshot.count(by=("name",),
+        status="failed") to count failed shards for each step
+    :rtype: :class:`magma.snapshot.RunSnapshot`
+    """
+    metawfr_uuids = list(metawfr_uuids or [])
+    if search_query:
+        search_result = ff_utils.search_metadata(search_query, key=ff_key)
+        metawfr_uuids += [item["uuid"] for item in search_result]
+    metawfr_uuids = list(dict.fromkeys(metawfr_uuids))
+    run_jsons = make_embed_request(
+        metawfr_uuids,
+        ["uuid", "final_status", "status", "workflow_runs"],
+        ff_key,
+        max_workers=EMBED_MAX_WORKERS,
+    )
+    return RunSnapshot(
+        run_json for run_json in run_jsons if check_status(run_json)
+    )
 
 
 def get_recently_completed_workflow_runs(meta_workflow_run, updated_properties):
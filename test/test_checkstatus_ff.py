@@ -1,8 +1,11 @@
+import copy
 import json
 import mock
+import time
 
 from magma_ff import checkstatus
 from magma_ff import metawflrun as run_ff
+from magma_ff.wfrutils import FFWfrUtils
 
 
 def test_CheckStatusFF():
@@ -101,3 +104,142 @@ def test_CheckStatusFF_running():
             with mock.patch('magma_ff.checkstatus.CheckStatusFF.get_uuid', return_value='run_uuid'):
                 result = list(cr)
     assert len(result) == 1
+
+
+def test_CheckStatusFF_bulk_metadata():
+    """Check that metadata for all running jobs are searched in bulk.
+    It uses mocks for the portal search and dynamoDB.
+    """
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data_wflrun = json.load(json_file)
+
+    # fake that the first four are running, last one is not on the portal
+    jobids = ['jobid0', 'jobid1', 'jobid2', 'jobid3']
+    for i, jobid in enumerate(jobids):
+        data_wflrun['workflow_runs'][i]['status'] = 'running'
+        data_wflrun['workflow_runs'][i]['jobid'] = jobid
+    search_res = [
+        {'uuid': 'uuid' + jobid[-1], 'awsem_job_id': jobid, 'run_status': 'complete',
+         'output_files': [{'workflow_argument_name': 'raw_bam', 'type': 'Output processed file',
+                           'value': {'uuid': 'file' + jobid[-1]}}]}
+        for jobid in jobids[:3]
+    ]
+
+    wflrun_obj = run_ff.MetaWorkflowRun(data_wflrun)
+    cs = checkstatus.CheckStatusFF(wflrun_obj)
+    cs.ff._ff_key = 'key'
+    with mock.patch('magma_ff.wfrutils.ff_utils.search_metadata',
+                    return_value=search_res) as mock_search:
+        with mock.patch('magma_ff.wfrutils.Job.info', return_value=None) as mock_info:
+            res = list(cs.check_running())
+
+    # a single search for all running jobs, dynamoDB only for the missing job
+    mock_search.assert_called_once_with(
+        '/search/?type=WorkflowRun&awsem_job_id=jobid0&awsem_job_id=jobid1'
+        '&awsem_job_id=jobid2&awsem_job_id=jobid3', key='key')
+    mock_info.assert_called_once_with('jobid3')
+    assert len(res) == 4
+    runs = res[-1]['workflow_runs']
+    for i in range(3):
+        assert runs[i]['status'] == 'completed'
+        assert runs[i]['workflow_run'] == 'uuid%s' % i
+        assert runs[i]['output'] == [{'argument_name': 'raw_bam', 'file': 'file%s' % i}]
+    assert runs[3]['status'] == 'failed'
+    assert res[-1]['failed_jobs'] == ['jobid3']
+
+
+def test_FFWfrUtils_wfr_metadata_bulk():
+    """Check that job ids are searched batch_size at a time.
+    """
+    ff = FFWfrUtils('env')
+    ff._ff_key = 'key'
+    ff._metadata['cached'] = {'uuid': 'cached'}
+    search_res = [[{'uuid': 'a', 'awsem_job_id': 'a'}, {'uuid': 'b', 'awsem_job_id': 'b'}],
+                  [{'uuid': 'c', 'awsem_job_id': 'c'}]]
+    with mock.patch('magma_ff.wfrutils.ff_utils.search_metadata',
+                    side_effect=search_res) as mock_search:
+        with mock.patch('magma_ff.wfrutils.Job.info',
+                        return_value={'WorkflowRun uuid': 'd'}) as mock_info:
+            with mock.patch('magma_ff.wfrutils.ff_utils.get_metadata',
+                            return_value={'uuid': 'd'}) as mock_get:
+                res = ff.wfr_metadata_bulk(['a', 'cached', 'b', 'a', 'c', 'd'], batch_size=2)
+
+    assert [call[0][0] for call in mock_search.call_args_list] == [
+        '/search/?type=WorkflowRun&awsem_job_id=a&awsem_job_id=b',
+        '/search/?type=WorkflowRun&awsem_job_id=c&awsem_job_id=d'
+    ]
+    mock_info.assert_called_once_with('d')
+    mock_get.assert_called_once_with('d', add_on='frame=raw&datastore=database', key='key')
+    assert {job_id: meta['uuid'] for job_id, meta in res.items()} == \
+        {'a': 'a', 'cached': 'cached', 'b': 'b', 'c': 'c', 'd': 'd'}
+    assert ff.wfr_run_uuid('c') == 'c'
+
+
+def test_CheckStatusFF_concurrent():
+    """Check that concurrent mode yields the same patch dicts as serial mode.
+    It uses mocks for get_status, get_uuid and get_output,
+    returning in reverse order of the runs.
+    """
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data_wflrun = json.load(json_file)
+
+    # fake that all the runs are running
+    statuses = ['complete', 'started', 'error']
+    jobid_status = {}
+    for i, run_json in enumerate(data_wflrun['workflow_runs']):
+        run_json['status'] = 'running'
+        run_json['jobid'] = 'jobid%s' % i
+        jobid_status[run_json['jobid']] = statuses[i % 3]
+    n_runs = len(jobid_status)
+
+    def get_status(jobid):
+        time.sleep(0.001 * (n_runs - int(jobid[5:])))
+        return jobid_status[jobid]
+
+    def check_running(max_workers):
+        wflrun_obj = run_ff.MetaWorkflowRun(copy.deepcopy(data_wflrun))
+        cs = checkstatus.CheckStatusFF(wflrun_obj, max_workers=max_workers)
+        with mock.patch.object(cs, 'get_status', side_effect=get_status):
+            with mock.patch.object(cs, 'get_uuid', side_effect=lambda jobid: 'uuid_' + jobid):
+                with mock.patch.object(cs, 'get_output',
+                                       side_effect=lambda jobid: [{'argument_name': 'arg', 'file': jobid}]):
+                    return list(cs.check_running())
+
+    serial = check_running(None)
+    # runs still running do not yield a patch dict
+    assert len(serial) == n_runs - len(range(1, n_runs, 3))
+    assert serial[-1]['final_status'] == 'failed'
+    assert set(serial[-1]['failed_jobs']) == set('jobid%s' % i for i in range(2, n_runs, 3))
+    assert check_running(8) == serial
+
+
+def test_CheckStatusFF_failed_jobs():
+    """Check that failed_jobs are collected from all the runs once,
+    and updated as runs fail.
+    """
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data_wflrun = json.load(json_file)
+
+    # fake that the first three are running, one already failed
+    data_wflrun['failed_jobs'] = ['oldjobid']
+    for i, run_json in enumerate(data_wflrun['workflow_runs'][:4]):
+        run_json['status'] = 'running' if i else 'failed'
+        run_json['jobid'] = 'jobid%s' % i
+
+    wflrun_obj = run_ff.MetaWorkflowRun(data_wflrun)
+    cs = checkstatus.CheckStatusFF(wflrun_obj)
+    statuses = {'jobid1': 'error', 'jobid2': 'complete', 'jobid3': 'error'}
+    with mock.patch.object(wflrun_obj, 'update_failed_jobs',
+                           wraps=wflrun_obj.update_failed_jobs) as mock_update:
+        with mock.patch.object(cs, 'get_status', side_effect=statuses.get):
+            with mock.patch.object(cs, 'get_uuid', return_value='run_uuid'):
+                with mock.patch.object(cs, 'get_output', return_value=[]):
+                    res = list(cs.check_running())
+
+    assert mock_update.call_count == 1
+    assert len(res) == 3
+    assert sorted(res[0]['failed_jobs']) == ['jobid0', 'jobid1', 'oldjobid']
+    assert res[1]['failed_jobs'] == res[0]['failed_jobs']
+    assert res[1]['failed_jobs'] is not res[0]['failed_jobs']
+    assert res[2]['failed_jobs'] == res[0]['failed_jobs'] + ['jobid3']
+    assert wflrun_obj.failed_jobs == res[2]['failed_jobs']
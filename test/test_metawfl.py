@@ -252,6 +252,64 @@ def test_wfl__order_run_E_C():
     assert [x_.name for x_ in x] == results['steps']
 #end def
 
+def test_wfl__order_run_H_P_ties():
+    # Results expected
+    #   steps ready at the same time follow their order in workflows
+    results = {
+        'steps': ['A', 'Z', 'B', 'C', 'D', 'E', 'G', 'H', 'P']
+    }
+    # Read input
+    with open('test/files/test_METAWFL.json') as json_file:
+        data = json.load(json_file)
+    # Run test multiple times, order must not change
+    for _ in range(5):
+        wfl_obj = wfl.MetaWorkflow(data)
+        x = wfl_obj._order_run(['H', 'P'])
+        assert [x_.name for x_ in x] == results['steps']
+    #end for
+#end def
+
+def test_wfl__order_run_repeated_calls():
+    # Read input
+    with open('test/files/test_METAWFL.json') as json_file:
+        data = json.load(json_file)
+    # Create MetaWorkflow object
+    wfl_obj = wfl.MetaWorkflow(data)
+    # Run test
+    #   graph links from previous calls should not affect later calls
+    wfl_obj._order_run(['H', 'M'])
+    x = wfl_obj._order_run(['E'])
+    assert [x_.name for x_ in x] == ['A', 'B', 'C', 'E']
+#end def
+
+def test_wfl__order_run_cycle():
+    # A - B - C - D
+    #      \     /
+    #       - E -
+    # with D -> B closing a cycle B - C - D
+    data = {
+        'uuid': 'test-uuid',
+        'input': [],
+        'workflows': [
+            {'name': 'A', 'workflow': 'A', 'config': {}, 'input': []},
+            {'name': 'B', 'workflow': 'B', 'config': {}, 'input': [],
+             'dependencies': ['A', 'D']},
+            {'name': 'C', 'workflow': 'C', 'config': {}, 'input': [],
+             'dependencies': ['B']},
+            {'name': 'D', 'workflow': 'D', 'config': {}, 'input': [],
+             'dependencies': ['C']},
+            {'name': 'E', 'workflow': 'E', 'config': {}, 'input': [],
+             'dependencies': ['D']}
+        ]
+    }
+    # Create MetaWorkflow object
+    wfl_obj = wfl.MetaWorkflow(data)
+    # Run test
+    with pytest.raises(ValueError) as e:
+        wfl_obj._order_run(['E'])
+    assert str(e.value) == 'Validation error, circular dependency detected between steps "B", "C", "D"\n'
+#end def
+
 def test_wfl__input_dimensions():
     # Results expected
     results = {
@@ -296,6 +354,27 @@ def test_wfl__shards():
     assert dim3_3 == results['dim3_3']
 #end def
 
+def test_wfl__shard_table():
+    # Create MetaWorkflow object
+    wfl_obj = wfl.MetaWorkflow(template)
+    # Run test
+    dim3 = {1: [3], 2: [2, 2, 2], 3: [[2 ,1], [1, 3], [2, 12]]}
+    for dimension in [1, 2, 3]:
+        table = wfl_obj._shard_table(dim3, dimension)
+        assert [list(s) for s in table] == wfl_obj._shards(dim3, dimension)
+        # Memoized
+        assert wfl_obj._shard_table(dim3, dimension) is table
+    #end for
+    assert wfl_obj._shard_table(dim3, 3)[-1] == ('2', '1', '11')
+    # Reset for each write_run
+    wfl_obj.write_run(['a', 'b'], [''])
+    assert wfl_obj._shard_tables == {}
+    # Prefix index
+    index = wfl_obj._shard_prefix_index(wfl_obj._shard_table(dim3, 3), 2)
+    assert list(index) == [('0', '0'), ('0', '1'), ('1', '0'), ('1', '1'), ('2', '0'), ('2', '1')]
+    assert index[('1', '1')] == [('1', '1', '0'), ('1', '1', '1'), ('1', '1', '2')]
+#end def
+
 def test_wfl_end_workflows():
     with open('test/files/test_METAWFL.json') as json_file:
         data = json.load(json_file)
@@ -363,3 +442,48 @@ def test_wfl_fixed_shards_gather_input_error():
     with pytest.raises(ValueError) as e:
         wfl_obj = wfl.MetaWorkflow(data)
     assert str(e.value) == 'JSON validation error, gather and gather_input can\'t be used together in the same step\n'
+
+def test_wfl_step_slots():
+    # Read input
+    with open('test/files/test_METAWFL.json') as json_file:
+        data = json.load(json_file)
+    data['workflows'][0]['custom_field'] = 'custom'
+    # Create MetaWorkflow object
+    wfl_obj = wfl.MetaWorkflow(data)
+    # Run test
+    step_obj = wfl_obj.steps[data['workflows'][0]['name']]
+    assert not hasattr(step_obj, '__dict__')
+    # Unknown keys are stored in the overflow dictionary
+    assert step_obj.custom_field == 'custom'
+    assert step_obj._extra['custom_field'] == 'custom'
+    assert 'custom_field' not in wfl_obj.steps[data['workflows'][1]['name']]._extra
+    with pytest.raises(AttributeError):
+        step_obj.missing
+    #end with
+#end def
+
+def test_wfl_write_run_regression():
+    # Read expected workflow_runs for different inputs
+    with open('test/files/test_METAWFL_write_run.json') as json_file:
+        cases = json.load(json_file)
+    for case in cases:
+        with open(case['metawfl']) as json_file:
+            data = json.load(json_file)
+        # Create MetaWorkflow object
+        wfl_obj = wfl.MetaWorkflow(data)
+        # Run test
+        x = wfl_obj.write_run(case['input_structure'], case['end_steps'])
+        # Test results, including keys and dependencies order,
+        #   expected workflow_runs are generated with the implementation
+        #   before Kahn ordering, where steps ready at the same time had
+        #   no stable order, runs are compared by step in shard order
+        runs, runs_ = {}, {}
+        for run in x['workflow_runs']:
+            runs.setdefault(run['name'], []).append(json.dumps(run))
+        #end for
+        for run in case['workflow_runs']:
+            runs_.setdefault(run['name'], []).append(json.dumps(run))
+        #end for
+        assert runs == runs_
+    #end for
+#end def
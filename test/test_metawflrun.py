@@ -117,3 +117,228 @@ def test_update_functs_3():
     wflrun_obj.update_status()
     assert wflrun_obj.final_status == 'inactive'
 #end def
+
+def _to_run_scan(wflrun_obj):
+    """Find pending runs with completed dependencies scanning all runs.
+    """
+    runs_ = []
+    for _, run_obj in wflrun_obj.runs.items():
+        if run_obj.status == 'pending' and \
+           all(wflrun_obj.runs[d].status == 'completed' for d in run_obj.dependencies):
+            runs_.append(run_obj.shard_name)
+        #end if
+    #end for
+    return runs_
+#end def
+
+def test_to_run():
+    # meta-worfklow-run json
+    #   A:0, A:1 -> B:0, B:1 -> C:0 (gather)
+    input_wflrun = {
+      'meta_workflow': 'AAID',
+      'workflow_runs' : [
+            {'name': 'A', 'status': 'pending', 'shard': '0'},
+            {'name': 'A', 'status': 'pending', 'shard': '1'},
+            {'name': 'B', 'status': 'pending', 'shard': '0', 'dependencies': ['A:0']},
+            {'name': 'B', 'status': 'pending', 'shard': '1', 'dependencies': ['A:1']},
+            {'name': 'C', 'status': 'pending', 'shard': '0', 'dependencies': ['B:0', 'B:1']}
+        ],
+      'input': [],
+      'final_status': 'pending'
+    }
+    # Create object
+    wflrun_obj = run.MetaWorkflowRun(input_wflrun)
+    assert [r.shard_name for r in wflrun_obj.to_run()] == ['A:0', 'A:1']
+    # Running runs are not ready
+    wflrun_obj.update_attribute('A:0', 'status', 'running')
+    assert [r.shard_name for r in wflrun_obj.to_run()] == ['A:1']
+    # Completing a run make dependents ready, order follows workflow_runs
+    wflrun_obj.update_attribute('A:1', 'status', 'completed')
+    wflrun_obj.update_attribute('A:0', 'status', 'completed')
+    assert [r.shard_name for r in wflrun_obj.to_run()] == ['B:0', 'B:1']
+    # Gather is ready only when all dependencies are completed
+    wflrun_obj.update_attribute('B:0', 'status', 'completed')
+    assert [r.shard_name for r in wflrun_obj.to_run()] == ['B:1']
+    wflrun_obj.update_attribute('B:1', 'status', 'completed')
+    assert [r.shard_name for r in wflrun_obj.to_run()] == ['C:0']
+    # Resetting a dependency blocks dependents again
+    wflrun_obj.reset_shard('B:0')
+    assert [r.shard_name for r in wflrun_obj.to_run()] == ['B:0']
+    wflrun_obj.reset_step('A')
+    assert [r.shard_name for r in wflrun_obj.to_run()] == ['A:0', 'A:1']
+    # Indexes are not exported
+    assert sorted(wflrun_obj.to_json()) == ['final_status', 'input', 'meta_workflow', 'workflow_runs']
+#end def
+
+def test_to_run_updates():
+    # Read input
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data = json.load(json_file)
+    # Create object
+    wflrun_obj = run.MetaWorkflowRun(data)
+    shard_names = list(wflrun_obj.runs)
+    # Run test
+    #   cycle runs through status updates and compare with full scan
+    statuses = ['running', 'completed', 'failed', 'pending', 'completed']
+    for i, shard_name in enumerate(shard_names * 2):
+        wflrun_obj.update_attribute(shard_name, 'status', statuses[i % len(statuses)])
+        assert [r.shard_name for r in wflrun_obj.to_run()] == _to_run_scan(wflrun_obj)
+    #end for
+#end def
+
+def _final_status_scan(wflrun_obj):
+    """Calculate final_status scanning all runs.
+    """
+    final_status, all_completed, is_completed = 'pending', True, False
+    for _, run_obj in wflrun_obj.runs.items():
+        if run_obj.status != 'completed':
+            all_completed = False
+            if run_obj.status == 'failed':
+                final_status = 'failed'
+                break
+            elif run_obj.status == 'running':
+                final_status = 'running'
+            #end if
+        else: is_completed = True
+        #end if
+    #end for
+    if all_completed:
+        final_status = 'completed'
+    elif final_status == 'pending' and is_completed:
+        final_status = 'inactive'
+    #end if
+    return final_status
+#end def
+
+def test_update_status_updates():
+    # Read input
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data = json.load(json_file)
+    # Create object
+    wflrun_obj = run.MetaWorkflowRun(data)
+    shard_names = list(wflrun_obj.runs)
+    # Run test
+    #   cycle runs through status updates and compare with full scan
+    statuses = ['running', 'completed', 'completed', 'failed', 'pending', 'completed', 'running']
+    for i, shard_name in enumerate(shard_names * 3):
+        wflrun_obj.update_attribute(shard_name, 'status', statuses[i % len(statuses)])
+        assert wflrun_obj.update_status() == _final_status_scan(wflrun_obj)
+    #end for
+    # All completed
+    for shard_name in shard_names:
+        wflrun_obj.update_attribute(shard_name, 'status', 'completed')
+    #end for
+    assert wflrun_obj.update_status() == 'completed'
+    # Reset keeps counts
+    wflrun_obj.reset_step(wflrun_obj.runs[shard_names[-1]].name)
+    assert wflrun_obj.update_status() == 'inactive'
+#end def
+
+def test_runs_to_json_updates():
+    # Read input
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data = json.load(json_file)
+    # Create object
+    wflrun_obj = run.MetaWorkflowRun(data)
+    shard_names = list(wflrun_obj.runs)
+    # Run test
+    runs_json = wflrun_obj.runs_to_json()
+    assert len(runs_json) == len(data['workflow_runs'])
+    wflrun_obj.update_attribute(shard_names[1], 'status', 'running')
+    wflrun_obj.update_attribute(shard_names[1], 'jobid', 'JOBID')
+    wflrun_obj.reset_shard(shard_names[4])
+    # Full serialization is updated, previous one is not changed
+    runs_json_ = wflrun_obj.runs_to_json()
+    assert runs_json[1] == data['workflow_runs'][1]
+    assert runs_json_[1]['jobid'] == 'JOBID'
+    assert runs_json_[4]['status'] == 'pending'
+    for i, run_json in enumerate(runs_json_):
+        assert run_json == wflrun_obj.runs[shard_names[i]].to_json()
+    #end for
+    # Runs not changed are shared across calls
+    assert runs_json_[0] is runs_json[0]
+    assert runs_json_[1] is not runs_json[1]
+    # to_json returns copies, changing them does not change the cache
+    run_json = wflrun_obj.to_json()
+    run_json['workflow_runs'][0]['status'] = 'failed'
+    assert wflrun_obj.runs_to_json()[0] == data['workflow_runs'][0]
+#end def
+
+def test_workflowrun_to_json_roundtrip():
+    # Read input
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data = json.load(json_file)
+    # Run test
+    for run_json in data['workflow_runs']:
+        run_obj = run.MetaWorkflowRun.WorkflowRun(run_json)
+        assert json.dumps(run_obj.to_json()) == json.dumps(run_json)
+    #end for
+    # Unknown keys are kept, key order follows the order keys are set
+    run_json = {'status': 'pending', 'foo': {'bar': 1}, 'name': 'A', 'shard': '0', 'output': []}
+    run_obj = run.MetaWorkflowRun.WorkflowRun(run_json)
+    assert run_obj.foo == {'bar': 1}
+    assert list(run_obj.to_json()) == ['status', 'foo', 'name', 'shard']
+    run_obj.jobid = 'JOBID'
+    run_obj.baz = 'BAZ'
+    run_obj.status = 'running'
+    assert list(run_obj.to_json()) == ['status', 'foo', 'name', 'shard', 'jobid', 'baz']
+    del run_obj.jobid
+    del run_obj.foo
+    assert not hasattr(run_obj, 'jobid')
+    assert getattr(run_obj, 'foo', None) is None
+    run_obj.jobid = 'JOBID'
+    assert run_obj.to_json() == {'status': 'running', 'name': 'A', 'shard': '0', 'baz': 'BAZ', 'jobid': 'JOBID'}
+    assert list(run_obj.to_json()) == ['status', 'name', 'shard', 'baz', 'jobid']
+    with pytest.raises(AttributeError):
+        del run_obj.workflow_run
+    #end with
+#end def
+
+def test_run_table():
+    # Read input
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data = json.load(json_file)
+    # Create object
+    wflrun_obj = run.MetaWorkflowRun(data)
+    # Run test
+    runs_ = wflrun_obj.step_runs('workflow_bwa-mem_no_unzip-check')
+    assert [run_obj.shard for run_obj in runs_] == ['0:0', '1:0', '1:1', '2:0', '2:1', '2:2']
+    assert wflrun_obj.step_runs('workflow_gatk-CombineGVCFs')[0].shard_name == 'workflow_gatk-CombineGVCFs:0'
+    assert wflrun_obj.step_runs('missing') == []
+    idx = wflrun_obj._ids['workflow_add-readgroups-check:2:1']
+    assert data['workflow_runs'][idx]['shard'] == '2:1'
+    assert wflrun_obj._shard_names[idx] == 'workflow_add-readgroups-check:2:1'
+    assert wflrun_obj._statuses == [run_json['status'] for run_json in data['workflow_runs']]
+    # Reset uses the step index
+    wflrun_obj.reset_step('workflow_merge-bam-check')
+    for i, run_json in enumerate(wflrun_obj.runs_to_json()):
+        if run_json['name'] == 'workflow_merge-bam-check':
+            assert run_json['status'] == 'pending'
+            assert 'output' not in run_json
+        else:
+            assert run_json == data['workflow_runs'][i]
+        #end if
+    #end for
+    # Status column is updated with the run
+    wflrun_obj.update_attribute('workflow_add-readgroups-check:2:1', 'status', 'running')
+    assert wflrun_obj._statuses[idx] == 'running'
+    assert wflrun_obj.running()[-1].shard_name == 'workflow_add-readgroups-check:2:1'
+#end def
+
+def test_workflowrun_output_index():
+    run_json = {
+      'name': 'A', 'status': 'completed', 'shard': '0',
+      'output': [{'argument_name': 'out', 'files': 'X'},
+                 {'argument_name': 'qc', 'files': 'Y'},
+                 {'argument_name': 'out', 'files': 'Z'}]
+    }
+    run_obj = run.MetaWorkflowRun.WorkflowRun(run_json)
+    # Keep the first match
+    assert run_obj.output_index() == {'out': run_json['output'][0], 'qc': run_json['output'][1]}
+    # Index follows output changes
+    run_obj.output = [{'argument_name': 'new', 'files': 'W'}]
+    assert list(run_obj.output_index()) == ['new']
+    del run_obj.output
+    assert run_obj.output_index() == {}
+    assert 'output' not in run_obj.to_json()
+#end def
@@ -131,3 +131,75 @@ def test_run_ff():
     assert wflrun_obj.final_status == 'completed'
     assert wflrun_obj.input == input_parser
 #end def
+
+def test_run_ff_copy():
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data = json.load(json_file)
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data_ = json.load(json_file)
+    # Copy, input is not changed
+    wflrun_obj = run_ff.MetaWorkflowRun(data)
+    assert data == data_
+    assert wflrun_obj.input is not data['input']
+    # No copy, input is parsed in place and used by the object
+    wflrun_obj_ = run_ff.MetaWorkflowRun(data_, copy=False)
+    assert wflrun_obj_.input is data_['input']
+    assert data_['input'] == wflrun_obj.input
+    assert wflrun_obj_.to_json() == wflrun_obj.to_json()
+#end def
+
+def test_run_ff_copy_runs():
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data = json.load(json_file)
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data_ = json.load(json_file)
+    # Copy, output and dependencies lists are not shared with input_json
+    wflrun_obj = run_ff.MetaWorkflowRun(data)
+    for run_json in data['workflow_runs']:
+        run_obj = wflrun_obj.runs[run_json['name'] + ':' + run_json['shard']]
+        for key in ('output', 'dependencies'):
+            if key in run_json:
+                assert getattr(run_obj, key) == run_json[key]
+                assert getattr(run_obj, key) is not run_json[key]
+            #end if
+        #end for
+        run_obj.output.append({'argument_name': 'test', 'file': 'uuid-test'})
+        run_obj.dependencies.append('test:0')
+    #end for
+    assert data == data_
+    # No copy, lists are used by the object
+    wflrun_obj_ = run_ff.MetaWorkflowRun(data_, copy=False)
+    run_json = data_['workflow_runs'][-1]
+    run_obj = wflrun_obj_.runs[run_json['name'] + ':' + run_json['shard']]
+    assert run_obj.dependencies is run_json['dependencies']
+#end def
+
+def test_run_ff_lazy_input():
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data = json.load(json_file)
+    with open('test/files/CGAP_WGS_trio_scatter_ff.run.json') as json_file:
+        data_ = json.load(json_file)
+    # Input is not parsed until accessed
+    wflrun_obj = run_ff.MetaWorkflowRun(data)
+    assert vars(wflrun_obj)['input'] is data['input']
+    assert wflrun_obj.workflow_runs is not data['workflow_runs']
+    wflrun_obj.update_attribute(list(wflrun_obj.runs)[0], 'status', 'running')
+    assert wflrun_obj.runs_to_json()[0]['status'] == 'running'
+    assert data == data_
+    # Parsed on first access, on a copy
+    input = wflrun_obj.input
+    assert wflrun_obj.input is input
+    assert data == data_
+    assert input == run_ff.MetaWorkflowRun(data_, copy=False).input
+    # Input set after creation is not parsed again
+    wflrun_obj_ = run_ff.MetaWorkflowRun(data)
+    wflrun_obj_.input = input
+    assert wflrun_obj_.input is input
+    # to_json returns parsed input
+    assert run_ff.MetaWorkflowRun(data).to_json()['input'] == input
+    # Missing input
+    del data['input']
+    with pytest.raises(ValueError):
+        run_ff.MetaWorkflowRun(data)
+    #end with
+#end def
@@ -3,6 +3,7 @@
 #################################################################
 import sys, os
 import pytest
+import random
 
 from magma_ff import parser
 
@@ -331,6 +332,34 @@ def test__files_to_json_3D():
     assert pff_obj._files_to_json(files) == files_out
 #end def
 
+def test__files_to_json_incremental():
+    # Two-pass and incremental conversion give the same output
+    pff_obj = parser.ParserFF(input_json)
+    rng = random.Random(0)
+    for _ in range(200):
+        depth = rng.randint(1, 4)
+        files = []
+        for i in range(rng.randint(1, 30)):
+            # Sparse indexes, with gaps and duplicates
+            dimension = ','.join(str(rng.randint(0, 4)) for _ in range(depth))
+            files.append({'file': 'uuid-{0}'.format(i), 'dimension': dimension})
+        #end for
+        assert pff_obj._files_to_json(files) == \
+               pff_obj._files_to_json_incremental(files)
+    #end for
+    # 0D, first file without dimension is returned
+    files = [{'file': 'a', 'dimension': '1'}, {'file': 'b'}, {'file': 'c', 'dimension': ''}]
+    assert pff_obj._files_to_json(files) == 'b'
+    assert pff_obj._files_to_json(files) == pff_obj._files_to_json_incremental(files)
+    # Paths with the same indexes written differently
+    files = [{'file': 'a', 'dimension': '1,0'}, {'file': 'b', 'dimension': '01,1'}]
+    assert pff_obj._files_to_json(files) == [[], ['a', 'b']]
+    assert pff_obj._files_to_json(files) == pff_obj._files_to_json_incremental(files)
+    # Negative indexes fall back to incremental conversion
+    files = [{'file': 'a', 'dimension': '2'}, {'file': 'b', 'dimension': '-1'}]
+    assert pff_obj._files_to_json(files) == pff_obj._files_to_json_incremental(files)
+#end def
+
 def test_arguments_to_json_wfl():
     # Test
     pff_obj = parser.ParserFF(input_wfl)
@@ -0,0 +1,358 @@
+import json
+import threading
+import time
+
+import mock
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+
+from magma import launch as launch_module
+from magma import metawfl as wfl
+from magma.launch import Journal, is_transient, launch_run, launch_runs, run_batches
+from magma_ff import run_metawfr as run_metawfr_module
+from magma_ff.run_metawfr import MetaWorkflowRunLaunchError, run_metawfr
+from magma_ff.metawflrun import MetaWorkflowRun
+
+
+META_WORKFLOW_RUN_UUID = "mwfr_uuid"
+READY_SHARDS = [
+    "workflow_bwa-mem_no_unzip-check:0:0",
+    "workflow_bwa-mem_no_unzip-check:1:0",
+    "workflow_bwa-mem_no_unzip-check:1:1",
+    "workflow_merge-bam-check:2",
+]
+
+
+def get_meta_workflow_run():
+    """MetaWorkflowRun[portal] with embedded MetaWorkflow."""
+    with open("test/files/CGAP_WGS_trio.json") as json_file:
+        meta_workflow = json.load(json_file)
+    with open("test/files/CGAP_WGS_trio_scatter_ff.run.json") as json_file:
+        meta_workflow_run = json.load(json_file)
+    meta_workflow_run["status"] = "in review"
+    meta_workflow_run["meta_workflow"] = meta_workflow
+    return meta_workflow_run
+
+
+def run_with_mocks(tmp_path, run_workflow_side_effect=None, **kwargs):
+    """Call run_metawfr with mocked portal and tibanna.
+
+    Core MetaWorkflow is used as test MetaWorkflow[json] is not in
+    portal format.
+    """
+    with mock.patch.object(
+        run_metawfr_module,
+        "make_embed_request",
+        return_value=get_meta_workflow_run(),
+    ):
+        with mock.patch.object(
+            run_metawfr_module, "MetaWorkflow", wfl.MetaWorkflow
+        ):
+            with mock.patch.object(run_metawfr_module, "API") as mock_api:
+                mock_api.return_value.run_workflow.side_effect = (
+                    run_workflow_side_effect
+                )
+                with mock.patch.object(
+                    run_metawfr_module.ff_utils, "patch_metadata"
+                ) as mock_patch:
+                    error = None
+                    try:
+                        run_metawfr(
+                            META_WORKFLOW_RUN_UUID,
+                            {},
+                            journal_dir=tmp_path,
+                            **kwargs,
+                        )
+                    except Exception as e:
+                        error = e
+                    return mock_api, mock_patch, error
+
+
+def get_patched_runs(patch_call):
+    """Map shard_name to workflow run from PATCH call."""
+    patch_dict = patch_call[0][0]
+    return {
+        "%s:%s" % (run["name"], run["shard"]): run
+        for run in patch_dict["workflow_runs"]
+    }
+
+
+def test_run_metawfr_no_batch(tmp_path):
+    """Test one PATCH per launched run by default."""
+    mock_api, mock_patch, error = run_with_mocks(tmp_path)
+    assert error is None
+    assert len(mock_api.return_value.run_workflow.call_args_list) == len(READY_SHARDS)
+    assert len(mock_patch.call_args_list) == len(READY_SHARDS)
+
+
+@pytest.mark.parametrize(
+    "batch_size,maxcount,expected_launches,expected_patches",
+    [
+        (None, None, 4, 1),
+        (2, None, 4, 2),
+        (3, None, 4, 2),
+        (None, 3, 3, 1),
+        (2, 3, 3, 2),
+    ],
+)
+def test_run_metawfr_batch(
+    tmp_path, batch_size, maxcount, expected_launches, expected_patches
+):
+    """Test launched runs are PATCHed once per batch."""
+    mock_api, mock_patch, error = run_with_mocks(
+        tmp_path, batch=True, batch_size=batch_size, maxcount=maxcount
+    )
+    assert error is None
+    run_workflow_calls = mock_api.return_value.run_workflow.call_args_list
+    assert len(run_workflow_calls) == expected_launches
+    assert len(mock_patch.call_args_list) == expected_patches
+    patched_runs = get_patched_runs(mock_patch.call_args_list[-1])
+    launched_jobids = [call[1]["input_json"]["jobid"] for call in run_workflow_calls]
+    for shard_name, jobid in zip(READY_SHARDS, launched_jobids):
+        assert patched_runs[shard_name]["status"] == "running"
+        assert patched_runs[shard_name]["jobid"] == jobid
+    for shard_name in READY_SHARDS[expected_launches:]:
+        assert patched_runs[shard_name]["status"] == "pending"
+    assert not list(tmp_path.iterdir())  # Journal cleared
+
+
+def test_run_metawfr_batch_launch_error(tmp_path):
+    """Test runs launched before an error are PATCHed and failed launch
+    is set back to pending.
+    """
+    mock_api, mock_patch, error = run_with_mocks(
+        tmp_path, run_workflow_side_effect=[None, Exception("launch error")], batch=True
+    )
+    assert isinstance(error, MetaWorkflowRunLaunchError)
+    assert "%s (launch error)" % READY_SHARDS[1] in str(error)
+    assert len(mock_api.return_value.run_workflow.call_args_list) == 2
+    assert len(mock_patch.call_args_list) == 1
+    patched_runs = get_patched_runs(mock_patch.call_args_list[0])
+    assert patched_runs[READY_SHARDS[0]]["status"] == "running"
+    for shard_name in READY_SHARDS[1:]:
+        assert patched_runs[shard_name]["status"] == "pending"
+        assert "jobid" not in patched_runs[shard_name]
+    assert not list(tmp_path.iterdir())
+
+
+def test_run_metawfr_restore_journal(tmp_path):
+    """Test runs left in the journal are PATCHed before launching."""
+    journal = Journal(tmp_path, META_WORKFLOW_RUN_UUID)
+    journal.write([(READY_SHARDS[0], "lost_jobid")])
+    with journal.path.open("a") as file_handle:
+        file_handle.write('{"shard_name": ')  # Interrupted write
+    mock_api, mock_patch, error = run_with_mocks(tmp_path, batch=True)
+    assert error is None
+    assert len(mock_patch.call_args_list) == 2
+    restored_runs = get_patched_runs(mock_patch.call_args_list[0])
+    assert restored_runs[READY_SHARDS[0]]["status"] == "running"
+    assert restored_runs[READY_SHARDS[0]]["jobid"] == "lost_jobid"
+    assert restored_runs[READY_SHARDS[1]]["status"] == "pending"
+    # Restored run is not launched again
+    assert len(mock_api.return_value.run_workflow.call_args_list) == 3
+    assert not list(tmp_path.iterdir())
+
+
+def test_restore_journal(tmp_path):
+    """Test only pending runs are restored from the journal."""
+    run_obj = MetaWorkflowRun(get_meta_workflow_run())
+    journal = Journal(tmp_path, META_WORKFLOW_RUN_UUID)
+    assert journal.restore(run_obj) is False
+    journal.write(
+        [("workflow_bwa-mem_no_unzip-check:2:0", "jobid"), ("not_a_shard:0", "jobid")]
+    )
+    assert journal.restore(run_obj) is False
+    assert not journal.path.exists()
+
+
+def test_run_batches_journal(tmp_path):
+    """Test each batch is recorded in the journal with its shard names
+    before launching, and an unknown shard name is an error.
+    """
+    run_obj = MetaWorkflowRun(get_meta_workflow_run())
+    journal = Journal(tmp_path, META_WORKFLOW_RUN_UUID)
+    journaled = []
+
+    class JournalAPI:
+        def run_workflow(self, input_json=None, sfn=None):
+            with journal.path.open() as file_handle:
+                journaled.append([json.loads(line) for line in file_handle])
+
+    shard_inputs = [(shard_name, {"jobid": str(i)}) for i, shard_name in enumerate(READY_SHARDS)]
+    mock_patch = mock.Mock()
+    run_batches(
+        run_obj, iter(shard_inputs), mock_patch, JournalAPI, journal=journal, batch_size=2
+    )
+    assert mock_patch.call_count == 2
+    assert journaled[1] == [
+        {"shard_name": READY_SHARDS[0], "jobid": "0"},
+        {"shard_name": READY_SHARDS[1], "jobid": "1"},
+    ]
+    assert journaled[2] == [
+        {"shard_name": READY_SHARDS[2], "jobid": "2"},
+        {"shard_name": READY_SHARDS[3], "jobid": "3"},
+    ]
+    assert not journal.path.exists()
+    with pytest.raises(ValueError, match="not_a_shard:0"):
+        run_batches(run_obj, iter([("not_a_shard:0", {"jobid": "x"})]), mock_patch, JournalAPI)
+
+
+def throttling_error():
+    """Transient error from tibanna API."""
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "launch error"}},
+        "StartExecution",
+    )
+
+
+class StubAPI:
+    """Stub for tibanna API, fail launches for jobids in fail
+    with a transient error, or with errors in errors.
+    """
+
+    fail = {}
+    errors = {}
+    launched = []
+
+    def run_workflow(self, input_json=None, sfn=None):
+        jobid = input_json["jobid"]
+        if jobid in self.errors:
+            raise self.errors[jobid]
+        if self.fail.get(jobid, 0):
+            self.fail[jobid] -= 1
+            raise throttling_error()
+        self.launched.append(jobid)
+
+
+def test_run_batches_journal_patch_error(tmp_path):
+    """Test runs not launched are removed from the journal before the
+    PATCH, so that only runs launched are restored if the PATCH fails.
+    """
+    run_obj = MetaWorkflowRun(get_meta_workflow_run())
+    journal = Journal(tmp_path, META_WORKFLOW_RUN_UUID)
+    StubAPI.launched = []
+    StubAPI.fail = {}
+    StubAPI.errors = {"1": KeyError("input error")}
+    shard_inputs = []
+    for i, shard_name in enumerate(READY_SHARDS):
+        run_obj.update_attribute(shard_name, "status", "running")
+        run_obj.update_attribute(shard_name, "jobid", str(i))
+        shard_inputs.append((shard_name, {"jobid": str(i)}))
+    mock_patch = mock.Mock(side_effect=Exception("PATCH error"))
+    with pytest.raises(Exception, match="PATCH error"):
+        run_batches(run_obj, iter(shard_inputs), mock_patch, StubAPI, journal=journal)
+    assert StubAPI.launched == ["0"]
+    with journal.path.open() as file_handle:
+        assert [json.loads(line) for line in file_handle] == [
+            {"shard_name": READY_SHARDS[0], "jobid": "0"}
+        ]
+    assert not list(tmp_path.glob("*.tmp"))
+    # Only the launched run is restored
+    run_obj_ = MetaWorkflowRun(get_meta_workflow_run())
+    assert journal.restore(run_obj_)
+    assert run_obj_.runs[READY_SHARDS[0]].status == "running"
+    assert run_obj_.runs[READY_SHARDS[0]].jobid == "0"
+    for shard_name in READY_SHARDS[1:]:
+        assert run_obj_.runs[shard_name].status == "pending"
+    StubAPI.errors = {}
+
+
+@pytest.mark.parametrize("max_workers", [None, 2, 8])
+def test_run_metawfr_concurrent(tmp_path, max_workers):
+    """Test launches with a stubbed API class.
+
+    First run fails once and is retried, last run always fails.
+    """
+    StubAPI.launched = []
+    StubAPI.errors = {}
+    with mock.patch.object(
+        run_metawfr_module.ingen, "create_jobid", side_effect=["a", "b", "c", "d"]
+    ):
+        with mock.patch.object(launch_module.time, "sleep") as mock_sleep:
+            StubAPI.fail = {"a": 1, "d": 10}
+            _, mock_patch, error = run_with_mocks(
+                tmp_path, batch=True, max_workers=max_workers, retries=2, api_class=StubAPI
+            )
+    assert isinstance(error, MetaWorkflowRunLaunchError)
+    assert str(error) == "Could not launch runs: %s (%s)" % (
+        READY_SHARDS[3],
+        throttling_error(),
+    )
+    assert sorted(StubAPI.launched) == ["a", "b", "c"]
+    assert sorted(call[0][0] for call in mock_sleep.call_args_list) == [1.0, 1.0, 2.0]
+    assert len(mock_patch.call_args_list) == 1
+    patched_runs = get_patched_runs(mock_patch.call_args_list[0])
+    for shard_name, jobid in zip(READY_SHARDS, ["a", "b", "c", "d"]):
+        if jobid == "d":
+            assert patched_runs[shard_name]["status"] == "pending"
+            assert "jobid" not in patched_runs[shard_name]
+        else:
+            assert patched_runs[shard_name]["status"] == "running"
+            assert patched_runs[shard_name]["jobid"] == jobid
+    assert not list(tmp_path.iterdir())
+
+
+def test_run_metawfr_max_workers_without_batch(tmp_path):
+    """Test max_workers and retries require batch mode."""
+    for kwargs in ({"max_workers": 8}, {"retries": 2}):
+        mock_api, mock_patch, error = run_with_mocks(tmp_path, **kwargs)
+        assert isinstance(error, ValueError)
+        assert not mock_api.return_value.run_workflow.called
+        assert not mock_patch.called
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_launch_runs_stop_after_error(max_workers):
+    """Test no run is launched after the first error, one at a time
+    or concurrently, and launches already started are completed.
+    """
+    started, failed = threading.Event(), threading.Event()
+
+    class BlockingAPI:
+        launched = []
+
+        def run_workflow(self, input_json=None, sfn=None):
+            jobid = input_json["jobid"]
+            if jobid == "a":
+                if max_workers:
+                    started.wait(1)  # Concurrent launch of b is started
+                failed.set()
+                raise KeyError("input error")
+            started.set()
+            if max_workers:
+                failed.wait(1)
+                time.sleep(0.1)
+            self.launched.append(jobid)
+
+    inputs = [{"jobid": jobid} for jobid in ["a", "b", "c", "d"]]
+    errors = launch_runs(inputs, BlockingAPI, max_workers=max_workers)
+    assert isinstance(errors[0], KeyError)
+    for error in errors[2:]:
+        assert isinstance(error, MetaWorkflowRunLaunchError)
+    if max_workers:
+        assert errors[1] is None
+        assert BlockingAPI.launched == ["b"]
+    else:
+        assert isinstance(errors[1], MetaWorkflowRunLaunchError)
+        assert BlockingAPI.launched == []
+
+
+def test_launch_run():
+    """Test launch is retried with exponential backoff on transient
+    errors only.
+    """
+    StubAPI.launched = []
+    StubAPI.fail = {"a": 2, "b": 5}
+    StubAPI.errors = {"c": KeyError("jobid"), "d": ReadTimeoutError(endpoint_url="url")}
+    with mock.patch.object(launch_module.time, "sleep") as mock_sleep:
+        assert launch_run({"jobid": "a"}, StubAPI, retries=2, backoff=0.5) is None
+        with pytest.raises(ClientError):
+            launch_run({"jobid": "b"}, StubAPI, retries=2, backoff=0.5)
+        with pytest.raises(KeyError):
+            launch_run({"jobid": "c"}, StubAPI, retries=2, backoff=0.5)
+        with pytest.raises(ReadTimeoutError):
+            launch_run({"jobid": "d"}, StubAPI, retries=2, backoff=0.5)
+    assert StubAPI.launched == ["a"]
+    assert [call[0][0] for call in mock_sleep.call_args_list] == [0.5, 1.0, 0.5, 1.0]
+    assert is_transient(EndpointConnectionError(endpoint_url="url"))
+    assert not is_transient(ClientError({"Error": {"Code": "ValidationException"}}, "StartExecution"))
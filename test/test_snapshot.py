@@ -0,0 +1,61 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import pytest
+import json
+
+from magma import snapshot
+from magma import metawflrun as run
+
+#################################################################
+#   Tests
+#################################################################
+def test_snapshot():
+    # Read input
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data = json.load(json_file)
+    data['uuid'] = 'MWFR-1'
+    data_smaht = {
+      'uuid': 'MWFR-2',
+      'final_status': 'failed',
+      'workflow_runs': [
+            {'name': 'workflow_merge-bam-check', 'status': 'failed', 'shard': '0',
+             'job_id': 'JOB-1', 'workflow_run': {'uuid': 'WFR-1'}},
+            {'name': 'Foo', 'status': 'pending', 'shard': '0',
+             'dependencies': ['workflow_merge-bam-check:0']}
+        ]
+    }
+    # Create snapshot
+    snapshot_obj = snapshot.RunSnapshot([data, data_smaht, {'uuid': 'MWFR-3'}])
+    # Run test
+    assert len(snapshot_obj) == len(data['workflow_runs']) + 2
+    assert snapshot_obj.column('name')[:-2] == [r['name'] for r in data['workflow_runs']]
+    assert snapshot_obj.column('jobid')[-2:] == ['JOB-1', None]
+    assert snapshot_obj.column('workflow_run')[-2] == 'WFR-1'
+    assert list(snapshot_obj.column('dependencies'))[:-2] == \
+           [len(r.get('dependencies', [])) for r in data['workflow_runs']]
+    # Group-by
+    wflrun_obj = run.MetaWorkflowRun(data)
+    counts = {}
+    for run_obj in wflrun_obj.runs.values():
+        key = (run_obj.name, run_obj.status)
+        counts[key] = counts.get(key, 0) + 1
+    #end for
+    assert snapshot_obj.count(metawfr='MWFR-1') == counts
+    # MWFR-1 has only pending and completed runs
+    assert snapshot_obj.count(by=('metawfr',), status='failed') == {'MWFR-2': 1}
+    assert snapshot_obj.count(by=('metawfr',), status=['pending', 'completed']) == \
+           {'MWFR-1': len(data['workflow_runs']), 'MWFR-2': 1}
+    assert snapshot_obj.count(by=('status',), final_status='failed', metawfr=['MWFR-2', 'MWFR-3']) == \
+           {'failed': 1, 'pending': 1}
+    assert snapshot_obj.count(by=('name',), status='missing') == {}
+    assert snapshot_obj.select('jobid', status='failed') == ['JOB-1']
+    # Export
+    columns = snapshot_obj.to_pydict()
+    assert list(columns) == list(snapshot.RunSnapshot.COLUMNS)
+    assert all(len(values) == len(snapshot_obj) for values in columns.values())
+    with pytest.raises(ValueError):
+        snapshot_obj.count(by=('shard',))
+    #end with
+#end def
@@ -1,3 +1,4 @@
+import json
 import mock
 import pytest
 from typing import Any, Dict
@@ -7,6 +8,8 @@ from magma_ff.status_metawfr import (
     evaluate_workflow_run_quality_metrics,
     get_recently_completed_workflow_runs,
     is_final_status_completed,
+    snapshot_metawfrs,
+    status_metawfrs,
 )
 
 
@@ -147,3 +150,111 @@ def test_is_final_status_completed(
 ) -> None:
     result = is_final_status_completed(meta_workflow_run)
     assert result == expected
+
+
+def make_sweep_meta_workflow_run(uuid, jobids):
+    """Create MetaWorkflowRun[json] with first runs running with given jobids."""
+    with open("test/files/CGAP_WGS_trio_scatter_ff.run.json") as json_file:
+        meta_workflow_run = json.load(json_file)
+    meta_workflow_run["uuid"] = uuid
+    meta_workflow_run["status"] = "in review"
+    meta_workflow_run["ignore_output_quality_metrics"] = True
+    for workflow_run, jobid in zip(meta_workflow_run["workflow_runs"], jobids):
+        workflow_run["status"] = "running"
+        workflow_run["jobid"] = jobid
+    return meta_workflow_run
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_status_metawfrs(max_workers: Any, tmp_path, caplog) -> None:
+    """Test status check on multiple MetaWorkflowRuns with shared caches."""
+    meta_workflow_runs = {
+        uuid: make_sweep_meta_workflow_run(uuid, jobids)
+        for uuid, jobids in [("mwfr1", ["a", "b"]), ("mwfr2", ["c"]), ("mwfr3", [])]
+    }
+    wfr_search = [
+        {"uuid": "uuid_a", "awsem_job_id": "a", "run_status": "complete"},
+        {"uuid": "uuid_b", "awsem_job_id": "b", "run_status": "started"},
+        {"uuid": "uuid_c", "awsem_job_id": "c", "run_status": "error"},
+    ]
+
+    def search_metadata(query, key=None):
+        if "type=WorkflowRun" in query:
+            return wfr_search
+        return [{"uuid": "mwfr2"}, {"uuid": "mwfr3"}, {"uuid": "mwfr4"}]
+
+    def get_metadata(uuid, add_on=None, key=None):
+        if uuid not in meta_workflow_runs:
+            raise Exception("MetaWorkflowRun not found")
+        return meta_workflow_runs[uuid]
+
+    with mock.patch(
+        "magma_ff.status_metawfr.ff_utils.get_metadata", side_effect=get_metadata
+    ) as mock_get:
+        with mock.patch(
+            "magma_ff.status_metawfr.ff_utils.search_metadata",
+            side_effect=search_metadata,
+        ) as mock_search:
+            with mock.patch(
+                "magma_ff.status_metawfr.ff_utils.patch_metadata"
+            ) as mock_patch:
+                with mock.patch("magma_ff.wfrutils.s3Utils") as mock_s3:
+                    result = status_metawfrs(
+                        "key",
+                        metawfr_uuids=["mwfr1", "mwfr2"],
+                        search_query="/search/?type=MetaWorkflowRun",
+                        max_workers=max_workers,
+                        cache_file=str(tmp_path / "cache.sqlite"),
+                    )
+    # Same raw frame from the database as status_metawfr
+    assert sorted(call[0][0] for call in mock_get.call_args_list) == [
+        "mwfr1", "mwfr2", "mwfr3", "mwfr4"
+    ]
+    for call in mock_get.call_args_list:
+        assert call[1] == {"add_on": "frame=raw&datastore=database", "key": "key"}
+    # Single search for all running jobs, single access key
+    assert mock_search.call_count == 2
+    assert "awsem_job_id=a&awsem_job_id=b&awsem_job_id=c" in mock_search.call_args[0][0]
+    assert mock_s3.call_count == 1
+    assert [report["uuid"] for report in result] == ["mwfr1", "mwfr2", "mwfr3", "mwfr4"]
+    assert result[0]["final_status"] == "running"
+    assert result[0]["runs"] == {"completed": 7, "running": 1, "pending": 23}
+    assert result[0]["patched"]
+    assert result[1]["final_status"] == "failed"
+    assert result[1]["runs"] == {"completed": 6, "failed": 1, "pending": 24}
+    assert not result[2]["patched"]
+    assert result[3]["error"] == "MetaWorkflowRun not found"
+    assert "Status check failed for MetaWorkflowRun mwfr4" in caplog.text
+    assert "Traceback" in caplog.text
+    assert all(report["seconds"] >= 0 for report in result)
+    assert sorted(call[0][1] for call in mock_patch.call_args_list) == ["mwfr1", "mwfr2"]
+
+
+def test_snapshot_metawfrs() -> None:
+    """Test columnar snapshot of multiple MetaWorkflowRuns."""
+    meta_workflow_runs = [
+        make_sweep_meta_workflow_run("mwfr1", ["a", "b"]),
+        make_sweep_meta_workflow_run("mwfr2", ["c"]),
+        dict(make_sweep_meta_workflow_run("mwfr3", ["d"]), status="deleted"),
+    ]
+    with mock.patch(
+        "magma_ff.status_metawfr.make_embed_request", return_value=meta_workflow_runs
+    ) as mock_embed:
+        with mock.patch(
+            "magma_ff.status_metawfr.ff_utils.search_metadata",
+            return_value=[{"uuid": "mwfr2"}, {"uuid": "mwfr3"}],
+        ):
+            snapshot = snapshot_metawfrs(
+                "key",
+                metawfr_uuids=["mwfr1"],
+                search_query="/search/?type=MetaWorkflowRun",
+            )
+    mock_embed.assert_called_once_with(
+        ["mwfr1", "mwfr2", "mwfr3"],
+        ["uuid", "final_status", "status", "workflow_runs"],
+        "key",
+        max_workers=8,
+    )
+    # Deleted MetaWorkflowRuns are skipped
+    assert snapshot.count(by=("metawfr",), status="running") == {"mwfr1": 2, "mwfr2": 1}
+    assert sorted(snapshot.select("jobid", status="running")) == ["a", "b", "c"]
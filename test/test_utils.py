@@ -9,6 +9,7 @@ from magma import metawfl as wfl
 from magma import metawflrun as run
 from magma_ff import inputgenerator as ingen
 from magma import runupdate as runupd
+from magma.inputgenerator import Formula
 
 #################################################################
 #   Vars
@@ -216,6 +217,64 @@ def test_inputgen_WGS_trio_scatter():
     #end for
 #end def
 
+def test_inputgen_lazy():
+    # Read input
+    with open('test/files/CGAP_WGS_trio.json') as json_file:
+        data_wfl = json.load(json_file)
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data_wflrun = json.load(json_file)
+    # Create MetaWorkflow and MetaWorkflowRun objects
+    wfl_obj = wfl.MetaWorkflow(data_wfl)
+    wflrun_obj = run.MetaWorkflowRun(data_wflrun)
+    # Count runs with matched arguments
+    ingen_obj = ingen.InputGenerator(wfl_obj, wflrun_obj)
+    matched = []
+    _match_arguments = ingen_obj._match_arguments
+    def _match_arguments_(run_args, run_obj):
+        matched.append(run_obj.shard_name)
+        return _match_arguments(run_args, run_obj)
+    #end def
+    ingen_obj._match_arguments = _match_arguments_
+    # Run test
+    in_gen = ingen_obj.input_generator()
+    input_json, _ = next(in_gen)
+    assert input_json['app_name'] == 'workflow_bwa-mem_no_unzip-check'
+    assert matched == ['workflow_bwa-mem_no_unzip-check:0:0']
+    # Change state mid-iteration, run is not ready anymore
+    wflrun_obj.update_attribute('workflow_bwa-mem_no_unzip-check:1:0', 'status', 'running')
+    shards = [input_json['_tibanna']['run_type'] for input_json, _ in in_gen]
+    assert len(shards) == 2
+    assert matched == ['workflow_bwa-mem_no_unzip-check:0:0',
+                       'workflow_bwa-mem_no_unzip-check:1:1',
+                       'workflow_merge-bam-check:2']
+#end def
+
+def test_inputgen_step_plan():
+    # Read input
+    with open('test/files/CGAP_WGS_trio.json') as json_file:
+        data_wfl = json.load(json_file)
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data_wflrun = json.load(json_file)
+    # Create MetaWorkflow and MetaWorkflowRun objects
+    wfl_obj = wfl.MetaWorkflow(data_wfl)
+    wflrun_obj = run.MetaWorkflowRun(data_wflrun)
+    ingen_obj = ingen.InputGenerator(wfl_obj, wflrun_obj)
+    # Run test
+    run_obj = wflrun_obj.runs['workflow_bwa-mem_no_unzip-check:1:1']
+    plan = ingen_obj._step_plan(run_obj.name)
+    assert ingen_obj._step_plan(run_obj.name) is plan
+    run_args = ingen_obj._run_arguments(run_obj)
+    assert [arg_obj.argument_name for arg_obj in run_args] == \
+           [arg['argument_name'] for arg in wfl_obj.steps[run_obj.name].input]
+    ingen_obj._match_arguments(run_args, run_obj)
+    assert run_args[0].files == 'D1'
+    # Templates are not changed by shard specific matching
+    assert not hasattr(plan[0], 'files') or plan[0].files != 'D1'
+    # Plans are rebuilt if input changes
+    wflrun_obj.input = [dict(arg) for arg in wflrun_obj.input]
+    assert ingen_obj._step_plan(run_obj.name) is not plan
+#end def
+
 def test_runupdate_reset_steps():
     # Results
     initial = completed
@@ -268,6 +327,47 @@ def test_runupdate_reset_shards():
     #end for
 #end def
 
+def test_runupdate_reset_runs_downstream():
+    # Read input
+    with open('test/files/CGAP_WGS_trio_scatter.run.json') as json_file:
+        data_wflrun = json.load(json_file)
+    # Expected, runs that depend directly or indirectly on the shard
+    expected = {'workflow_add-readgroups-check:2:0'}
+    changed = True
+    while changed:
+        changed = False
+        for workflow_run in data_wflrun['workflow_runs']:
+            shard_name = workflow_run['name'] + ':' + workflow_run['shard']
+            if shard_name not in expected and \
+               expected.intersection(workflow_run.get('dependencies', [])):
+                expected.add(shard_name)
+                changed = True
+            #end if
+        #end for
+    #end while
+    assert len(expected) > 1
+    # Create MetaWorkflowRun object
+    wflrun_obj = run.MetaWorkflowRun(data_wflrun)
+    # Run test and test result
+    runupdate = runupd.RunUpdate(wflrun_obj)
+    x = runupdate.reset_runs(shards_name=['workflow_add-readgroups-check:2:0', 'missing:0'], downstream=True)
+    for i, workflow_run in enumerate(x['workflow_runs']):
+        shard_name = workflow_run['name'] + ':' + workflow_run['shard']
+        if shard_name in expected:
+            assert workflow_run['status'] == 'pending'
+            assert 'output' not in workflow_run
+            assert 'jobid' not in workflow_run
+        else:
+            assert workflow_run == data_wflrun['workflow_runs'][i]
+        #end if
+    #end for
+    assert x['final_status'] == 'inactive'
+    # Steps and shards together, without downstream
+    wflrun_obj = run.MetaWorkflowRun(data_wflrun)
+    reset = wflrun_obj.reset_runs(['workflow_gatk-CombineGVCFs'], ['workflow_sort-bam-check:1'])
+    assert reset == ['workflow_sort-bam-check:1', 'workflow_gatk-CombineGVCFs:0']
+#end def
+
 def test_runupdate_import_step():
     # Results
     input = [
@@ -444,3 +544,35 @@ def test_inputgen_formula_eval():
         assert input_json == result[i]
     #end for
 #end def
+
+def test_formula():
+    # Parameter names that are substring of other names
+    formula_obj = Formula.compile('x_large + 2 * x - max(x, 3) / 2')
+    assert formula_obj.names == {'x', 'x_large'}
+    assert formula_obj.evaluate({'x': 4, 'x_large': '10'}) == 16
+    assert round(Formula.compile('round(size * 1.5) + min(a, -b) ** 2').evaluate(
+                    {'size': 3, 'a': 1, 'b': 2}), 2) == 8
+    # Compiled once and reused
+    assert Formula.compile('x_large + 2 * x - max(x, 3) / 2') is formula_obj
+    # Only arithmetic is allowed
+    for formula in ['__import__("os").system("ls")', 'x.real', '[x]', 'open(x)',
+                    'max(x, key=y)', '"a" * 3', 'x if y else 1', '1 +']:
+        with pytest.raises(ValueError):
+            Formula(formula)
+        #end with
+    #end for
+    with pytest.raises(ValueError):
+        formula_obj.evaluate({'x': 'a', 'x_large': 1})
+    #end with
+    # Power is capped
+    assert Formula('x ** 100').evaluate({'x': 2}) == 2 ** 100
+    for formula in ['9 ** 9 ** 9', '2 ** 101', '(10 ** 6 + 1) ** 2', '2 ** -101',
+                    '1e6 ** 100']:
+        with pytest.raises(ValueError):
+            Formula(formula).evaluate({})
+        #end with
+    #end for
+    with pytest.raises(ValueError):
+        Formula('x ** y').evaluate({'x': 2, 'y': '1000000'})
+    #end with
+#end def
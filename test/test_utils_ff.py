@@ -1,6 +1,9 @@
 import json
+import logging
 import mock
 import pytest
+import requests
+import time
 from contextlib import contextmanager
 from pathlib import Path
 from tempfile import NamedTemporaryFile
@@ -8,6 +11,7 @@ from typing import Any, Iterator, Sequence
 
 from magma_ff import utils as magma_ff_utils_module
 from magma_ff.utils import (
+    EmbedClient,
     JsonObject,
     check_status,
     chunk_ids,
@@ -65,6 +69,98 @@ def test_make_embed_request(
         assert len(mocked_request.call_args_list) == expected_mock_calls
 
 
+class FakeResponse:
+    """Simple class to mock requests.Response"""
+
+    def __init__(self, status_code, json_value=None):
+        self.status_code = status_code
+        self.json_value = json_value
+
+    def json(self):
+        return self.json_value
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("%s Error" % self.status_code)
+
+
+AUTH_KEY = {"server": "https://some_server", "key": "key", "secret": "secret"}
+
+
+def fake_embed_post(failures):
+    """Mock session.post returning ids, failing with given status
+    the first times each chunk is requested.
+    """
+    calls = []
+
+    def post(url, data=None, timeout=None):
+        ids = json.loads(data)["ids"]
+        calls.append(ids)
+        statuses = failures.get(ids[0], [])
+        if statuses:
+            return FakeResponse(statuses.pop(0))
+        time.sleep(0.001 * (20 - int(ids[0])))  # later chunks return first
+        return FakeResponse(200, [{"uuid": id_} for id_ in ids])
+
+    return post, calls
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_embed_client(max_workers):
+    """Test concurrent POST to embed API with retries."""
+    ids = [str(idx) for idx in range(12)]
+    client = EmbedClient(AUTH_KEY, max_workers=max_workers, backoff=0)
+    assert client.session.auth == ("key", "secret")
+    post, calls = fake_embed_post({"5": [503, 502]})
+    with mock.patch.object(client.session, "post", side_effect=post):
+        result = client.embed(ids, ["uuid"])
+    assert result == [{"uuid": id_} for id_ in ids]
+    assert len(calls) == 5
+    assert len(client.latencies) == 3
+    client.close()
+
+
+def test_embed_client_latencies(caplog):
+    """Test per-chunk latencies are stored and logged."""
+    ids = [str(idx) for idx in range(7)]
+    client = EmbedClient(AUTH_KEY, max_workers=2, backoff=0)
+    post, _ = fake_embed_post({})
+    with mock.patch.object(client.session, "post", side_effect=post):
+        with caplog.at_level(logging.DEBUG, logger=magma_ff_utils_module.__name__):
+            client.embed(ids, ["uuid"])
+    assert len(client.latencies) == 2
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages == [
+        "Embed API chunk 1/2, 5 ids in %.3fs" % client.latencies[0],
+        "Embed API chunk 2/2, 2 ids in %.3fs" % client.latencies[1],
+    ]
+    client.close()
+
+
+def test_embed_client_errors():
+    """Test 4xx are not retried and 5xx are raised after all retries."""
+    client = EmbedClient(AUTH_KEY, retries=2, backoff=0)
+    post, calls = fake_embed_post({"0": [404], "5": [500, 500, 500]})
+    with mock.patch.object(client.session, "post", side_effect=post):
+        with pytest.raises(requests.HTTPError, match="404"):
+            client.post_chunk(["0"], ["uuid"])
+        with pytest.raises(requests.HTTPError, match="500"):
+            client.post_chunk(["5"], ["uuid"])
+    assert calls == [["0"], ["5"], ["5"], ["5"]]
+
+
+def test_make_embed_request_max_workers():
+    """Test POST to embed API with pooled session."""
+    with mock.patch.object(
+        magma_ff_utils_module.EmbedClient, "embed", return_value=["found"]
+    ) as mocked_embed:
+        result = make_embed_request(
+            "some_id", "some_field", AUTH_KEY, single_item=True, max_workers=4
+        )
+    assert result == "found"
+    mocked_embed.assert_called_once_with(["some_id"], ["some_field"])
+
+
 @pytest.mark.parametrize(
     "ids,expected",
     [
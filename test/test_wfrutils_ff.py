@@ -0,0 +1,70 @@
+import sqlite3
+
+import mock
+import pytest
+
+from magma_ff.wfrutils import FFWfrUtils, WfrMetadataCache
+
+
+def test_WfrMetadataCache(tmp_path):
+    """Check that only finished runs are stored, and they persist."""
+    cache_file = str(tmp_path / 'cache' / 'wfr_metadata.sqlite')
+    cache = WfrMetadataCache(cache_file)
+    cache.set_many({
+        'a': {'uuid': 'a', 'run_status': 'complete'},
+        'b': {'uuid': 'b', 'run_status': 'error'},
+        'c': {'uuid': 'c', 'run_status': 'started'},
+        'd': None
+    })
+    assert cache.get('a') == {'uuid': 'a', 'run_status': 'complete'}
+    assert cache.get('c') is None
+    cache.close()
+
+    with WfrMetadataCache(cache_file) as cache:
+        assert cache.get_many(['a', 'b', 'c', 'd', 'e']) == {
+            'a': {'uuid': 'a', 'run_status': 'complete'},
+            'b': {'uuid': 'b', 'run_status': 'error'}
+        }
+    # Connection is closed by the context manager
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.get('a')
+
+
+def test_WfrMetadataCache_eviction(tmp_path):
+    """Check that entries expire after ttl and oldest entries are evicted."""
+    cache = WfrMetadataCache(str(tmp_path / 'wfr_metadata.sqlite'), ttl=100, max_size=3)
+    with mock.patch('magma_ff.wfrutils.time.time') as mock_time:
+        for i, job_id in enumerate('abcd'):
+            mock_time.return_value = 1000 + i
+            cache.set_many({job_id: {'uuid': job_id, 'run_status': 'complete'}})
+        # a is evicted for size
+        assert sorted(cache.get_many('abcd')) == ['b', 'c', 'd']
+        # b and c are expired
+        mock_time.return_value = 1102.5
+        assert sorted(cache.get_many('abcd')) == ['d']
+        cache.set_many({'e': {'uuid': 'e', 'run_status': 'complete'}})
+    assert cache._conn.execute('SELECT COUNT(*) FROM wfr_metadata').fetchone()[0] == 2
+
+
+def test_FFWfrUtils_cache(tmp_path):
+    """Check that runs in persistent cache are not searched on the portal."""
+    cache = WfrMetadataCache(str(tmp_path / 'wfr_metadata.sqlite'))
+    cache.set_many({'a': {'uuid': 'a', 'run_status': 'complete'}})
+    ff = FFWfrUtils('env', cache=cache)
+    ff._ff_key = 'key'
+    search_res = [{'uuid': 'b', 'awsem_job_id': 'b', 'run_status': 'complete'},
+                  {'uuid': 'c', 'awsem_job_id': 'c', 'run_status': 'started'}]
+    with mock.patch('magma_ff.wfrutils.ff_utils.search_metadata',
+                    return_value=search_res) as mock_search:
+        ff.prefetch_wfr_metadata(['a', 'b', 'c'])
+        assert ff.wfr_run_status('c') == 'started'
+        assert ff.wfr_run_uuid('a') == 'a'
+    mock_search.assert_called_once_with(
+        '/search/?type=WorkflowRun&awsem_job_id=b&awsem_job_id=c', key='key')
+    # only the finished run is added to persistent cache
+    assert sorted(cache.get_many(['a', 'b', 'c'])) == ['a', 'b']
+
+    ff = FFWfrUtils('env', cache=cache)
+    with mock.patch('magma_ff.wfrutils.ff_utils.search_metadata') as mock_search:
+        assert ff.wfr_run_uuid('b') == 'b'
+    mock_search.assert_not_called()